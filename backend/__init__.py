@@ -0,0 +1,6 @@
+# The one load_dotenv() call: every entry point (the app, the migration and
+# benchmark CLIs) imports this package first, so module-level settings read
+# with os.getenv already see the .env values.
+from dotenv import load_dotenv
+
+load_dotenv()
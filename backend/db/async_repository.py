@@ -0,0 +1,389 @@
+from typing import AsyncIterator
+from pymongo import ReturnDocument
+from backend.db.mongodb_setup import async_db
+from backend.db import queries, search
+from backend.db.transcript_cache import CachedTranscript, cache as transcript_cache
+
+from backend.utils import metrics
+from backend.utils.logger import logger
+
+# Async mirror of backend/db/repository.py for the FastAPI routes. The sync
+# module stays the one to use from scripts and worker threads. Filters and
+# documents come from backend/db/queries.py, shared with the sync module.
+
+users_collection = async_db["users"]
+
+transcripts_collection = async_db["transcripts"]
+
+jobs_collection = async_db["transcription_jobs"]
+
+live_sessions_collection = async_db["live_sessions"]
+
+batches_collection = async_db["transcription_batches"]
+
+async def create_user(oauth_id: str) -> str:
+    query, update = queries.user_upsert(oauth_id)
+    doc = await users_collection.find_one_and_update(
+        query,
+        update,
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+    return str(doc["_id"])
+
+async def update_user(user_id: str, oauth_id: str = None) -> bool:
+    user_id = queries.safe_objectid(user_id)
+    if not user_id:
+        return False
+
+    update_fields = {}
+
+    if oauth_id is not None:
+        update_fields["oauth_id"] = oauth_id
+
+    if not update_fields:
+        return False
+
+    result = await users_collection.update_one(
+        {"_id": user_id},
+        {"$set": update_fields}
+    )
+
+    logger.info("User updated.")
+
+    return result.modified_count > 0
+
+async def get_user_by_oauth(oauth_id: str) -> dict | None:
+    doc = await users_collection.find_one({"oauth_id": oauth_id})
+
+    if doc:
+        doc["_id"] = str(doc["_id"])
+    return doc
+
+async def get_user_by_id(user_id: str) -> dict | None:
+    user_id = queries.safe_objectid(user_id)
+    if not user_id:
+        return None
+
+    doc = await users_collection.find_one({"_id": user_id})
+
+    if doc:
+        doc["_id"] = str(doc["_id"])
+    return doc
+
+async def delete_user(user_id: str) -> bool:
+    user_id = queries.safe_objectid(user_id)
+    if not user_id:
+        return False
+
+    user_result = await users_collection.delete_one({"_id": user_id})
+    _ = await transcripts_collection.delete_many({"user_id": user_id})
+    transcript_cache.invalidate_user(str(user_id))
+
+    logger.info("User deleted.")
+
+    return user_result.deleted_count > 0
+
+async def create_transcript(user_id: str,
+                            text: str,
+                            title: str,
+                            language_code: str,
+                            speakers: int,
+                            duration: str,
+                            status: str,
+                            utterances,
+                            confidence: float) -> str | None:
+    user_id = queries.safe_objectid(user_id)
+    if not user_id:
+        return None
+
+    doc = queries.new_transcript_doc(user_id, text, title, language_code, speakers,
+                                     duration, status, utterances, confidence)
+
+    result = await transcripts_collection.insert_one(doc)
+
+    logger.info("Transcription is stored for the user.")
+
+    return str(result.inserted_id)
+
+async def update_transcript(transcript_id: str, text: str = None, title: str = None,
+                            language_code: str = None, speakers: int = None,
+                            duration: str = None, status: str = None, utterances = None,
+                            confidence = None, notes = None, version: int = None) -> bool:
+    """See repository.update_transcript."""
+    transcript_id = queries.safe_objectid(transcript_id)
+    if not transcript_id:
+        return False
+
+    update_fields = queries.transcript_update_fields(
+        text=text, title=title, language_code=language_code, speakers=speakers,
+        duration=duration, status=status, utterances=utterances,
+        confidence=confidence, notes=notes
+    )
+
+    if not update_fields:
+        return False
+
+    query, update = queries.transcript_update(transcript_id, update_fields, version)
+    result = await transcripts_collection.update_one(query, update)
+    transcript_cache.invalidate(str(transcript_id))
+
+    logger.info(f"Transcription updated: {transcript_id}.")
+
+    return result.modified_count > 0
+
+async def patch_transcript(transcript_id: str, user_id: str, version: int, fields: dict = None,
+                           utterances: list[dict] = None, words: list[dict] = None) -> dict | None:
+    """See repository.patch_transcript."""
+    oid = queries.safe_objectid(transcript_id)
+    if not oid or not queries.safe_objectid(user_id):
+        return None
+
+    current = await transcripts_collection.find_one({"_id": oid}, queries.TRANSCRIPT_PATCH_PROJECTION)
+    if current is None:
+        return None
+    refusal = queries.patch_refusal(current, user_id, version)
+    if refusal is not None:
+        return refusal
+
+    patch = queries.transcript_patch(current, fields or {}, utterances or [], words or [])
+    if patch is None:
+        return {"status": "invalid", "version": version}
+    guard, update = patch
+
+    result = await transcripts_collection.update_one(queries.patch_filter(oid, user_id, version, guard), update)
+
+    if not result.matched_count:
+        # Written by someone else between the read and the update
+        current = await transcripts_collection.find_one({"_id": oid}, queries.TRANSCRIPT_HEAD_PROJECTION)
+        if current is None:
+            return None
+        return queries.patch_refusal(current, user_id, version) or {"status": "invalid", "version": version}
+
+    transcript_cache.invalidate(str(oid))
+
+    logger.info(f"Transcription patched: {oid}, version {version + 1}.")
+
+    return {"status": "ok", "version": version + 1}
+
+async def get_transcript_head(transcript_id: str) -> dict | None:
+    """See repository.get_transcript_head."""
+    transcript_id = queries.safe_objectid(transcript_id)
+    if not transcript_id:
+        return None
+
+    doc = await transcripts_collection.find_one({"_id": transcript_id}, queries.TRANSCRIPT_HEAD_PROJECTION)
+    if not doc:
+        return None
+
+    return queries.transcript_head(doc)
+
+async def get_transcripts_for_user(user_id: str, sort_mode: str = "descending") -> list[dict] | None:
+    user_id = queries.safe_objectid(user_id)
+    if not user_id:
+        return None
+
+    cursor = transcripts_collection.find({"user_id": user_id}).sort(
+        "created_at", queries.user_transcripts_sort(sort_mode)
+    )
+
+    logger.info("Transcriptions are collected for the user.")
+
+    return [queries.decode_transcript(doc) async for doc in cursor]
+
+async def _decoded_transcripts(cursor) -> AsyncIterator[dict]:
+    try:
+        async for doc in cursor:
+            yield queries.decode_transcript(doc)
+    finally:
+        await cursor.close()
+
+def iter_transcripts_for_user(user_id: str) -> AsyncIterator[dict] | None:
+    """See repository.iter_transcripts_for_user."""
+    user_id = queries.safe_objectid(user_id)
+    if not user_id:
+        return None
+
+    cursor = transcripts_collection.find({"user_id": user_id}).sort(
+        queries.EXPORT_SORT
+    ).batch_size(queries.EXPORT_BATCH_SIZE)
+    return _decoded_transcripts(cursor)
+
+async def get_transcripts_page(user_id: str, limit: int = 20, cursor: str = None,
+                               sort_mode: str = "descending",
+                               fields: list[str] = None) -> tuple[list[dict], str | None] | None:
+    """See repository.get_transcripts_page."""
+    user_id = queries.safe_objectid(user_id)
+    if not user_id:
+        return None
+
+    page_query = queries.page_query(user_id, cursor, sort_mode, fields)
+    if page_query is None:
+        return None
+    query, projection, sort = page_query
+
+    docs = await transcripts_collection.find(query, projection).sort(sort).limit(limit + 1).to_list()
+
+    return queries.page_result(docs, limit)
+
+async def search_transcripts(user_id: str, query: str, limit: int = 10) -> list[dict] | None:
+    """Ranked full-text search over the user's transcripts; see repository.search_transcripts."""
+    user_id = queries.safe_objectid(user_id)
+    if not user_id or not search.query_terms(query):
+        return None
+
+    cursor = transcripts_collection.find(
+        search.search_filter(user_id, query), search.SEARCH_PROJECTION
+    ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+
+    return [search.build_result(doc, query) async for doc in cursor]
+
+async def _load_transcript(transcript_id, expand_words: bool) -> dict | None:
+    doc = await transcripts_collection.find_one({"_id": transcript_id})
+
+    return queries.decode_transcript(doc, expand_words) if doc else None
+
+async def get_transcript_by_id(transcript_id: str, expand_words: bool = True) -> dict | None:
+    """See repository.get_transcript_by_id."""
+    oid = queries.safe_objectid(transcript_id)
+    if not oid:
+        return None
+
+    if not expand_words:
+        return await _load_transcript(oid, expand_words=False)
+
+    entry = transcript_cache.get(str(oid))
+    if entry is not None:
+        return entry.document()
+
+    generation = transcript_cache.generation()
+    doc = await _load_transcript(oid, expand_words=True)
+    if doc:
+        transcript_cache.put(doc, generation)
+    return doc
+
+async def get_transcript_entry(transcript_id: str) -> CachedTranscript | None:
+    """See repository.get_transcript_entry."""
+    oid = queries.safe_objectid(transcript_id)
+    if not oid:
+        return None
+
+    entry = transcript_cache.get(str(oid))
+    if entry is not None:
+        return entry
+
+    generation = transcript_cache.generation()
+    doc = await _load_transcript(oid, expand_words=True)
+    return transcript_cache.put(doc, generation) if doc else None
+
+async def get_transcript_utterance(transcript_id: str, index: int) -> dict | None:
+    transcript_id = queries.safe_objectid(transcript_id)
+    # A negative $slice would count from the end
+    if not transcript_id or index < 0:
+        return None
+
+    doc = await transcripts_collection.find_one({"_id": transcript_id}, queries.utterance_projection(index))
+
+    return queries.utterance_result(doc)
+
+async def get_transcript_range(transcript_id: str, t_start: int, t_end: int) -> dict | None:
+    """See repository.get_transcript_range."""
+    transcript_id = queries.safe_objectid(transcript_id)
+    if not transcript_id:
+        return None
+
+    head = await transcripts_collection.find_one({"_id": transcript_id}, queries.RANGE_HEAD_PROJECTION)
+    if not head:
+        return None
+
+    if head.get("utterance_index") is None:
+        # Transcript saved before the offset table existed
+        head = await transcripts_collection.find_one({"_id": transcript_id}, queries.LEGACY_RANGE_HEAD_PROJECTION)
+        if not head:
+            return None
+
+    first, last = queries.range_bounds(head, t_start, t_end)
+    if last == first:
+        # Nothing overlaps, no need to read utterances
+        return queries.range_result({"_id": transcript_id, "user_id": head["user_id"]}, first, t_start, t_end)
+
+    doc = await transcripts_collection.find_one({"_id": transcript_id}, queries.range_projection(first, last))
+    if not doc:
+        # Deleted between the two reads
+        return None
+
+    return queries.range_result(doc, first, t_start, t_end)
+
+async def delete_transcript(transcript_id: str) -> bool:
+    transcript_id = queries.safe_objectid(transcript_id)
+    if not transcript_id:
+        return False
+
+    transcript_result = await transcripts_collection.delete_one({"_id": transcript_id})
+    transcript_cache.invalidate(str(transcript_id))
+
+    logger.info(f"Transcription deleted: {transcript_id}.")
+
+    return transcript_result.deleted_count > 0
+
+async def get_job(job_id: str, include_result: bool = True) -> dict | None:
+    job_id = queries.safe_objectid(job_id)
+    if not job_id:
+        return None
+
+    doc = await jobs_collection.find_one({"_id": job_id}, queries.job_projection(include_result))
+
+    return queries.decode_job(doc) if doc else None
+
+async def append_live_turns(session_id: str, turns: list[dict], user_id: str = None) -> bool:
+    session_id = queries.safe_objectid(session_id)
+    if not session_id or not turns:
+        return False
+
+    result = await live_sessions_collection.update_one(
+        {"_id": session_id},
+        queries.live_turns_update(turns, user_id),
+        upsert=True
+    )
+
+    return result.acknowledged
+
+async def end_live_session(session_id: str, **fields) -> bool:
+    session_id = queries.safe_objectid(session_id)
+    if not session_id:
+        return False
+
+    result = await live_sessions_collection.update_one(
+        {"_id": session_id},
+        queries.live_session_end_update(fields),
+        upsert=True
+    )
+
+    logger.info(f"Live session ended: {session_id}.")
+
+    return result.acknowledged
+
+async def get_live_session(session_id: str) -> dict | None:
+    session_id = queries.safe_objectid(session_id)
+    if not session_id:
+        return None
+
+    doc = await live_sessions_collection.find_one({"_id": session_id})
+
+    return queries.with_str_ids(doc) if doc else None
+
+async def get_batch(batch_id: str) -> dict | None:
+    batch_id = queries.safe_objectid(batch_id)
+    if not batch_id:
+        return None
+
+    # Server-side paths and leases stay internal
+    doc = await batches_collection.find_one(
+        {"_id": batch_id}, {"items.file_path": 0, "owner": 0, "lease_until": 0}
+    )
+
+    return queries.with_str_ids(doc) if doc else None
+
+# Per-call timings for /metrics
+metrics.instrument_repository(globals(), "async")
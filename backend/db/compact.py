@@ -0,0 +1,264 @@
+# Columnar storage format for word-level transcript data.
+#
+# A word list like [{"text", "start", "end", "confidence", "speaker"}, ...] is
+# stored as one "words_packed" dict of parallel columns: texts as a list,
+# start/end as little-endian int32 bytes, confidences as float32 bytes and the
+# speaker once per utterance. The top-level "words" list, which repeats the
+# utterance words, is replaced by a flag when it can be rebuilt from them.
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterator
+
+FORMAT_VERSION = 1
+
+_WORD_KEYS = {"text", "start", "end", "confidence", "speaker"}
+
+# float32 keeps ~7 significant digits; rounding on decode hides the noise
+_CONFIDENCE_DIGITS = 6
+
+
+def _pack(typecode: str, values) -> bytes:
+    arr = array(typecode, values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _unpack(typecode: str, data: bytes) -> array:
+    arr = array(typecode)
+    arr.frombytes(data)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+
+def _packable(words) -> bool:
+    if not isinstance(words, list) or not words:
+        return False
+    for word in words:
+        if not isinstance(word, dict) or not word.keys() <= _WORD_KEYS:
+            return False
+        if not isinstance(word.get("start"), int) or not isinstance(word.get("end"), int):
+            return False
+        if not isinstance(word.get("confidence"), (int, float)):
+            return False
+    return True
+
+
+def pack_words(words: list[dict], speaker=None) -> dict | None:
+    """Pack a word list into columns, or return None if it has an unknown shape.
+
+    speaker is the utterance speaker; per-word speakers are stored only when
+    some word disagrees with it.
+    """
+    if not _packable(words):
+        return None
+
+    packed = {
+        "v": FORMAT_VERSION,
+        "n": len(words),
+        "text": [word.get("text") for word in words],
+        "start": _pack("i", (word["start"] for word in words)),
+        "end": _pack("i", (word["end"] for word in words)),
+        "confidence": _pack("f", (word["confidence"] for word in words)),
+    }
+
+    speakers = [word.get("speaker") for word in words]
+    has_speaker = any("speaker" in word for word in words)
+    if has_speaker and any(s != speaker for s in speakers):
+        packed["speakers"] = speakers
+    elif has_speaker:
+        packed["speaker"] = speaker
+
+    return packed
+
+
+def iter_words(packed: dict) -> Iterator[dict]:
+    """Lazily expand a "words_packed" dict back into word dicts."""
+    starts = _unpack("i", packed["start"])
+    ends = _unpack("i", packed["end"])
+    confidences = _unpack("f", packed["confidence"])
+    speakers = packed.get("speakers")
+
+    for i, text in enumerate(packed["text"]):
+        word = {
+            "text": text,
+            "start": starts[i],
+            "end": ends[i],
+            "confidence": round(confidences[i], _CONFIDENCE_DIGITS),
+        }
+        if speakers is not None:
+            word["speaker"] = speakers[i]
+        elif "speaker" in packed:
+            word["speaker"] = packed["speaker"]
+        yield word
+
+
+def word_starts(packed: dict) -> array:
+    """Decode only the start column of a "words_packed" dict."""
+    return _unpack("i", packed["start"])
+
+
+def unpack_words(packed: dict) -> list[dict]:
+    return list(iter_words(packed))
+
+
+def utterance_words(utterance: dict) -> list[dict]:
+    """Return the words of a stored utterance, packed or not."""
+    if "words_packed" in utterance:
+        return unpack_words(utterance["words_packed"])
+    return utterance.get("words", [])
+
+
+def build_offset_table(utterances) -> dict | None:
+    """Packed start/end columns of the utterances, stored as "utterance_index".
+
+    Lets a time-range read find the utterances it needs with a binary search
+    before loading any of them.
+    """
+    if not isinstance(utterances, list) or not utterances:
+        return None
+
+    try:
+        starts = [int(utterance["start"]) for utterance in utterances]
+        ends = [int(utterance["end"]) for utterance in utterances]
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    # Running maximum keeps the end column sorted for bisect, even if a
+    # short utterance overlaps the previous one.
+    for i in range(1, len(ends)):
+        ends[i] = max(ends[i], ends[i - 1])
+
+    return {"v": FORMAT_VERSION, "start": _pack("i", starts), "end": _pack("i", ends)}
+
+
+def utterance_range(table: dict, t_start: int, t_end: int) -> tuple[int, int]:
+    """Return [first, last) utterance indices overlapping [t_start, t_end)."""
+    starts = _unpack("i", table["start"])
+    ends = _unpack("i", table["end"])
+    first = bisect_right(ends, t_start)
+    last = bisect_left(starts, t_end)
+    return first, max(first, last)
+
+
+def words_in_range(utterance: dict, t_start: int, t_end: int) -> list[dict]:
+    """Expand only the words of a stored utterance that overlap the range."""
+    if "words_packed" not in utterance:
+        return [word for word in utterance.get("words", [])
+                if word.get("end", 0) > t_start and word.get("start", 0) < t_end]
+
+    packed = utterance["words_packed"]
+    starts = _unpack("i", packed["start"])
+    ends = _unpack("i", packed["end"])
+    confidences = _unpack("f", packed["confidence"])
+    speakers = packed.get("speakers")
+
+    words = []
+    for i in range(bisect_left(starts, t_end) - 1, -1, -1):
+        if ends[i] <= t_start:
+            break
+        word = {
+            "text": packed["text"][i],
+            "start": starts[i],
+            "end": ends[i],
+            "confidence": round(confidences[i], _CONFIDENCE_DIGITS),
+        }
+        if speakers is not None:
+            word["speaker"] = speakers[i]
+        elif "speaker" in packed:
+            word["speaker"] = packed["speaker"]
+        words.append(word)
+
+    words.reverse()
+    return words
+
+
+def encode_utterances(utterances):
+    if not isinstance(utterances, list):
+        return utterances
+
+    encoded = []
+    for utterance in utterances:
+        packed = None
+        if isinstance(utterance, dict) and "words" in utterance:
+            packed = pack_words(utterance["words"], utterance.get("speaker"))
+
+        if packed is None:
+            encoded.append(utterance)
+        else:
+            encoded.append({**{k: v for k, v in utterance.items() if k != "words"}, "words_packed": packed})
+    return encoded
+
+
+def decode_utterances(utterances):
+    if not isinstance(utterances, list):
+        return utterances
+
+    return [
+        {**{k: v for k, v in utterance.items() if k != "words_packed"},
+         "words": unpack_words(utterance["words_packed"])}
+        if isinstance(utterance, dict) and "words_packed" in utterance else utterance
+        for utterance in utterances
+    ]
+
+
+def _words_match_utterances(words: list, utterances: list) -> bool:
+    flat = [word for utterance in utterances if isinstance(utterance, dict)
+            for word in utterance.get("words", [])]
+    if len(flat) != len(words):
+        return False
+    return all(
+        "speaker" not in w and w.get("text") == f.get("text") and w.get("start") == f.get("start")
+        and w.get("end") == f.get("end") and w.get("confidence") == f.get("confidence")
+        for w, f in zip(words, flat)
+    )
+
+
+def encode_document(doc: dict) -> dict:
+    """Return a copy of a transcript-shaped dict with word data packed."""
+    doc = dict(doc)
+    utterances = doc.get("utterances")
+    words = doc.get("words")
+
+    if isinstance(words, list) and isinstance(utterances, list) and words \
+            and _words_match_utterances(words, utterances):
+        del doc["words"]
+        doc["words_from_utterances"] = True
+    elif words is not None:
+        packed = pack_words(words)
+        if packed is not None:
+            del doc["words"]
+            doc["words_packed"] = packed
+
+    if utterances is not None:
+        doc["utterances"] = encode_utterances(utterances)
+    return doc
+
+
+def decode_document(doc: dict, expand_words: bool = True) -> dict:
+    """Inverse of encode_document; documents in the old layout pass through.
+
+    With expand_words=False the utterances keep their "words_packed" columns
+    and callers expand single utterances with utterance_words().
+    """
+    if doc is None:
+        return None
+
+    doc.pop("utterance_index", None)
+
+    if expand_words:
+        if "utterances" in doc:
+            doc["utterances"] = decode_utterances(doc["utterances"])
+
+        if doc.pop("words_from_utterances", False):
+            doc["words"] = [
+                {k: v for k, v in word.items() if k != "speaker"}
+                for utterance in doc.get("utterances") or []
+                for word in utterance.get("words", [])
+            ]
+        elif "words_packed" in doc:
+            doc["words"] = unpack_words(doc.pop("words_packed"))
+
+    return doc
@@ -0,0 +1,226 @@
+"""Versioned index and data migrations for the Mongo collections.
+
+Run at startup from the app lifespan, or by hand:
+
+    python -m backend.db.migrations            # apply pending migrations
+    python -m backend.db.migrations --status   # list applied versions
+    python -m backend.db.migrations --check    # fail if a query does a COLLSCAN
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT
+
+from backend.db import compact, queries
+from backend.db.mongodb_setup import db
+from backend.utils.logger import logger
+
+migrations_collection = db["schema_migrations"]
+
+# Finished jobs, with their results, are kept this long for clients to fetch
+JOB_RESULT_TTL_SECONDS = 7 * 24 * 3600
+
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    """Register a migration; every migration must be safe to run twice."""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        return func
+    return decorator
+
+
+@migration(1, "Merge duplicate users created by the old create_user race")
+def _dedupe_users(database):
+    duplicates = database["users"].aggregate([
+        {"$sort": {"created_at": 1}},
+        {"$group": {"_id": "$oauth_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ])
+
+    for group in duplicates:
+        keep, *extra = group["ids"]
+        database["transcripts"].update_many({"user_id": {"$in": extra}}, {"$set": {"user_id": keep}})
+        database["users"].delete_many({"_id": {"$in": extra}})
+        logger.info(f"Merged {len(extra)} duplicate user(s) into {keep}.")
+
+
+@migration(2, "Create indexes used by the repository queries")
+def _create_indexes(database):
+    database["users"].create_index([("oauth_id", ASCENDING)], unique=True, name="oauth_id_unique")
+    database["transcripts"].create_index(
+        [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        name="user_created_at"
+    )
+    database["transcription_jobs"].create_index(
+        [("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"
+    )
+    database["transcription_cache"].create_index([("created_at", ASCENDING)], name="created_at")
+    database["transcription_cache"].create_index([("last_hit_at", ASCENDING)], name="last_hit_at")
+
+
+@migration(3, "Pack word-level data of transcripts saved before the columnar format")
+def _pack_transcript_words(database):
+    transcripts = database["transcripts"]
+    legacy = transcripts.find({"utterances.words": {"$exists": True}}, {"utterances": 1})
+    for doc in legacy:
+        transcripts.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"utterances": compact.encode_utterances(doc["utterances"])}}
+        )
+
+
+@migration(4, "Create the full-text index over transcript title, text and notes")
+def _create_text_index(database):
+    # default_language "none": transcripts are in many languages, so no
+    # stemming or stop words, just tokenized terms
+    database["transcripts"].create_index(
+        [("title", TEXT), ("text", TEXT), ("notes", TEXT)],
+        weights={"title": 10, "notes": 3, "text": 1},
+        default_language="none",
+        name="transcript_text"
+    )
+
+
+@migration(5, "Build the utterance offset tables used by time-range reads")
+def _build_utterance_index(database):
+    transcripts = database["transcripts"]
+    missing = transcripts.find(
+        {"utterance_index": {"$exists": False}},
+        {"utterances.start": 1, "utterances.end": 1}
+    )
+    for doc in missing:
+        transcripts.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"utterance_index": compact.build_offset_table(doc.get("utterances"))}}
+        )
+
+
+@migration(6, "Add the compare-and-swap version field to transcripts")
+def _add_transcript_version(database):
+    database["transcripts"].update_many({"version": {"$exists": False}}, {"$set": {"version": 1}})
+
+
+@migration(7, "Index transcription batches by status for claiming interrupted batches")
+def _create_batch_status_index(database):
+    database["transcription_batches"].create_index(
+        [("status", ASCENDING), ("lease_until", ASCENDING)], name="status_lease_until"
+    )
+
+
+@migration(8, "Expire finished transcription jobs and their results")
+def _expire_finished_jobs(database):
+    jobs = database["transcription_jobs"]
+    jobs.update_many(
+        {"status": {"$in": ["completed", "error"]}, "finished_at": {"$exists": False}},
+        [{"$set": {"finished_at": "$updated_at"}}]
+    )
+    # Unfinished jobs have no finished_at and never expire
+    jobs.create_index(
+        [("finished_at", ASCENDING)], expireAfterSeconds=JOB_RESULT_TTL_SECONDS, name="finished_at_ttl"
+    )
+
+
+def applied_versions() -> set[int]:
+    return {doc["_id"] for doc in migrations_collection.find({}, {"_id": 1})}
+
+
+def run_migrations() -> list[int]:
+    """Apply every migration that has not been recorded yet, in version order."""
+    done = applied_versions()
+    applied = []
+
+    for version, description, func in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in done:
+            continue
+
+        logger.info(f"Applying migration {version}: {description}")
+        func(db)
+        migrations_collection.update_one(
+            {"_id": version},
+            {"$set": {"description": description, "applied_at": datetime.now()}},
+            upsert=True
+        )
+        applied.append(version)
+
+    return applied
+
+
+def _query_plans():
+    """The filter shapes of both repository modules, with sample values.
+
+    Add the shape of every new repository query here, or --check cannot see it.
+    """
+    some_id = ObjectId()
+    now = datetime.now()
+    job_filter, job_sort = queries.claimable_jobs_query(now)
+    return [
+        ("users by oauth_id", db["users"].find({"oauth_id": ""})),
+        ("transcripts for user", db["transcripts"].find({"user_id": some_id}).sort("created_at", -1)),
+        ("transcripts page", db["transcripts"].find({
+            "user_id": some_id,
+            "$or": [{"created_at": {"$lt": now}}, {"created_at": now, "_id": {"$lt": some_id}}]
+        }).sort([("created_at", -1), ("_id", -1)])),
+        ("transcript search", db["transcripts"].find({"user_id": some_id, "$text": {"$search": "x"}})),
+        ("transcript by id", db["transcripts"].find({"_id": some_id})),
+        ("claimable jobs", db["transcription_jobs"].find(job_filter).sort(job_sort)),
+        ("job by id", db["transcription_jobs"].find({"_id": some_id})),
+        ("job leases", db["transcription_jobs"].find({"_id": {"$in": [some_id]}, "owner": ""})),
+        ("cached transcription", db["transcription_cache"].find({"_id": "", "created_at": {"$gte": now}})),
+        ("expired cache entries", db["transcription_cache"].find({"created_at": {"$lt": now}})),
+        ("least recently hit cache entries", db["transcription_cache"].find({}, {"_id": 1}).sort("last_hit_at", 1)),
+        ("live session by id", db["live_sessions"].find({"_id": some_id})),
+        ("batch by id", db["transcription_batches"].find({"_id": some_id})),
+        ("claimable batches", db["transcription_batches"].find(queries.claimable_batches_query(now))),
+        ("batch leases", db["transcription_batches"].find({"_id": {"$in": [some_id]}, "owner": ""})),
+    ]
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def check_query_plans() -> list[str]:
+    """Return the names of repository queries whose winning plan is a COLLSCAN."""
+    failing = []
+    for name, cursor in _query_plans():
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in _stages(plan):
+            failing.append(name)
+    return failing
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mongo index and schema migrations")
+    parser.add_argument("--status", action="store_true", help="list applied migrations and exit")
+    parser.add_argument("--check", action="store_true", help="fail if a repository query does a COLLSCAN")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        done = applied_versions()
+        for version, description, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+            print(f"{'x' if version in done else ' '} {version:3d} {description}")
+        return 0
+
+    applied = run_migrations()
+    print(f"Applied migrations: {applied or 'none'}")
+
+    if args.check:
+        failing = check_query_plans()
+        for name in failing:
+            print(f"COLLSCAN: {name}")
+        return 1 if failing else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
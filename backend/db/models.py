@@ -25,4 +25,33 @@ class UserUpdateTranscriptRequest(BaseModel):
     status: str = None
     utterances: Optional[list[dict]] = None
     confidence: Optional[float] = None
-    notes: str = None
\ No newline at end of file
+    notes: str = None
+    # Only update if the transcript is still at this version (409 otherwise)
+    version: Optional[int] = None
+
+class TranscriptFieldsPatch(BaseModel):
+    title: Optional[str] = None
+    notes: Optional[str] = None
+    language_code: Optional[str] = None
+    speakers: Optional[int] = None
+    duration: Optional[str] = None
+    status: Optional[str] = None
+    confidence: Optional[float] = None
+
+class UtterancePatch(BaseModel):
+    index: int = Field(ge=0)
+    text: Optional[str] = None
+    speaker: Optional[str] = None
+
+class WordPatch(BaseModel):
+    utterance: int = Field(ge=0)
+    index: int = Field(ge=0)
+    text: str
+
+class UserPatchTranscriptRequest(BaseModel):
+    user_id: str
+    # Version the edits were made against, from the transcript document
+    version: int
+    fields: TranscriptFieldsPatch = Field(default_factory=TranscriptFieldsPatch)
+    utterances: list[UtterancePatch] = Field(default_factory=list, max_length=500)
+    words: list[WordPatch] = Field(default_factory=list, max_length=2000)
@@ -1,18 +1,113 @@
-from pymongo import MongoClient
 import os
-from dotenv import load_dotenv
+import threading
+
+from pymongo import AsyncMongoClient, MongoClient
+
 from backend.utils.logger import logger
-load_dotenv()
 
-MONGO_URI = os.getenv("MONGO_URI")
-DB_NAME = os.getenv("DB_NAME", "mi_5_db")
+# The clients are created on first use, not at import: the app (and scripts
+# that only need a formatter or a CLI flag) can be imported without a
+# reachable database or even a MONGO_URI. `db` and `async_db` are stand-ins
+# that resolve to the real database on first access, so the repositories
+# can keep their module-level collection names.
+
+DB_NAME_DEFAULT = "mi_5_db"
+
+
+def _client_options() -> dict:
+    # Connection pool sizing and timeouts, shared by the sync and async clients
+    return {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000")),
+    }
+
+
+def _mongo_uri() -> str:
+    uri = os.getenv("MONGO_URI")
+    if not uri:
+        logger.error("MONGO_URI is missing from .env file")
+        raise ValueError("MONGO_URI is missing from .env file")
+    return uri
+
+
+def db_name() -> str:
+    return os.getenv("DB_NAME", DB_NAME_DEFAULT)
+
+
+_lock = threading.Lock()
+_client: MongoClient | None = None
+_async_client: AsyncMongoClient | None = None
+
+
+def get_client() -> MongoClient:
+    """Sync client: scripts, migrations and the transcription worker threads."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = MongoClient(_mongo_uri(), **_client_options())
+                logger.info(f"MongoDB client created for database: {db_name()}")
+    return _client
+
+
+def get_async_client() -> AsyncMongoClient:
+    """Async client: FastAPI route handlers (see backend/db/async_repository.py)."""
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = AsyncMongoClient(_mongo_uri(), **_client_options())
+    return _async_client
+
+
+async def close_clients() -> None:
+    """Close whichever clients were created."""
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+class _LazyCollection:
+    def __init__(self, database: "_LazyDatabase", name: str):
+        self._database = database
+        self._name = name
+        self._client = None
+        self._collection = None
+
+    def __getattr__(self, attr):
+        # Re-resolved only if the client was replaced (closed and recreated)
+        client = self._database.client()
+        if client is not self._client:
+            self._collection = client[db_name()][self._name]
+            self._client = client
+        return getattr(self._collection, attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy collection {self._name}>"
+
+
+class _LazyDatabase:
+    def __init__(self, get_client_func):
+        self.client = get_client_func
+
+    def resolve(self):
+        return self.client()[db_name()]
 
-if not MONGO_URI:
-    logger.error("MONGO_URI is missing from .env file")
-    raise ValueError("MONGO_URI is missing from .env file")
+    def __getitem__(self, name: str) -> _LazyCollection:
+        return _LazyCollection(self, name)
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
+    def __getattr__(self, attr):
+        return getattr(self.resolve(), attr)
 
 
-logger.info(f"Connected to MongoDB database: {DB_NAME}")
+db = _LazyDatabase(get_client)
+async_db = _LazyDatabase(get_async_client)
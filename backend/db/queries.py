@@ -0,0 +1,361 @@
+import base64
+from datetime import datetime
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+
+from backend.db import compact
+
+# Filters, projections and documents shared by repository.py and its async
+# mirror async_repository.py. Everything here is pure: the two modules only
+# add the (sync or async) Mongo call around it, so they cannot drift apart.
+
+# Fields returned by the transcript list when the caller does not ask for more
+TRANSCRIPT_SUMMARY_FIELDS = ("title", "language_code", "speakers", "duration",
+                             "status", "created_at", "confidence")
+TRANSCRIPT_FIELDS = TRANSCRIPT_SUMMARY_FIELDS + ("user_id", "text", "utterances", "notes")
+
+# Documents per cursor batch when streaming every transcript of a user
+EXPORT_BATCH_SIZE = 20
+EXPORT_SORT = [("created_at", 1), ("_id", 1)]
+
+# Owner and version, for access checks and compare-and-swap
+TRANSCRIPT_HEAD_PROJECTION = {"user_id": 1, "version": 1}
+
+# Top-level fields a PATCH may set; text and utterances change through
+# utterance and word edits instead
+TRANSCRIPT_PATCH_FIELDS = ("title", "notes", "language_code", "speakers",
+                           "duration", "status", "confidence")
+
+# What a patch reads before writing: enough to check the indexes and to
+# rebuild the texts derived from the words
+TRANSCRIPT_PATCH_PROJECTION = {"user_id": 1, "version": 1, "utterances.text": 1,
+                               "utterances.words_packed.text": 1, "utterances.words": 1}
+
+# Offset table of a time-range read; transcripts saved before the table
+# existed fall back to the utterance bounds
+RANGE_HEAD_PROJECTION = {"utterance_index": 1, "user_id": 1}
+LEGACY_RANGE_HEAD_PROJECTION = {"utterances.start": 1, "utterances.end": 1, "user_id": 1}
+
+
+def safe_objectid(id_str: str) -> ObjectId | None:
+    try:
+        return ObjectId(id_str)
+    except InvalidId:
+        return None
+
+
+def with_str_ids(doc: dict) -> dict:
+    """Turn _id and a set user_id into strings, in place."""
+    doc["_id"] = str(doc["_id"])
+    if doc.get("user_id") is not None:
+        doc["user_id"] = str(doc["user_id"])
+    return doc
+
+
+def user_upsert(oauth_id: str) -> tuple[dict, dict]:
+    """(filter, update) of create_user; atomic with the unique oauth_id index."""
+    return (
+        {"oauth_id": oauth_id},
+        {"$setOnInsert": {"oauth_id": oauth_id, "created_at": datetime.now()}}
+    )
+
+
+def new_transcript_doc(user_id: ObjectId, text, title, language_code, speakers,
+                       duration, status, utterances, confidence) -> dict:
+    return {
+        "user_id": user_id,
+        "text": text,
+        "title": title,
+        "language_code": language_code,
+        "speakers": speakers,
+        "duration": duration,
+        "status": status,
+        "created_at": datetime.now(),
+        "utterances": compact.encode_utterances(utterances),
+        "utterance_index": compact.build_offset_table(utterances),
+        "confidence": confidence,
+        "notes": "",
+        # Bumped by every update; clients send it back for compare-and-swap
+        "version": 1
+    }
+
+
+def transcript_update_fields(text=None, title=None, language_code=None,
+                             speakers=None, duration=None, status=None,
+                             utterances=None, confidence=None, notes=None) -> dict:
+    update_fields = {}
+
+    if text is not None:
+        update_fields["text"] = text
+
+    if title is not None:
+        update_fields["title"] = title
+
+    if language_code is not None:
+        update_fields["language_code"] = language_code
+
+    if speakers is not None:
+        update_fields["speakers"] = speakers
+
+    if duration is not None:
+        update_fields["duration"] = duration
+
+    if status is not None:
+        update_fields["status"] = status
+
+    if utterances is not None:
+        update_fields["utterances"] = compact.encode_utterances(utterances)
+        update_fields["utterance_index"] = compact.build_offset_table(utterances)
+
+    if confidence is not None:
+        update_fields["confidence"] = confidence
+
+    if notes is not None:
+        update_fields["notes"] = notes
+
+    return update_fields
+
+
+def transcript_update(transcript_id: ObjectId, update_fields: dict,
+                      version: int | None = None) -> tuple[dict, dict]:
+    """(filter, update) replacing whole fields; with version, only if still at it."""
+    query = {"_id": transcript_id}
+    if version is not None:
+        query["version"] = version
+    return query, {"$set": update_fields, "$inc": {"version": 1}}
+
+
+def _join_texts(texts) -> str:
+    return " ".join(text for text in texts if text)
+
+
+def transcript_patch(current: dict, fields: dict, utterances: list[dict],
+                     words: list[dict]) -> tuple[dict, dict] | None:
+    """Build (guard filter, update) for patch_transcript, or None if an edit is invalid.
+
+    Each edit becomes a positional $set on one path, e.g. a word fix is
+    "utterances.3.words_packed.text.7". Texts derived from the words are
+    rebuilt from `current` (the stored document at the patched version) and
+    set by the same update, so the version guard covers them as well.
+    """
+    stored = current.get("utterances") or []
+    guard, set_fields, unset_fields = {}, {}, {}
+    texts, word_texts = {}, {}
+
+    for name, value in fields.items():
+        if name not in TRANSCRIPT_PATCH_FIELDS:
+            return None
+        set_fields[name] = value
+
+    for edit in utterances:
+        i = edit["index"]
+        if not 0 <= i < len(stored):
+            return None
+        guard[f"utterances.{i}"] = {"$exists": True}
+        if edit.get("text") is not None:
+            set_fields[f"utterances.{i}.text"] = texts[i] = edit["text"]
+        if edit.get("speaker") is not None:
+            # Reassigning the utterance reassigns all of its words
+            set_fields[f"utterances.{i}.speaker"] = edit["speaker"]
+            if "words_packed" in stored[i]:
+                set_fields[f"utterances.{i}.words_packed.speaker"] = edit["speaker"]
+                unset_fields[f"utterances.{i}.words_packed.speakers"] = ""
+            for k in range(len(stored[i].get("words") or [])):
+                set_fields[f"utterances.{i}.words.{k}.speaker"] = edit["speaker"]
+
+    for edit in words:
+        i, j = edit["utterance"], edit["index"]
+        if not 0 <= i < len(stored):
+            return None
+        if "words_packed" in stored[i]:
+            column = stored[i]["words_packed"].get("text") or []
+            path = f"utterances.{i}.words_packed.text.{j}"
+        else:
+            column = [word.get("text") for word in stored[i].get("words") or []]
+            path = f"utterances.{i}.words.{j}.text"
+        if not 0 <= j < len(column):
+            return None
+        word_texts.setdefault(i, list(column))[j] = edit["text"]
+        set_fields[path] = edit["text"]
+        guard[path] = {"$exists": True}
+
+    if not set_fields:
+        return None
+
+    for i, column in word_texts.items():
+        if i not in texts:
+            set_fields[f"utterances.{i}.text"] = texts[i] = _join_texts(column)
+    if texts:
+        set_fields["text"] = _join_texts(texts.get(i, u.get("text")) for i, u in enumerate(stored))
+
+    update = {"$set": set_fields, "$inc": {"version": 1}}
+    if unset_fields:
+        update["$unset"] = unset_fields
+
+    return guard, update
+
+
+def patch_filter(transcript_id: ObjectId, user_id: str, version: int, guard: dict) -> dict:
+    """The owner, version and edited paths a patch update must still match."""
+    return {"_id": transcript_id, "user_id": ObjectId(user_id), "version": version, **guard}
+
+
+def patch_refusal(current: dict, user_id: str, version: int) -> dict | None:
+    """Why a patch cannot apply to the stored transcript, or None if it can."""
+    if current["user_id"] != ObjectId(user_id):
+        return {"status": "forbidden", "version": current.get("version", 1)}
+    if current.get("version", 1) != version:
+        return {"status": "conflict", "version": current.get("version", 1)}
+    return None
+
+
+def transcript_head(doc: dict) -> dict:
+    return {"user_id": str(doc["user_id"]), "version": doc.get("version", 1)}
+
+
+def decode_transcript(doc: dict, expand_words: bool = True) -> dict:
+    return compact.decode_document({**doc, "_id": str(doc["_id"]), "user_id": str(doc["user_id"])},
+                                   expand_words=expand_words)
+
+
+def user_transcripts_sort(sort_mode: str) -> int:
+    return 1 if sort_mode.lower() == "ascending" else -1
+
+
+def _encode_cursor(doc: dict) -> str:
+    raw = f"{doc['created_at'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, ObjectId] | None:
+    try:
+        created_at, id_str = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), ObjectId(id_str)
+    except (ValueError, InvalidId):
+        return None
+
+
+def page_query(user_id: ObjectId, cursor: str = None, sort_mode: str = "descending",
+               fields: list[str] = None) -> tuple[dict, dict, list] | None:
+    """Build (filter, projection, sort) for a transcript page, None if invalid."""
+    fields = list(fields) if fields else list(TRANSCRIPT_SUMMARY_FIELDS)
+    if any(field not in TRANSCRIPT_FIELDS for field in fields):
+        return None
+
+    sort_value = user_transcripts_sort(sort_mode)
+
+    query = {"user_id": user_id}
+    if cursor:
+        position = _decode_cursor(cursor)
+        if position is None:
+            return None
+        created_at, last_id = position
+        op = "$gt" if sort_value == 1 else "$lt"
+        query["$or"] = [
+            {"created_at": {op: created_at}},
+            {"created_at": created_at, "_id": {op: last_id}}
+        ]
+
+    projection = {field: 1 for field in fields}
+    projection["created_at"] = 1
+
+    return query, projection, [("created_at", sort_value), ("_id", sort_value)]
+
+
+def page_result(docs: list[dict], limit: int) -> tuple[list[dict], str | None]:
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = _encode_cursor(docs[-1])
+
+    return [compact.decode_document(with_str_ids(doc)) for doc in docs], next_cursor
+
+
+def utterance_projection(index: int) -> dict:
+    # index must not be negative: a negative $slice would count from the end
+    return {"utterances": {"$slice": [index, 1]}, "user_id": 1}
+
+
+def utterance_result(doc: dict | None) -> dict | None:
+    if not doc or not doc.get("utterances"):
+        return None
+
+    utterance = compact.decode_utterances(doc["utterances"])[0]
+    utterance["user_id"] = str(doc["user_id"])
+    return utterance
+
+
+def range_bounds(head: dict, t_start: int, t_end: int) -> tuple[int, int]:
+    table = head.get("utterance_index")
+    if table is None:
+        table = compact.build_offset_table(head.get("utterances") or [])
+        if table is None:
+            return 0, 0
+    return compact.utterance_range(table, t_start, t_end)
+
+
+def range_projection(first: int, last: int) -> dict:
+    return {"utterances": {"$slice": [first, last - first]}, "user_id": 1}
+
+
+def range_result(doc: dict, first: int, t_start: int, t_end: int) -> dict:
+    utterances = []
+    for utterance in doc.get("utterances") or []:
+        words = compact.words_in_range(utterance, t_start, t_end)
+        utterance = {k: v for k, v in utterance.items() if k not in ("words", "words_packed")}
+        utterance["words"] = words
+        utterances.append(utterance)
+
+    return {
+        "transcript_id": str(doc["_id"]),
+        "user_id": str(doc["user_id"]),
+        "t_start": t_start,
+        "t_end": t_end,
+        "first_index": first,
+        "utterances": utterances
+    }
+
+
+def job_projection(include_result: bool) -> dict | None:
+    return None if include_result else {"result": 0}
+
+
+def decode_job(doc: dict) -> dict:
+    with_str_ids(doc)
+    if doc.get("result") is not None:
+        doc["result"] = compact.decode_document(doc["result"])
+    return doc
+
+
+def claimable_jobs_query(now: datetime) -> tuple[dict, list]:
+    """Filter and sort of claim_job; migrations --check explains the same query."""
+    return (
+        {"status": {"$in": ["queued", "processing"]}, "batch_id": None,
+         "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+        [("created_at", 1)]
+    )
+
+
+def claimable_batches_query(now: datetime) -> dict:
+    """Filter of claim_batch, shared with migrations --check."""
+    return {"status": "running", "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]}
+
+
+def live_turns_update(turns: list[dict], user_id: str | None) -> dict:
+    """Append turns to a live session, creating it on the first flush."""
+    now = datetime.now()
+    return {
+        "$push": {"turns": {"$each": turns}},
+        "$set": {"updated_at": now},
+        "$setOnInsert": {"user_id": safe_objectid(user_id) if user_id else None,
+                         "status": "active", "created_at": now}
+    }
+
+
+def live_session_end_update(fields: dict) -> dict:
+    now = datetime.now()
+    return {
+        "$set": {**fields, "status": "ended", "ended_at": now, "updated_at": now},
+        "$setOnInsert": {"turns": [], "created_at": now}
+    }
@@ -1,38 +1,47 @@
-from datetime import datetime
+from typing import Iterator
+from datetime import datetime, timedelta
 from bson.objectid import ObjectId
-from bson.errors import InvalidId
+from pymongo import ReturnDocument
 from backend.db.mongodb_setup import db
+from backend.db import compact, queries, search
+from backend.db.transcript_cache import CachedTranscript, cache as transcript_cache
 
+from backend.utils import metrics
 from backend.utils.logger import logger
 
-def _safe_objectid(id_str: str) -> ObjectId | None:
-    try:
-        return ObjectId(id_str)
-    except InvalidId:
-        return None
-
 # 'Primary key': oauthid
 users_collection = db["users"]
 
 # Foreign key is oauthid
 transcripts_collection = db["transcripts"]
 
-def create_user(oauth_id: str) -> str:
-    existing = users_collection.find_one({"oauth_id": oauth_id})
-    if existing:
-        return str(existing["_id"])
+# Incrementally persisted live sessions (see backend/utils/live_persistence.py)
+live_sessions_collection = db["live_sessions"]
 
-    doc = {
-        "oauth_id": oauth_id,
-        "created_at": datetime.now()
-    }
+# Background transcription jobs (see backend/utils/jobs.py)
+jobs_collection = db["transcription_jobs"]
 
-    result = users_collection.insert_one(doc)
-    logger.info("User created.")
-    return str(result.inserted_id)
+# Content-addressed transcription results (see backend/utils/result_cache.py)
+cache_collection = db["transcription_cache"]
+
+# Multi-file transcription batches (see backend/utils/batches.py)
+batches_collection = db["transcription_batches"]
+
+def create_user(oauth_id: str) -> str:
+    # Atomic upsert: with the unique oauth_id index two concurrent logins
+    # cannot create the same user twice.
+    query, update = queries.user_upsert(oauth_id)
+    doc = users_collection.find_one_and_update(
+        query,
+        update,
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+    return str(doc["_id"])
 
 def update_user(user_id: str, oauth_id: str = None) -> bool:
-    user_id = _safe_objectid(user_id)
+    user_id = queries.safe_objectid(user_id)
     if not user_id:
         return False
 
@@ -62,7 +71,7 @@ def get_user_by_oauth(oauth_id: str) -> dict | None:
     return doc
 
 def get_user_by_id(user_id: str) -> dict | None:
-    user_id = _safe_objectid(user_id)
+    user_id = queries.safe_objectid(user_id)
     if not user_id:
         return None
 
@@ -73,12 +82,13 @@ def get_user_by_id(user_id: str) -> dict | None:
     return doc
 
 def delete_user(user_id: str) -> bool:
-    user_id = _safe_objectid(user_id)
+    user_id = queries.safe_objectid(user_id)
     if not user_id:
         return False
 
     user_result = users_collection.delete_one({"_id": user_id})
     _ = transcripts_collection.delete_many({"user_id": user_id})
+    transcript_cache.invalidate_user(str(user_id))
 
     logger.info("User deleted.")
 
@@ -94,23 +104,12 @@ def create_transcript(user_id: str,
                       status: str,
                       utterances,
                       confidence: float) -> str | None:
-    user_id = _safe_objectid(user_id)
+    user_id = queries.safe_objectid(user_id)
     if not user_id:
         return None
 
-    doc = {
-        "user_id": user_id,
-        "text": text,
-        "title": title,
-        "language_code": language_code,
-        "speakers": speakers,
-        "duration": duration,
-        "status": status,
-        "created_at": datetime.now(),
-        "utterances": utterances,
-        "confidence": confidence,
-        "notes": ""
-    }
+    doc = queries.new_transcript_doc(user_id, text, title, language_code, speakers,
+                                     duration, status, utterances, confidence)
     
     result = transcripts_collection.insert_one(doc)
 
@@ -121,88 +120,496 @@ def create_transcript(user_id: str,
 def update_transcript(transcript_id: str, text: str = None, title: str = None,
                       language_code: str = None, speakers: int = None,
                       duration: str = None, status: str = None, utterances =  None,
-                      confidence = None, notes = None) -> bool:
-    transcript_id = _safe_objectid(transcript_id)
+                      confidence = None, notes = None, version: int = None) -> bool:
+    """Replace whole fields. With version set, only if the transcript is still at it."""
+    transcript_id = queries.safe_objectid(transcript_id)
     if not transcript_id:
         return False
 
-    update_fields = {}
+    update_fields = queries.transcript_update_fields(
+        text=text, title=title, language_code=language_code, speakers=speakers,
+        duration=duration, status=status, utterances=utterances,
+        confidence=confidence, notes=notes
+    )
 
-    if text is not None:
-        update_fields["text"] = text
+    if not update_fields:
+        return False
 
-    if title is not None:
-        update_fields["title"] = title
+    query, update = queries.transcript_update(transcript_id, update_fields, version)
+    result = transcripts_collection.update_one(query, update)
+    transcript_cache.invalidate(str(transcript_id))
 
-    if language_code is not None:
-        update_fields["language_code"] = language_code
+    logger.info(f"Transcription updated: {transcript_id}.")
 
-    if speakers is not None:
-        update_fields["speakers"] = speakers
+    return result.modified_count > 0
 
-    if duration is not None:
-        update_fields["duration"] = duration
-    
-    if status is not None:
-        update_fields["status"] = status
+def patch_transcript(transcript_id: str, user_id: str, version: int, fields: dict = None,
+                     utterances: list[dict] = None, words: list[dict] = None) -> dict | None:
+    """Apply small edits with positional $set if the transcript is still at version.
 
-    if utterances is not None:
-        update_fields["utterances"] = utterances
+    utterances: [{"index", "text"?, "speaker"?}], words: [{"utterance", "index", "text"}].
+    An utterance whose words change without a new text gets its text rebuilt
+    from the words, and the transcript text from the utterances.
 
-    if confidence is not None:
-        update_fields["confidence"] = confidence
+    Returns {"status": "ok" | "conflict" | "forbidden" | "invalid", "version": ...},
+    or None when the transcript does not exist.
+    """
+    oid = queries.safe_objectid(transcript_id)
+    if not oid or not queries.safe_objectid(user_id):
+        return None
 
-    if notes is not None:
-        update_fields["notes"] = notes
+    current = transcripts_collection.find_one({"_id": oid}, queries.TRANSCRIPT_PATCH_PROJECTION)
+    if current is None:
+        return None
+    refusal = queries.patch_refusal(current, user_id, version)
+    if refusal is not None:
+        return refusal
 
-    if not update_fields:
-        return False
-    
-    result = transcripts_collection.update_one(
-        {"_id": transcript_id},
-        {"$set": update_fields}
-    )
+    patch = queries.transcript_patch(current, fields or {}, utterances or [], words or [])
+    if patch is None:
+        return {"status": "invalid", "version": version}
+    guard, update = patch
 
-    logger.info(f"Transcription updated: {transcript_id}.")
+    result = transcripts_collection.update_one(queries.patch_filter(oid, user_id, version, guard), update)
 
-    return result.modified_count > 0
+    if not result.matched_count:
+        # Written by someone else between the read and the update
+        current = transcripts_collection.find_one({"_id": oid}, queries.TRANSCRIPT_HEAD_PROJECTION)
+        if current is None:
+            return None
+        return queries.patch_refusal(current, user_id, version) or {"status": "invalid", "version": version}
+
+    transcript_cache.invalidate(str(oid))
+
+    logger.info(f"Transcription patched: {oid}, version {version + 1}.")
+
+    return {"status": "ok", "version": version + 1}
+
+def get_transcript_head(transcript_id: str) -> dict | None:
+    """Owner and version of a transcript, without loading its content."""
+    transcript_id = queries.safe_objectid(transcript_id)
+    if not transcript_id:
+        return None
+
+    doc = transcripts_collection.find_one({"_id": transcript_id}, queries.TRANSCRIPT_HEAD_PROJECTION)
+    if not doc:
+        return None
+
+    return queries.transcript_head(doc)
 
 def get_transcripts_for_user(user_id: str, sort_mode: str = "descending") -> list[dict] | None:
-    user_id = _safe_objectid(user_id)
+    user_id = queries.safe_objectid(user_id)
     if not user_id:
         return None
 
-    sort_value = -1
-    if sort_mode.lower() == "ascending":
-        sort_value = 1
-
-    docs = transcripts_collection.find({"user_id": user_id}).sort("created_at", sort_value)
+    docs = transcripts_collection.find({"user_id": user_id}).sort(
+        "created_at", queries.user_transcripts_sort(sort_mode)
+    )
 
     logger.info("Transcriptions are collected for the user.")
 
-    return [{**doc, "_id": str(doc["_id"]), "user_id": str(doc["user_id"])} for doc in docs]
+    return [queries.decode_transcript(doc) for doc in docs]
 
-def get_transcript_by_id(transcript_id: str) -> dict | None:
-    transcript_id = _safe_objectid(transcript_id)
-    if not transcript_id:
+def _decoded_transcripts(cursor) -> Iterator[dict]:
+    try:
+        for doc in cursor:
+            yield queries.decode_transcript(doc)
+    finally:
+        cursor.close()
+
+def iter_transcripts_for_user(user_id: str) -> Iterator[dict] | None:
+    """Every transcript of the user, oldest first, read batch by batch.
+
+    For exports: unlike get_transcripts_for_user it never holds more than
+    one cursor batch in memory. None for an invalid user ID.
+    """
+    user_id = queries.safe_objectid(user_id)
+    if not user_id:
         return None
-    
-    doc = transcripts_collection.find_one({"_id": transcript_id}) 
 
-    if doc:
-        doc["_id"] = str(doc["_id"])
-        doc["user_id"] = str(doc["user_id"])
+    cursor = transcripts_collection.find({"user_id": user_id}).sort(
+        queries.EXPORT_SORT
+    ).batch_size(queries.EXPORT_BATCH_SIZE)
+    return _decoded_transcripts(cursor)
+
+def get_transcripts_page(user_id: str, limit: int = 20, cursor: str = None,
+                         sort_mode: str = "descending",
+                         fields: list[str] = None) -> tuple[list[dict], str | None] | None:
+    """Keyset-paginated transcript list ordered on (created_at, _id).
+
+    Returns the page and the cursor of the next one (None on the last page).
+    Only the summary fields are loaded unless fields asks for more.
+    Returns None for an invalid user ID, cursor or field name.
+    """
+    user_id = queries.safe_objectid(user_id)
+    if not user_id:
+        return None
+
+    page_query = queries.page_query(user_id, cursor, sort_mode, fields)
+    if page_query is None:
+        return None
+    query, projection, sort = page_query
+
+    docs = list(transcripts_collection.find(query, projection).sort(sort).limit(limit + 1))
+
+    return queries.page_result(docs, limit)
+
+def search_transcripts(user_id: str, query: str, limit: int = 10) -> list[dict] | None:
+    """Ranked full-text search over the user's transcripts (see backend/db/search.py)."""
+    user_id = queries.safe_objectid(user_id)
+    if not user_id or not search.query_terms(query):
+        return None
+
+    docs = transcripts_collection.find(
+        search.search_filter(user_id, query), search.SEARCH_PROJECTION
+    ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+
+    return [search.build_result(doc, query) for doc in docs]
+
+def _load_transcript(transcript_id: ObjectId, expand_words: bool) -> dict | None:
+    doc = transcripts_collection.find_one({"_id": transcript_id})
+
+    return queries.decode_transcript(doc, expand_words) if doc else None
+
+def get_transcript_by_id(transcript_id: str, expand_words: bool = True) -> dict | None:
+    """With expand_words=False utterances keep their packed word columns;
+    expand them one at a time with compact.utterance_words().
+
+    Expanded reads go through the in-process transcript cache."""
+    oid = queries.safe_objectid(transcript_id)
+    if not oid:
+        return None
 
+    if not expand_words:
+        return _load_transcript(oid, expand_words=False)
 
+    entry = transcript_cache.get(str(oid))
+    if entry is not None:
+        return entry.document()
+
+    generation = transcript_cache.generation()
+    doc = _load_transcript(oid, expand_words=True)
+    if doc:
+        transcript_cache.put(doc, generation)
     return doc
 
+def get_transcript_entry(transcript_id: str) -> CachedTranscript | None:
+    """Serialized transcript and its ETag, for conditional GETs."""
+    oid = queries.safe_objectid(transcript_id)
+    if not oid:
+        return None
+
+    entry = transcript_cache.get(str(oid))
+    if entry is not None:
+        return entry
+
+    generation = transcript_cache.generation()
+    doc = _load_transcript(oid, expand_words=True)
+    return transcript_cache.put(doc, generation) if doc else None
+
+def get_transcript_utterance(transcript_id: str, index: int) -> dict | None:
+    """Load and expand a single utterance without reading the others."""
+    transcript_id = queries.safe_objectid(transcript_id)
+    # A negative $slice would count from the end
+    if not transcript_id or index < 0:
+        return None
+
+    doc = transcripts_collection.find_one({"_id": transcript_id}, queries.utterance_projection(index))
+
+    return queries.utterance_result(doc)
+
+def get_transcript_range(transcript_id: str, t_start: int, t_end: int) -> dict | None:
+    """Utterances and words overlapping [t_start, t_end) ms.
+
+    Reads the small "utterance_index" offset table first, binary-searches it
+    and then loads just the matching utterances with $slice.
+    """
+    transcript_id = queries.safe_objectid(transcript_id)
+    if not transcript_id:
+        return None
+
+    head = transcripts_collection.find_one({"_id": transcript_id}, queries.RANGE_HEAD_PROJECTION)
+    if not head:
+        return None
+
+    if head.get("utterance_index") is None:
+        # Transcript saved before the offset table existed
+        head = transcripts_collection.find_one({"_id": transcript_id}, queries.LEGACY_RANGE_HEAD_PROJECTION)
+        if not head:
+            return None
+
+    first, last = queries.range_bounds(head, t_start, t_end)
+    if last == first:
+        # Nothing overlaps, no need to read utterances
+        return queries.range_result({"_id": transcript_id, "user_id": head["user_id"]}, first, t_start, t_end)
+
+    doc = transcripts_collection.find_one({"_id": transcript_id}, queries.range_projection(first, last))
+    if not doc:
+        # Deleted between the two reads
+        return None
+
+    return queries.range_result(doc, first, t_start, t_end)
+
 def delete_transcript(transcript_id: str) -> bool:
-    transcript_id = _safe_objectid(transcript_id)
+    transcript_id = queries.safe_objectid(transcript_id)
     if not transcript_id:
         return False
     
     transcript_result = transcripts_collection.delete_one({"_id": transcript_id})
+    transcript_cache.invalidate(str(transcript_id))
 
     logger.info(f"Transcription deleted: {transcript_id}.")
 
-    return transcript_result.deleted_count > 0
\ No newline at end of file
+    return transcript_result.deleted_count > 0
+
+def create_job(params: dict, file_path: str, filename: str | None = None,
+               chunked: bool = False, owner: str | None = None,
+               lease_until: datetime | None = None, batch_id: str | None = None,
+               user_id: str | None = None) -> str:
+    now = datetime.now()
+    doc = {
+        # Only this user can read the job and its result
+        "user_id": queries.safe_objectid(user_id) if user_id else None,
+        "status": "queued",
+        "params": params,
+        "file_path": file_path,
+        "filename": filename,
+        "chunked": chunked,
+        "owner": owner,
+        "lease_until": lease_until,
+        # Batch files are resumed with their batch, not as jobs
+        "batch_id": batch_id,
+        "created_at": now,
+        "updated_at": now,
+        "result": None,
+        "error": None
+    }
+
+    result = jobs_collection.insert_one(doc)
+    logger.info(f"Transcription job queued: {result.inserted_id}.")
+    return str(result.inserted_id)
+
+def update_job(job_id: str, **fields) -> bool:
+    job_id = queries.safe_objectid(job_id)
+    if not job_id or not fields:
+        return False
+
+    if fields.get("result") is not None:
+        fields["result"] = compact.encode_document(fields["result"])
+
+    fields["updated_at"] = datetime.now()
+    if fields.get("status") in ("completed", "error"):
+        # Finished jobs expire through the finished_at TTL index
+        fields["finished_at"] = fields["updated_at"]
+    result = jobs_collection.update_one(
+        {"_id": job_id},
+        {"$set": fields}
+    )
+
+    return result.modified_count > 0
+
+def get_job(job_id: str, include_result: bool = True) -> dict | None:
+    job_id = queries.safe_objectid(job_id)
+    if not job_id:
+        return None
+
+    doc = jobs_collection.find_one({"_id": job_id}, queries.job_projection(include_result))
+
+    return queries.decode_job(doc) if doc else None
+
+def claim_job(owner: str, lease_until: datetime) -> dict | None:
+    """Take over the oldest unfinished job whose lease ran out (or that never had one).
+
+    Atomic, so of several workers starting at once each job goes to one.
+    """
+    now = datetime.now()
+    query, sort = queries.claimable_jobs_query(now)
+    doc = jobs_collection.find_one_and_update(
+        query,
+        {"$set": {"owner": owner, "lease_until": lease_until, "updated_at": now}},
+        sort=sort,
+        return_document=ReturnDocument.AFTER
+    )
+
+    if doc:
+        doc["_id"] = str(doc["_id"])
+    return doc
+
+def renew_job_leases(owner: str, job_ids: list[str], lease_until: datetime) -> int:
+    ids = [oid for oid in map(queries.safe_objectid, job_ids) if oid]
+    if not ids:
+        return 0
+
+    result = jobs_collection.update_many(
+        {"_id": {"$in": ids}, "owner": owner},
+        {"$set": {"lease_until": lease_until}}
+    )
+    return result.modified_count
+
+def release_job_leases(owner: str, job_ids: list[str]) -> int:
+    """Let another worker claim these jobs right away if they never started (on shutdown)."""
+    ids = [oid for oid in map(queries.safe_objectid, job_ids) if oid]
+    if not ids:
+        return 0
+
+    result = jobs_collection.update_many(
+        {"_id": {"$in": ids}, "owner": owner, "status": "queued"},
+        {"$set": {"lease_until": None}}
+    )
+    return result.modified_count
+
+def get_cached_transcription(key: str, max_age: timedelta) -> dict | None:
+    now = datetime.now()
+    doc = cache_collection.find_one_and_update(
+        {"_id": key, "created_at": {"$gte": now - max_age}},
+        {"$set": {"last_hit_at": now}, "$inc": {"hits": 1}}
+    )
+
+    if doc:
+        return compact.decode_document(doc["result"])
+    return None
+
+def store_cached_transcription(key: str, result: dict) -> None:
+    now = datetime.now()
+    cache_collection.update_one(
+        {"_id": key},
+        {"$set": {"result": compact.encode_document(result), "created_at": now, "last_hit_at": now},
+         "$setOnInsert": {"hits": 0}},
+        upsert=True
+    )
+
+def evict_cached_transcriptions(max_entries: int, max_age: timedelta) -> int:
+    """Drop expired entries, then the least recently hit ones above max_entries."""
+    result = cache_collection.delete_many({"created_at": {"$lt": datetime.now() - max_age}})
+    evicted = result.deleted_count
+
+    excess = cache_collection.count_documents({}) - max_entries
+    if excess > 0:
+        stale = cache_collection.find({}, {"_id": 1}).sort("last_hit_at", 1).limit(excess)
+        result = cache_collection.delete_many({"_id": {"$in": [doc["_id"] for doc in stale]}})
+        evicted += result.deleted_count
+
+    return evicted
+
+def count_cached_transcriptions() -> int:
+    return cache_collection.estimated_document_count()
+
+def append_live_turns(session_id: str, turns: list[dict], user_id: str = None) -> bool:
+    session_id = queries.safe_objectid(session_id)
+    if not session_id or not turns:
+        return False
+
+    result = live_sessions_collection.update_one(
+        {"_id": session_id},
+        queries.live_turns_update(turns, user_id),
+        upsert=True
+    )
+
+    return result.acknowledged
+
+def end_live_session(session_id: str, **fields) -> bool:
+    session_id = queries.safe_objectid(session_id)
+    if not session_id:
+        return False
+
+    result = live_sessions_collection.update_one(
+        {"_id": session_id},
+        queries.live_session_end_update(fields),
+        upsert=True
+    )
+
+    logger.info(f"Live session ended: {session_id}.")
+
+    return result.acknowledged
+
+def get_live_session(session_id: str) -> dict | None:
+    session_id = queries.safe_objectid(session_id)
+    if not session_id:
+        return None
+
+    doc = live_sessions_collection.find_one({"_id": session_id})
+
+    return queries.with_str_ids(doc) if doc else None
+
+def create_batch(user_id: str, params: dict, files: list[tuple[str, str]], concurrency: int,
+                 owner: str | None = None, lease_until: datetime | None = None) -> str:
+    now = datetime.now()
+    doc = {
+        "user_id": queries.safe_objectid(user_id),
+        "status": "running",
+        "params": params,
+        "concurrency": concurrency,
+        "owner": owner,
+        "lease_until": lease_until,
+        "items": [
+            {"filename": filename, "file_path": file_path, "status": "queued", "job_id": None,
+             "upstream_id": None, "transcript_id": None, "error": None}
+            for file_path, filename in files
+        ],
+        "created_at": now,
+        "updated_at": now
+    }
+
+    result = batches_collection.insert_one(doc)
+    logger.info(f"Transcription batch created: {result.inserted_id} ({len(files)} files).")
+    return str(result.inserted_id)
+
+def update_batch_item(batch_id: str, index: int, **fields) -> bool:
+    batch_id = queries.safe_objectid(batch_id)
+    if not batch_id or not fields:
+        return False
+
+    update = {f"items.{index}.{key}": value for key, value in fields.items()}
+    update["updated_at"] = datetime.now()
+    result = batches_collection.update_one({"_id": batch_id}, {"$set": update})
+
+    return result.modified_count > 0
+
+def update_batch(batch_id: str, **fields) -> bool:
+    batch_id = queries.safe_objectid(batch_id)
+    if not batch_id or not fields:
+        return False
+
+    fields["updated_at"] = datetime.now()
+    result = batches_collection.update_one({"_id": batch_id}, {"$set": fields})
+
+    return result.modified_count > 0
+
+def claim_batch(owner: str, lease_until: datetime) -> dict | None:
+    """Take over a running batch whose lease ran out; see claim_job."""
+    now = datetime.now()
+    doc = batches_collection.find_one_and_update(
+        queries.claimable_batches_query(now),
+        {"$set": {"owner": owner, "lease_until": lease_until, "updated_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+
+    if doc:
+        doc["_id"] = str(doc["_id"])
+    return doc
+
+def renew_batch_leases(owner: str, batch_ids: list[str], lease_until: datetime) -> int:
+    ids = [oid for oid in map(queries.safe_objectid, batch_ids) if oid]
+    if not ids:
+        return 0
+
+    result = batches_collection.update_many(
+        {"_id": {"$in": ids}, "owner": owner},
+        {"$set": {"lease_until": lease_until}}
+    )
+    return result.modified_count
+
+def release_batch_leases(owner: str, batch_ids: list[str]) -> int:
+    """Let another worker claim these batches right away (on shutdown)."""
+    ids = [oid for oid in map(queries.safe_objectid, batch_ids) if oid]
+    if not ids:
+        return 0
+
+    result = batches_collection.update_many(
+        {"_id": {"$in": ids}, "owner": owner, "status": "running"},
+        {"$set": {"lease_until": None}}
+    )
+    return result.modified_count
+
+# Per-call timings for /metrics
+metrics.instrument_repository(globals(), "sync")
@@ -0,0 +1,108 @@
+import re
+
+from backend.db import compact
+
+# Full-text search over title/text/notes is done by the "transcript_text" Mongo
+# text index (migration 4); this module turns the matching documents into
+# ranked hits with snippets and the audio timestamps of the matching words.
+
+SNIPPET_CHARS = 80
+MAX_HITS_PER_TRANSCRIPT = 20
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Only the parts of a transcript needed to locate hits; the word columns are
+# read straight from the packed layout without expanding every word.
+SEARCH_PROJECTION = {
+    "score": {"$meta": "textScore"},
+    "title": 1,
+    "notes": 1,
+    "text": 1,
+    "created_at": 1,
+    "utterances.text": 1,
+    "utterances.start": 1,
+    "utterances.end": 1,
+    "utterances.speaker": 1,
+    "utterances.words_packed": 1,
+    "utterances.words": 1,
+}
+
+
+def query_terms(query: str) -> list[str]:
+    return [token.lower() for token in _TOKEN_RE.findall(query)]
+
+
+def search_filter(user_id, query: str) -> dict:
+    return {"user_id": user_id, "$text": {"$search": query}}
+
+
+def _snippet(text: str, terms: list[str]) -> str:
+    lowered = text.lower()
+    positions = [p for p in (lowered.find(term) for term in terms) if p >= 0]
+    if not positions:
+        return text[:SNIPPET_CHARS * 2]
+
+    start = max(0, min(positions) - SNIPPET_CHARS)
+    end = min(len(text), min(positions) + SNIPPET_CHARS)
+    return ("…" if start > 0 else "") + text[start:end] + ("…" if end < len(text) else "")
+
+
+def _word_hits(utterance: dict, terms: set[str]) -> list[dict]:
+    if "words_packed" in utterance:
+        packed = utterance["words_packed"]
+        texts = packed["text"]
+        matching = [i for i, text in enumerate(texts) if _matches(text, terms)]
+        if not matching:
+            return []
+        starts = compact.word_starts(packed)
+        return [{"text": texts[i], "start": starts[i]} for i in matching]
+
+    return [{"text": word.get("text"), "start": word.get("start")}
+            for word in utterance.get("words") or [] if _matches(word.get("text"), terms)]
+
+
+def _matches(word: str | None, terms: set[str]) -> bool:
+    if not word:
+        return False
+    return any(token.lower() in terms for token in _TOKEN_RE.findall(word))
+
+
+def build_result(doc: dict, query: str) -> dict:
+    """Convert a $text match into {transcript, score, snippet, hits}."""
+    terms = query_terms(query)
+    term_set = set(terms)
+
+    hits = []
+    for index, utterance in enumerate(doc.get("utterances") or []):
+        if not isinstance(utterance, dict):
+            continue
+        words = _word_hits(utterance, term_set)
+        if not words and not term_set & set(query_terms(utterance.get("text") or "")):
+            continue
+        hits.append({
+            "utterance_index": index,
+            "speaker": utterance.get("speaker"),
+            "start": words[0]["start"] if words else utterance.get("start"),
+            "end": utterance.get("end"),
+            "snippet": _snippet(utterance.get("text") or "", terms),
+            "words": words,
+        })
+        if len(hits) >= MAX_HITS_PER_TRANSCRIPT:
+            break
+
+    snippet = hits[0]["snippet"] if hits else ""
+    if not hits:
+        for field in ("text", "notes", "title"):
+            value = doc.get(field) or ""
+            if term_set & set(query_terms(value)):
+                snippet = _snippet(value, terms)
+                break
+
+    return {
+        "transcript_id": str(doc["_id"]),
+        "title": doc.get("title"),
+        "created_at": doc.get("created_at"),
+        "score": doc.get("score"),
+        "snippet": snippet,
+        "hits": hits,
+    }
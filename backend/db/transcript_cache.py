@@ -0,0 +1,172 @@
+# In-process read-through cache for whole transcripts, used by both
+# repository modules. Entries hold the serialized JSON body and its ETag, so
+# the detail route can answer a conditional GET with 304, or a plain GET with
+# the stored bytes, without touching Mongo or re-encoding the document.
+#
+# Writes through the repository invalidate the entry. Writes from another
+# worker process cannot, so entries also expire after TRANSCRIPT_CACHE_TTL_SECONDS.
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+MAX_BYTES = int(float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "64")) * 1024 * 1024)
+TTL_SECONDS = float(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", "300"))
+
+# Rough per-entry bookkeeping cost on top of the body
+_ENTRY_OVERHEAD = 200
+
+try:
+    import orjson
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=str)
+
+    loads = orjson.loads
+except ImportError:  # orjson is optional, fall back to the stdlib codec
+    def _default(value):
+        return value.isoformat() if isinstance(value, datetime) else str(value)
+
+    _encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default)
+
+    def dumps(obj) -> bytes:
+        return _encoder.encode(obj).encode()
+
+    loads = json.loads
+
+
+def etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, current: str) -> bool:
+    """If-None-Match check; weak validators compare equal to strong ones."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+
+
+@dataclass(slots=True)
+class CachedTranscript:
+    transcript_id: str
+    user_id: str
+    body: bytes
+    etag: str
+    stored_at: float
+    # Top-level fields that were datetimes before serialization
+    datetime_fields: tuple[str, ...] = ()
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + _ENTRY_OVERHEAD
+
+    def document(self) -> dict:
+        """A fresh dict per call, so callers may modify it.
+
+        Datetimes are restored, so a hit has the same types as a Mongo read.
+        """
+        doc = loads(self.body)
+        for key in self.datetime_fields:
+            doc[key] = datetime.fromisoformat(doc[key])
+        return doc
+
+
+class TranscriptCache:
+    """LRU bounded by the total size of the cached JSON bodies."""
+
+    def __init__(self, max_bytes: int = MAX_BYTES, ttl_seconds: float = TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, CachedTranscript] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a read that started before one must
+        # not store what it fetched, it may predate the write
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, transcript_id: str) -> CachedTranscript | None:
+        with self._lock:
+            entry = self._entries.get(transcript_id)
+            if entry is not None and time.monotonic() - entry.stored_at > self.ttl_seconds:
+                self._remove(transcript_id)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(transcript_id)
+            self.hits += 1
+            return entry
+
+    def put(self, doc: dict, generation: int) -> CachedTranscript:
+        """Serialize a decoded transcript and cache it when it fits.
+
+        Returns the entry either way, so the caller can use its body and ETag.
+        """
+        body = dumps(doc)
+        entry = CachedTranscript(doc["_id"], doc["user_id"], body, etag(body), time.monotonic(),
+                                 tuple(k for k, v in doc.items() if isinstance(v, datetime)))
+
+        with self._lock:
+            if generation != self._generation or entry.size > self.max_bytes:
+                return entry
+
+            self._remove(entry.transcript_id)
+            self._entries[entry.transcript_id] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, transcript_id: str) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._remove(transcript_id):
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            self._generation += 1
+            for transcript_id in [k for k, v in self._entries.items() if v.user_id == user_id]:
+                self._remove(transcript_id)
+                self.invalidations += 1
+
+    def _remove(self, transcript_id: str) -> bool:
+        entry = self._entries.pop(transcript_id, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+cache = TranscriptCache()
@@ -1,35 +1,104 @@
-from fastapi import FastAPI
-from .routes.auth import router as auth_router
-from .routes.transcribe import router as transcribe_router
+import time
 
-from fastapi import FastAPI
+# Reference point for the app_startup_seconds metric
+IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from .utils import metrics
 
 # Import unified API router
 # from api import router as api_router
 
 
-app = FastAPI(
-    title="Szoftverarchitektúrák transcription API",
-    description="Speech-to-text transcription with speaker diarization using AssemblyAI",
-    version="1.0.0",
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from .db import mongodb_setup
+    from .utils import batches, jobs
+    from .utils.http_client import close_http_client
+    from .utils.streaming_tokens import token_pool
+    from .utils.warmup import WarmUp
+
+    # Adatbázis, migrációk, tokenek: a háttérben, a /health/ready jelzi a végét
+    app.state.warmup = WarmUp(IMPORT_STARTED)
+    app.state.warmup.start()
+    yield
+    await app.state.warmup.stop()
+    await token_pool.close()
+    await close_http_client()
+    batches.shutdown()
+    jobs.shutdown()
+    await mongodb_setup.close_clients()
+
+
+def create_app() -> FastAPI:
+    """Build the app; no database connection is made until the lifespan starts.
+
+    Also usable as `uvicorn --factory backend.main:create_app`.
+    """
+    from .routes.auth import router as auth_router
+    from .routes.transcribe import router as transcribe_router
+    from .utils.logger import RequestContextMiddleware
+
+    app = FastAPI(
+        title="Szoftverarchitektúrák transcription API",
+        description="Speech-to-text transcription with speaker diarization using AssemblyAI",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+
+    # Include unified API routes
+    # app.include_router(api_router)
+
+    app.add_middleware(metrics.MetricsMiddleware, started=IMPORT_STARTED)
+    app.add_middleware(RequestContextMiddleware)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Auth route-ok regisztrálása
+    app.include_router(auth_router)
+    app.include_router(transcribe_router)
+
+    @app.get("/")
+    def main():
+        return {"message": "Backend is running"}
+
+    # Liveness: the process and its event loop respond
+    @app.get("/health/live", include_in_schema=False)
+    def liveness():
+        return {"status": "ok"}
+
+    # Readiness: warm-up finished (database reachable, migrations applied)
+    @app.get("/health/ready", include_in_schema=False)
+    def readiness():
+        warmup = getattr(app.state, "warmup", None)
+        status = warmup.status() if warmup else {"ready": False, "checks": {}}
+        return JSONResponse(status, status_code=200 if status["ready"] else 503)
 
-# Include unified API routes
-# app.include_router(api_router)
+    # Prometheus metrikák
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        content, content_type = metrics.render()
+        return Response(content=content, media_type=content_type)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    metrics.record_startup("import", IMPORT_STARTED)
+    return app
 
-# Auth route-ok regisztrálása
-app.include_router(auth_router)
-app.include_router(transcribe_router)
 
-@app.get("/")
-def main():
-    return {"message": "Backend is running"}
\ No newline at end of file
+def __getattr__(name: str):
+    # `uvicorn backend.main:app` keeps working, but the app (and every route
+    # module) is only built when something asks for it
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,22 +1,15 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import RedirectResponse, JSONResponse
-import google_auth_oauthlib.flow
-import requests
 import os
-from dotenv import load_dotenv
-import backend.db.repository as db
+import backend.db.async_repository as db
 import backend.db.models as dbmodels
 import json
 import base64
+from functools import lru_cache
 from backend.utils.logger import logger
 
-load_dotenv()
-
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
-CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
-REDIRECT_URI = os.getenv("REDIRECT_URI")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 
 SCOPES = [
@@ -25,18 +18,32 @@ SCOPES = [
     "https://www.googleapis.com/auth/userinfo.profile",
 ]
 
-CLIENT_CONFIG = {
-    "web": {
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-        "token_uri": "https://oauth2.googleapis.com/token",
-        "redirect_uris": [REDIRECT_URI],
+
+@lru_cache(maxsize=1)
+def _client_config() -> dict:
+    """Google OAuth client config, built on the first login rather than at import."""
+    # Csak lokális fejlesztéshez – engedélyezett HTTP
+    os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
+
+    return {
+        "web": {
+            "client_id": os.getenv("GOOGLE_CLIENT_ID"),
+            "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
+            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+            "token_uri": "https://oauth2.googleapis.com/token",
+            "redirect_uris": [os.getenv("REDIRECT_URI")],
+        }
     }
-}
 
-# Csak lokális fejlesztéshez – engedélyezett HTTP
-os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
+
+def _oauth_flow():
+    # google_auth_oauthlib pulls in google-auth and requests (~150 ms),
+    # so it is imported with the first login, or by the startup warm-up
+    import google_auth_oauthlib.flow
+
+    flow = google_auth_oauthlib.flow.Flow.from_client_config(_client_config(), SCOPES)
+    flow.redirect_uri = _client_config()["web"]["redirect_uris"][0]
+    return flow
 
 
 @router.get("/")
@@ -49,8 +56,7 @@ def index():
 def authorize():
     """Elindítja a Google OAuth flow-t"""
     logger.info("Authentication started.")
-    flow = google_auth_oauthlib.flow.Flow.from_client_config(CLIENT_CONFIG, SCOPES)
-    flow.redirect_uri = REDIRECT_URI
+    flow = _oauth_flow()
 
     auth_url, state = flow.authorization_url(
         access_type="offline", include_granted_scopes="true"
@@ -74,13 +80,14 @@ def oauth2callback(request: Request):
             f"{FRONTEND_URL}/oauth/callback?error={error}"
         )
 
-    flow = google_auth_oauthlib.flow.Flow.from_client_config(CLIENT_CONFIG, SCOPES)
-    flow.redirect_uri = REDIRECT_URI
+    flow = _oauth_flow()
 
     # Lekérjük a tokent a Google-től
     flow.fetch_token(authorization_response=str(request.url))
     credentials = flow.credentials
 
+    import requests
+
     userinfo = requests.get(
         "https://www.googleapis.com/oauth2/v3/userinfo",
         headers={"Authorization": f"Bearer {credentials.token}"}
@@ -100,8 +107,8 @@ def logout():
     return {"message": "Logged out (no real session used in this demo)"}
 
 @router.post("/register")
-def register(request_data: dbmodels.UserRegisterRequest):
-    user_id = db.create_user(
+async def register(request_data: dbmodels.UserRegisterRequest):
+    user_id = await db.create_user(
         oauth_id=request_data.oauth_id,
     )
     logger.info("User logged in.")
@@ -1,25 +1,35 @@
 import os
 import asyncio
+import time
 from typing import Optional
-import json
 
-import httpx
 import websockets
-import assemblyai as aai
 from fastapi import (
     File,
     UploadFile,
     HTTPException,
     Form,
+    Header,
     WebSocket,
-    WebSocketDisconnect,
 )
-from fastapi.responses import JSONResponse
-from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi import APIRouter, Query, Request
 
 import backend.db.models as dbmodels
-import backend.db.repository as db
-from backend.utils.logger import logger
+import backend.db.async_repository as db
+import backend.db.transcript_cache as transcript_cache
+import backend.utils.batches as batches
+import backend.utils.exports as exports
+import backend.utils.jobs as jobs
+import backend.utils.result_cache as result_cache
+import backend.utils.streaming_tokens as streaming_tokens
+import backend.utils.uploads as uploads
+from backend.utils.audio import AudioConverter, TARGET_ENCODING, TARGET_SAMPLE_RATE
+from backend.utils.live_relay import LiveRelay, UPSTREAM_MAX_QUEUE, active_sessions
+from backend.utils import live_broadcast
+from backend.utils.live_persistence import LiveSessionWriter, rebuild_transcript
+from backend.utils.logger import logger, session_id_var
+from backend.utils.transcription import TranscriptionError
 
 
 # Import unified API router
@@ -30,6 +40,14 @@ router = APIRouter(prefix="/transcription", tags=["Transcribe"])
 
 
 
+def _conditional_json(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    """Pre-encoded JSON with an ETag, or 304 when the client already has it."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if transcript_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 def _get_assemblyai_api_key() -> str:
     """Get AssemblyAI API key from environment variable."""
     api_key = os.environ.get("ASSEMBLYAI_API_KEY")
@@ -51,30 +69,30 @@ async def test_assemblyai_token():
     try:
         api_key = _get_assemblyai_api_key()
 
-        async with httpx.AsyncClient() as client:
-            token_response = await client.get(
-                "https://streaming.assemblyai.com/v3/token",
-                headers={"Authorization": api_key},
-                params={"expires_in_seconds": 600},
-            )
-
-            if token_response.status_code != 200:
-                return {
-                    "success": False,
-                    "error": f"Token request failed: {token_response.status_code}",
-                    "details": token_response.text,
-                }
-
-            token_data = token_response.json()
+        try:
+            token_data = await streaming_tokens.fetch_token(api_key)
+        except streaming_tokens.TokenError as e:
             return {
-                "success": True,
-                "token_length": len(token_data.get("token", "")),
-                "expires_at": token_data.get("expires_at"),
+                "success": False,
+                "error": f"Token request failed: {e.status_code}",
+                "details": e.detail,
             }
+
+        return {
+            "success": True,
+            "token_length": len(token_data.get("token", "")),
+            "expires_at": token_data.get("expires_at"),
+        }
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+@router.get("/assemblyai/token-pool/stats")
+def get_token_pool_stats():
+    """Pre-fetched token pool state and cold vs warm live session start times."""
+    return streaming_tokens.token_pool.stats()
+
+
 @router.post("/assemblyai/transcribe")
 async def assemblyai_transcribe(
     audio: UploadFile = File(...),
@@ -83,147 +101,37 @@ async def assemblyai_transcribe(
     min_speakers: Optional[int] = Form(None),
     max_speakers: Optional[int] = Form(None),
     language_code: Optional[str] = Form(None),
+    chunked: bool = Form(False),
 ):
+    """Transcribe an upload and wait for the result.
+
+    The upstream run happens on the job worker pool, so awaiting it here does
+    not block the event loop. chunked=true transcribes long recordings in
+    parallel parts split on silence; the response schema is the same.
+    """
     try:
-        print(
-            speaker_labels, speakers_expected, min_speakers, max_speakers, language_code
-        )
-        # Get API key and configure AssemblyAI
         api_key = _get_assemblyai_api_key()
-        aai.settings.api_key = api_key
-
-        # Save uploaded file temporarily
-        import tempfile
-
-        with tempfile.NamedTemporaryFile(
-            delete=False, suffix=os.path.splitext(audio.filename)[1]
-        ) as tmp_file:
-            content = await audio.read()
-            tmp_file.write(content)
-            tmp_file_path = tmp_file.name
-
-        try:
-            # Configure transcription
-            config_params = {}
-
-            # Language configuration
-            if language_code:
-                # Check if multiple languages (comma-separated)
-                if "," in language_code:
-                    # Multiple languages for automatic detection
-                    languages = [lang.strip() for lang in language_code.split(",")]
-                    config_params["language_code"] = languages[0]  # Primary language
-                    config_params["language_detection"] = True
-                else:
-                    # Single language code
-                    config_params["language_code"] = language_code
-            else:
-                # Enable automatic language detection when no language specified
-                config_params["language_detection"] = True
-
-            # config_params["language_code"] = "hu"
-            if speaker_labels:
-                config_params["speaker_labels"] = True
-
-                # Set speaker count if specified
-                if speakers_expected is not None:
-                    config_params["speakers_expected"] = speakers_expected
-                elif min_speakers is not None or max_speakers is not None:
-                    # Use speaker_options for min/max range
-                    speaker_options = {}
-                    if min_speakers is not None:
-                        speaker_options["min_speakers_expected"] = min_speakers
-                    if max_speakers is not None:
-                        speaker_options["max_speakers_expected"] = max_speakers
-                    config_params["speaker_options"] = speaker_options
-
-            config = aai.TranscriptionConfig(**config_params)
-            print(config)
-            # Transcribe
-            transcriber = aai.Transcriber()
-            transcript = transcriber.transcribe(tmp_file_path, config)
-
-            # Check for errors
-            if transcript.status == aai.TranscriptStatus.error:
-                logger.error("Transcription failed.")
-                raise HTTPException(
-                    status_code=500, detail=f"Transcription failed: {transcript.error}"
-                )
-
-            # Build response with all requested information
-            response_data = {
-                "id": transcript.id,
-                "status": transcript.status.value,
-                "text": transcript.text,
-                "language_code": (
-                    transcript.language_code
-                    if hasattr(transcript, "language_code")
-                    else None
-                ),
-            }
+        params = {
+            "speaker_labels": speaker_labels,
+            "speakers_expected": speakers_expected,
+            "min_speakers": min_speakers,
+            "max_speakers": max_speakers,
+            "language_code": language_code,
+        }
+
+        tmp_file_path, audio_hash = await uploads.save_upload_file(audio)
+        _, future = await asyncio.to_thread(
+            jobs.submit_job, tmp_file_path, params, api_key,
+            filename=audio.filename, audio_hash=audio_hash, chunked=chunked
+        )
+        response_data = await asyncio.wrap_future(future)
 
-            # Add utterances with speaker labels if enabled
-            if speaker_labels and transcript.utterances:
-                utterances = []
-                for utterance in transcript.utterances:
-                    utt_data = {
-                        "speaker": utterance.speaker,
-                        "text": utterance.text,
-                        "start": utterance.start,
-                        "end": utterance.end,
-                        "confidence": utterance.confidence,
-                    }
-
-                    # Add word-level details
-                    if utterance.words:
-                        utt_data["words"] = [
-                            {
-                                "text": word.text,
-                                "start": word.start,
-                                "end": word.end,
-                                "confidence": word.confidence,
-                                "speaker": word.speaker,
-                            }
-                            for word in utterance.words
-                        ]
-
-                    utterances.append(utt_data)
-
-                response_data["utterances"] = utterances
-
-            # Add word-level timestamps for the entire transcript
-            if transcript.words:
-                response_data["words"] = [
-                    {
-                        "text": word.text,
-                        "start": word.start,
-                        "end": word.end,
-                        "confidence": word.confidence,
-                    }
-                    for word in transcript.words
-                ]
-
-            # Add confidence score
-            if hasattr(transcript, "confidence"):
-                response_data["confidence"] = transcript.confidence
-
-            # Add audio duration
-            if hasattr(transcript, "audio_duration"):
-                response_data["audio_duration"] = transcript.audio_duration
-
-            print(response_data)
-            logger.info("Transcription succeeded.")
-            return JSONResponse(content=response_data)
-
-        finally:
-            # Clean up temp file
-            try:
-                os.unlink(tmp_file_path)
-            except:
-                pass
+        return JSONResponse(content=response_data)
 
     except HTTPException:
         raise
+    except TranscriptionError as e:
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         logger.error(f"AssemblyAI transcription error: {str(e)}")
         raise HTTPException(
@@ -231,38 +139,332 @@ async def assemblyai_transcribe(
         )
 
 
+@router.post("/assemblyai/jobs", status_code=202)
+async def submit_transcription_job(
+    audio: UploadFile = File(...),
+    user_id: str = Form(...),
+    speaker_labels: bool = Form(True),
+    speakers_expected: Optional[int] = Form(None),
+    min_speakers: Optional[int] = Form(None),
+    max_speakers: Optional[int] = Form(None),
+    language_code: Optional[str] = Form(None),
+):
+    """Queue a transcription and return its job id immediately."""
+    api_key = _get_assemblyai_api_key()
+    if await db.get_user_by_id(user_id) is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid user ID: {user_id}."
+        )
+
+    params = {
+        "speaker_labels": speaker_labels,
+        "speakers_expected": speakers_expected,
+        "min_speakers": min_speakers,
+        "max_speakers": max_speakers,
+        "language_code": language_code,
+    }
+
+    tmp_file_path, audio_hash = await uploads.save_upload_file(audio)
+    job_id, future = await asyncio.to_thread(
+        jobs.submit_job, tmp_file_path, params, api_key,
+        filename=audio.filename, audio_hash=audio_hash, user_id=user_id
+    )
+
+    return {"job_id": job_id, "status": "completed" if future.done() else "queued"}
+
+
+@router.get("/assemblyai/jobs/{job_id}")
+async def get_transcription_job(job_id: str, user_id: str):
+    job = await db.get_job(job_id, include_result=False)
+
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown job ID: {job_id}."
+        )
+
+    if job.get("user_id") != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Forbidden: job does not belong to user."
+        )
+
+    job.pop("file_path", None)
+    return job
+
+
+@router.get("/assemblyai/jobs/{job_id}/result")
+async def get_transcription_job_result(job_id: str, user_id: str):
+    job = await db.get_job(job_id)
+
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown job ID: {job_id}."
+        )
+
+    if job.get("user_id") != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Forbidden: job does not belong to user."
+        )
+
+    if job["status"] == "error":
+        raise HTTPException(
+            status_code=500,
+            detail=job.get("error") or "Transcription failed."
+        )
+
+    if job["status"] != "completed":
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job_id, "status": job["status"]}
+        )
+
+    return JSONResponse(content=job["result"])
+
+
+@router.post("/assemblyai/batches", status_code=202)
+async def submit_transcription_batch(
+    files: list[UploadFile] = File(...),
+    user_id: str = Form(...),
+    speaker_labels: bool = Form(True),
+    speakers_expected: Optional[int] = Form(None),
+    min_speakers: Optional[int] = Form(None),
+    max_speakers: Optional[int] = Form(None),
+    language_code: Optional[str] = Form(None),
+    concurrency: Optional[int] = Form(None),
+):
+    """Transcribe many files, or .zip archives of them, concurrently.
+
+    Every result is saved as a transcript of user_id; poll
+    GET /assemblyai/batches/{batch_id} for the aggregated progress.
+    """
+    api_key = _get_assemblyai_api_key()
+    if await db.get_user_by_id(user_id) is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid user ID: {user_id}."
+        )
+
+    params = {
+        "speaker_labels": speaker_labels,
+        "speakers_expected": speakers_expected,
+        "min_speakers": min_speakers,
+        "max_speakers": max_speakers,
+        "language_code": language_code,
+    }
+
+    saved = []
+    try:
+        for upload in files:
+            file_path, _ = await uploads.save_upload_file(upload)
+            if batches.is_archive(upload.filename):
+                saved.extend(await asyncio.to_thread(batches.expand_archive, file_path))
+            else:
+                saved.append((file_path, upload.filename))
+
+            if len(saved) > batches.MAX_BATCH_FILES:
+                raise batches.BatchError(f"Too many files, at most {batches.MAX_BATCH_FILES} per batch")
+    except batches.BatchError as e:
+        batches.cleanup(saved)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not saved:
+        raise HTTPException(status_code=400, detail="No files to transcribe.")
+
+    batch_id = await batches.start_batch(user_id, saved, params, api_key, concurrency)
+
+    return {"batch_id": batch_id, "status": "running", "total": len(saved)}
+
+
+@router.get("/assemblyai/batches/{batch_id}")
+async def get_transcription_batch(batch_id: str, user_id: str):
+    batch = await db.get_batch(batch_id)
+
+    if batch is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown batch ID: {batch_id}."
+        )
+
+    if batch.get("user_id") != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Forbidden: batch does not belong to user."
+        )
+
+    return batches.batch_progress(batch)
+
+
+@router.get("/assemblyai/cache/stats")
+def get_transcription_cache_stats():
+    return result_cache.stats()
+
+
+@router.get("/transcript_cache/stats")
+def get_transcript_cache_stats():
+    return transcript_cache.cache.stats()
+
+
+@router.post("/assemblyai/uploads", status_code=201)
+def create_resumable_upload():
+    """Start a resumable upload; send the audio with PATCH in any number of chunks."""
+    upload_id = uploads.create_upload()
+    return {"upload_id": upload_id, "offset": 0}
+
+
+@router.get("/assemblyai/uploads/{upload_id}")
+def get_resumable_upload(upload_id: str):
+    """Return how many bytes have arrived, so a client can resume after a drop."""
+    offset = uploads.get_offset(upload_id)
+
+    if offset is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown upload ID: {upload_id}."
+        )
+
+    return {"upload_id": upload_id, "offset": offset}
+
+
+@router.patch("/assemblyai/uploads/{upload_id}")
+async def append_resumable_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+):
+    try:
+        offset = await uploads.append_chunk(upload_id, upload_offset, request.stream())
+    except uploads.UploadOffsetError as e:
+        return JSONResponse(
+            status_code=409,
+            content={"detail": str(e), "offset": e.current_offset}
+        )
+
+    if offset is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown upload ID: {upload_id}."
+        )
+
+    return {"upload_id": upload_id, "offset": offset}
+
+
+@router.post("/assemblyai/uploads/{upload_id}/complete", status_code=202)
+async def complete_resumable_upload(
+    upload_id: str,
+    user_id: str = Form(...),
+    filename: Optional[str] = Form(None),
+    speaker_labels: bool = Form(True),
+    speakers_expected: Optional[int] = Form(None),
+    min_speakers: Optional[int] = Form(None),
+    max_speakers: Optional[int] = Form(None),
+    language_code: Optional[str] = Form(None),
+):
+    """Finish a resumable upload and queue it as a transcription job."""
+    api_key = _get_assemblyai_api_key()
+    if await db.get_user_by_id(user_id) is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid user ID: {user_id}."
+        )
+
+    try:
+        file_path = uploads.finish_upload(upload_id, filename)
+    except uploads.UploadBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if file_path is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown upload ID: {upload_id}."
+        )
+
+    params = {
+        "speaker_labels": speaker_labels,
+        "speakers_expected": speakers_expected,
+        "min_speakers": min_speakers,
+        "max_speakers": max_speakers,
+        "language_code": language_code,
+    }
+    job_id, _ = await asyncio.to_thread(
+        jobs.submit_job, file_path, params, api_key, filename=filename, user_id=user_id
+    )
+
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.delete("/assemblyai/uploads/{upload_id}")
+def delete_resumable_upload(upload_id: str):
+    try:
+        deleted = uploads.delete_upload(upload_id)
+    except uploads.UploadBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if not deleted:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown upload ID: {upload_id}."
+        )
+
+    return {"success": True, "deleted_upload_id": upload_id}
+
+
+@router.get("/assemblyai/live/metrics")
+def get_live_metrics():
+    """Per-session queue depth, dropped partials and client lag of this worker."""
+    return {
+        "active_sessions": len(active_sessions),
+        "sessions": [metrics.snapshot() for metrics in list(active_sessions.values())],
+        "broadcasts": [broadcast.stats() for broadcast in list(live_broadcast.live_broadcasts.values())],
+    }
+
+
 @router.websocket("/assemblyai/transcribe/live")
 async def assemblyai_transcribe_live(websocket: WebSocket):
     await websocket.accept()
     assemblyai_ws = None
-    is_shutting_down = False  # Flag to coordinate shutdown
+
+    # Final turns are saved while the session runs; see GET /live_sessions/{id}
+    session_writer = LiveSessionWriter(user_id=websocket.query_params.get("user_id"))
+    session_id_var.set(session_writer.session_id)
+    session_writer.start()
+    session_summary = {}
+    converter = None
 
     try:
+        # Declared input format, e.g. ?input_encoding=pcm_f32le&input_sample_rate=48000;
+        # converted to the 16 kHz pcm_s16le the upstream is opened with
+        converter = AudioConverter(
+            encoding=websocket.query_params.get("input_encoding", TARGET_ENCODING),
+            sample_rate=int(websocket.query_params.get("input_sample_rate", TARGET_SAMPLE_RATE)),
+            channels=int(websocket.query_params.get("channels", 1)),
+        )
+
         # Get API key
         api_key = _get_assemblyai_api_key()
 
-        async with httpx.AsyncClient() as client:
-            token_response = await client.get(
-                "https://streaming.assemblyai.com/v3/token",
-                headers={"Authorization": api_key},
-                params={"expires_in_seconds": 600},  # 10 minutes
-            )
-
-            if token_response.status_code != 200:
-                raise HTTPException(
-                    status_code=token_response.status_code,
-                    detail=f"Failed to create token: {token_response.text}",
-                )
-
-            token_data = token_response.json()
-            token = token_data["token"]
+        # Pre-fetched token when the pool has one, so only the upstream
+        # WebSocket handshake is left on the session start path
+        session_start = time.perf_counter()
+        try:
+            token, warm_start = await streaming_tokens.token_pool.acquire(api_key)
+        except streaming_tokens.TokenError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-        ws_url = f"wss://streaming.assemblyai.com/v3/ws?token={token}&sample_rate=16000&encoding=pcm_s16le&format_turns=true"
+        ws_url = f"{streaming_tokens.STREAMING_WS_URL}?token={token}&sample_rate=16000&encoding=pcm_s16le&format_turns=true"
         logger.info("Connecting to AssemblyAI WebSocket...")
-        logger.info("URL: wss://streaming.assemblyai.com/v3/ws?token=***&sample_rate=16000&encoding=pcm_s16le")
+        logger.info(f"URL: {streaming_tokens.STREAMING_WS_URL}?token=***&sample_rate=16000&encoding=pcm_s16le")
         try:
-            assemblyai_ws = await websockets.connect(ws_url)
-            logger.info("Connected to AssemblyAI successfully.")
+            assemblyai_ws = await websockets.connect(ws_url, max_queue=UPSTREAM_MAX_QUEUE)
+            start_seconds = time.perf_counter() - session_start
+            streaming_tokens.token_pool.record_session_start(start_seconds, warm_start)
+            logger.info(
+                f"Connected to AssemblyAI successfully "
+                f"({'warm' if warm_start else 'cold'} start, {start_seconds * 1000:.0f} ms)."
+            )
         except Exception as e:
             logger.error(f"Failed to connect to AssemblyAI: {e}")
 
@@ -274,195 +476,20 @@ async def assemblyai_transcribe_live(websocket: WebSocket):
             )
             return
 
-        # Task to forward messages from AssemblyAI to client
-        async def forward_from_assemblyai():
-            nonlocal is_shutting_down
-            try:
-                async for message in assemblyai_ws:
-                    # Check if we're shutting down before processing
-                    if is_shutting_down:
-                        print(f"[Backend] Shutdown in progress, skipping message")
-                        break
-                        
-                    data = json.loads(message)
-                    msg_type = data.get("type")
-                    logger.info(f"Received: {msg_type}")
-
-                    # Session begins
-                    if msg_type == "Begin":
-                        await websocket.send_json(
-                            {
-                                "type": "session_begins",
-                                "session_id": data.get("id"),
-                                "expires_at": data.get("expires_at"),
-                            }
-                        )
-
-                    # Turn (transcript)
-                    elif msg_type == "Turn":
-                         # Debug: see full Turn structure
-                        logger.info(f"[AssemblyAI] Turn data: {json.dumps(data, indent=2)}")
-
-
-                        try:
-                            turn_data = {
-                                "type": (
-                                    "final_transcript"
-                                    if data.get("end_of_turn")
-                                    else "partial_transcript"
-                                ),
-                                "text": data.get("transcript", ""),
-                                "end_of_turn": data.get("end_of_turn", False),
-                                "turn_is_formatted": data.get(
-                                    "turn_is_formatted", False
-                                ),
-                                "turn_order": data.get("turn_order"),
-                            }
-
-                            # Add words with timestamps and confidence
-                            if "words" in data:
-                                turn_data["words"] = [
-                                    {
-                                        "text": word.get("text"),
-                                        "start": word.get("start"),
-                                        "end": word.get("end"),
-                                        "confidence": word.get("confidence"),
-                                        "word_is_final": word.get(
-                                            "word_is_final", False
-                                        ),
-                                    }
-                                    for word in data["words"]
-                                ]
-
-                            # Add end of turn confidence
-                            if "end_of_turn_confidence" in data:
-                                turn_data["confidence"] = data["end_of_turn_confidence"]
-
-
-                            logger.info(f"Forwarding transcript to client: '{turn_data['text']}'")
-                            await websocket.send_json(turn_data)
-                            print(f"[Backend] Transcript sent successfully")
-                        except (WebSocketDisconnect, RuntimeError) as e:
-                            if "close message has been sent" in str(e) or isinstance(e, WebSocketDisconnect):
-                                print(f"[Backend] Client disconnected, stopping forward")
-                                break
-                            else:
-                                raise
-                        except Exception as e:
-                            logger.error(f"Error forwarding transcript: {e}")
-                            import traceback
-
-                            traceback.print_exc()
-
-                    # Session termination
-                    elif msg_type == "Termination":
-                        logger.info("[AssemblyAI] Session terminated")
-                        await websocket.send_json(
-                            {
-                                "type": "session_terminated",
-                                "audio_duration": data.get("audio_duration_seconds"),
-                                "session_duration": data.get(
-                                    "session_duration_seconds"
-                                ),
-                            }
-                        )
-                        break
-
-                    # Error
-                    elif msg_type == "Error":
-                        logger.info(f"[AssemblyAI] Error received: {data.get('error')}")
-                        await websocket.send_json(
-                            {
-                                "type": "error",
-                                "message": data.get("error", "Unknown error"),
-                            }
-                        )
-                        break
-
-                logger.info("[AssemblyAI] Message loop ended normally")
-            except websockets.exceptions.ConnectionClosed as e:
-                logger.info(f"[AssemblyAI] Connection closed: {e}")
-
-            except Exception as e:
-                logger.error(f"[AssemblyAI] Receive error: {e}")
-                import traceback
-
-                traceback.print_exc()
-                try:
-                    await websocket.send_json(
-                        {
-                            "type": "error",
-                            "message": f"AssemblyAI connection error: {str(e)}",
-                        }
-                    )
-                except:
-                    pass
-
-        # Task to forward audio and control messages from client to AssemblyAI
-        async def forward_to_assemblyai():
-            nonlocal is_shutting_down
-            try:
-                chunk_count = 0
-                while True:
-                    data = await websocket.receive()
-
-                    if "bytes" in data:
-                        # Forward raw audio bytes to AssemblyAI
-                        # AssemblyAI v3 expects binary audio data (not base64)
-                        chunk_count += 1
-                        if chunk_count % 20 == 0:  # Log every 20 chunks
-                            logger.info(f"Sent {chunk_count} chunks to AssemblyAI")
-
-                        # Send raw PCM audio bytes directly
-                        await assemblyai_ws.send(data["bytes"])
-
-                    elif "text" in data:
-                        # Handle control messages
-                        msg = json.loads(data["text"])
-                        msg_type = msg.get("type")
-
-                        if msg_type == "terminate":
-                            # Set shutdown flag first
-                            is_shutting_down = True
-                            print(f"[Backend] Termination requested, shutting down")
-                            # Send termination message
-                            await assemblyai_ws.send(json.dumps({"type": "Terminate"}))
-                            break
-
-                        elif msg_type == "force_endpoint":
-                            # Force end of turn
-                            await assemblyai_ws.send(
-                                json.dumps({"type": "ForceEndpoint"})
-                            )
-
-                        elif msg_type == "configure":
-                            # Update configuration
-                            config_msg = {"type": "UpdateConfiguration"}
-                            if "end_of_turn_confidence_threshold" in msg:
-                                config_msg["end_of_turn_confidence_threshold"] = msg[
-                                    "end_of_turn_confidence_threshold"
-                                ]
-                            await assemblyai_ws.send(json.dumps(config_msg))
-
-            except WebSocketDisconnect:
-                # Client disconnected, terminate session
-                is_shutting_down = True
-                print(f"[Backend] Client disconnected")
-                try:
-                    await assemblyai_ws.send(json.dumps({"type": "Terminate"}))
-                except:
-                    pass
-            except Exception as e:
-                is_shutting_down = True
-                print(f"[Backend] Forward to AssemblyAI error: {e}")
-                import traceback
-
-                traceback.print_exc()
-
-        # Run both tasks concurrently
-        await asyncio.gather(
-            forward_from_assemblyai(), forward_to_assemblyai(), return_exceptions=True
-        )
+        # ?broadcast=true lets viewers follow this session read-only via
+        # /assemblyai/transcribe/live/{live_session_id}/watch
+        broadcast = None
+        if websocket.query_params.get("broadcast", "").lower() in ("1", "true"):
+            broadcast = live_broadcast.start_broadcast(session_writer.session_id, session_writer.user_id)
+            # Only the speaker gets the share token; viewers never see it
+            await websocket.send_json({
+                "type": "broadcast_started",
+                "live_session_id": broadcast.session_id,
+                "share_token": broadcast.share_token,
+            })
+
+        await LiveRelay(websocket, assemblyai_ws, converter, session_writer, session_summary,
+                        broadcast=broadcast).run()
 
     except Exception as e:
         error_msg = f"AssemblyAI live transcription error: {str(e)}"
@@ -476,6 +503,10 @@ async def assemblyai_transcribe_live(websocket: WebSocket):
             pass
     finally:
         # Cleanup
+        if converter is not None and not converter.passthrough:
+            logger.info(f"Audio conversion per chunk: {converter.stats()}")
+        await session_writer.close(**session_summary)
+
         if assemblyai_ws:
             try:
                 await assemblyai_ws.close()
@@ -487,9 +518,45 @@ async def assemblyai_transcribe_live(websocket: WebSocket):
         except:
             pass
 
+@router.websocket("/assemblyai/transcribe/live/{session_id}/watch")
+async def assemblyai_watch_live(websocket: WebSocket, session_id: str):
+    """Read-only viewer of a broadcasting live session.
+
+    Starts with a catch-up snapshot of the turns so far, then receives the
+    same transcript events as the speaker without another upstream session.
+    Open to the session owner (?user_id=) or with the ?share_token= the
+    speaker received in its broadcast_started message.
+    """
+    await live_broadcast.watch(websocket, session_id)
+
+
+@router.get("/live_sessions/{session_id}")
+async def get_live_session(session_id: str, user_id: Optional[str] = None):
+    """Rebuild the transcript of a live session from its persisted turns.
+
+    Works while the session is still running and after a crash or
+    disconnect, so the client can resume or save what was recorded.
+    """
+    session = await db.get_live_session(session_id)
+
+    if session is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown live session ID: {session_id}."
+        )
+
+    # A session started without a user is only readable without one
+    if session.get("user_id") != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Forbidden: live session does not belong to user."
+        )
+
+    return rebuild_transcript(session)
+
 @router.post("/save_user_transcript")
-def save_user_transcript(request_data: dbmodels.UserSaveTranscriptRequest):
-    transcript_id = db.create_transcript(
+async def save_user_transcript(request_data: dbmodels.UserSaveTranscriptRequest):
+    transcript_id = await db.create_transcript(
         user_id=request_data.user_id,
         text=request_data.text,
         title=request_data.title,
@@ -504,12 +571,13 @@ def save_user_transcript(request_data: dbmodels.UserSaveTranscriptRequest):
     return {"transcript_id": transcript_id}
 
 @router.get("/get_user_transcripts")
-def get_user_transcripts(
+async def get_user_transcripts(
     user_id: str,
-    sort_mode: str = "descending"
+    sort_mode: str = "descending",
+    if_none_match: Optional[str] = Header(None)
 ):
     
-    transcriptions = db.get_transcripts_for_user(
+    transcriptions = await db.get_transcripts_for_user(
         user_id=user_id,
         sort_mode=sort_mode
     )
@@ -520,14 +588,70 @@ def get_user_transcripts(
             detail=f"Invalid user ID: {user_id}."
         )
 
-    return transcriptions
+    body = transcript_cache.dumps(transcriptions)
+    return _conditional_json(body, transcript_cache.etag(body), if_none_match)
+
+@router.get("/get_user_transcripts_page")
+async def get_user_transcripts_page(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    sort_mode: str = "descending",
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """Cursor-paginated transcript list with summary fields only by default.
+
+    fields is a comma-separated list, e.g. fields=title,text,notes.
+    Answers 304 when the page is unchanged since the client's ETag.
+    """
+    page = await db.get_transcripts_page(
+        user_id=user_id,
+        limit=limit,
+        cursor=cursor,
+        sort_mode=sort_mode,
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    )
+
+    if page is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid user ID, cursor or fields: {user_id}."
+        )
+
+    items, next_cursor = page
+    body = transcript_cache.dumps({"items": items, "next_cursor": next_cursor})
+    return _conditional_json(body, transcript_cache.etag(body), if_none_match)
+
+@router.get("/search_user_transcripts")
+async def search_user_transcripts(
+    user_id: str,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Full-text search over title, text and notes, ranked by relevance.
+
+    Each result lists the matching utterances with the start time (ms) of
+    the matching words, so the player can jump straight to them.
+    """
+    results = await db.search_transcripts(user_id=user_id, query=q, limit=limit)
+
+    if results is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid user ID or empty query: {user_id}."
+        )
+
+    return results
 
 @router.get("/get_user_transcript")
-def get_user_transcript(
+async def get_user_transcript(
     user_id: str,
-    transcript_id: str
+    transcript_id: str,
+    if_none_match: Optional[str] = Header(None)
 ):
-    transcription = db.get_transcript_by_id(transcript_id=transcript_id)
+    """Served from the transcript cache; 304 when the client's ETag is current."""
+    transcription = await db.get_transcript_entry(transcript_id=transcript_id)
 
     if transcription is None:
         raise HTTPException(
@@ -535,17 +659,129 @@ def get_user_transcript(
             detail=f"Invalid transcription ID: {transcript_id}."
         )
 
-    if transcription["user_id"] != user_id:
+    if transcription.user_id != user_id:
         raise HTTPException(
             status_code=403,
             detail="Forbidden: transcript does not belong to user."
         )
     
-    return transcription
+    return _conditional_json(transcription.body, transcription.etag, if_none_match)
+
+@router.get("/get_user_transcript_utterance")
+async def get_user_transcript_utterance(
+    user_id: str,
+    transcript_id: str,
+    index: int = Query(..., ge=0)
+):
+    utterance = await db.get_transcript_utterance(transcript_id=transcript_id, index=index)
+
+    if utterance is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid transcription ID or utterance index: {transcript_id}, {index}."
+        )
+
+    if utterance.pop("user_id") != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Forbidden: transcript does not belong to user."
+        )
+
+    return utterance
+
+@router.get("/get_user_transcript_range")
+async def get_user_transcript_range(
+    user_id: str,
+    transcript_id: str,
+    t_start: int = Query(..., ge=0),
+    t_end: int = Query(..., gt=0)
+):
+    """Utterances and words between t_start and t_end (ms), for the player."""
+    if t_end <= t_start:
+        raise HTTPException(
+            status_code=400,
+            detail="t_end must be greater than t_start."
+        )
+
+    transcript_range = await db.get_transcript_range(
+        transcript_id=transcript_id, t_start=t_start, t_end=t_end
+    )
+
+    if transcript_range is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid transcription ID: {transcript_id}."
+        )
+
+    if transcript_range.pop("user_id") != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Forbidden: transcript does not belong to user."
+        )
+
+    return transcript_range
+
+@router.get("/export_user_transcript")
+async def export_user_transcript(
+    user_id: str,
+    transcript_id: str,
+    format: str = Query("srt", pattern="^(srt|vtt|txt|json)$")
+):
+    """Download one transcript as SRT, WebVTT, plain text or JSON."""
+    transcription = await db.get_transcript_entry(transcript_id=transcript_id)
+
+    if transcription is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid transcription ID: {transcript_id}."
+        )
+
+    if transcription.user_id != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Forbidden: transcript does not belong to user."
+        )
+
+    doc = transcription.document()
+    media_type, extension = exports.SINGLE_FORMATS[format]
+    content = iter((transcription.body,)) if format == "json" else exports.export_single(doc, format)
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": exports.content_disposition(doc.get("title"), "transcript", extension)}
+    )
+
+@router.get("/export_user_transcripts")
+async def export_user_transcripts(
+    user_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|zip)$")
+):
+    """Stream every transcript of the user as NDJSON or a zip of JSON files.
+
+    Read from a cursor and written as it goes, so server memory does not
+    depend on how many transcripts the user has.
+    """
+    transcriptions = db.iter_transcripts_for_user(user_id=user_id)
+
+    if transcriptions is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid user ID: {user_id}."
+        )
+
+    media_type, extension = exports.BULK_FORMATS[format]
+    content = exports.ndjson(transcriptions) if format == "ndjson" else exports.zip_archive(transcriptions)
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": exports.content_disposition("transcripts", "transcripts", extension)}
+    )
 
 @router.post("/update_user_transcript")
-def update_user_transcript(request_data: dbmodels.UserUpdateTranscriptRequest):
-    success = db.update_transcript(
+async def update_user_transcript(request_data: dbmodels.UserUpdateTranscriptRequest):
+    success = await db.update_transcript(
         transcript_id=request_data.transcript_id,
         text=request_data.text,
         language_code=request_data.language_code,
@@ -554,9 +790,15 @@ def update_user_transcript(request_data: dbmodels.UserUpdateTranscriptRequest):
         status=request_data.status,
         utterances=request_data.utterances,
         confidence=request_data.confidence,
-        notes=request_data.notes
+        notes=request_data.notes,
+        version=request_data.version
     )
 
+    if not success and request_data.version is not None:
+        head = await db.get_transcript_head(request_data.transcript_id)
+        if head is not None and head["version"] != request_data.version:
+            _raise_version_conflict(head["version"])
+
     if not success:
         raise HTTPException(
             status_code=400,
@@ -565,9 +807,57 @@ def update_user_transcript(request_data: dbmodels.UserUpdateTranscriptRequest):
     
     return {"success": success, "transcript_id": request_data.transcript_id}
 
+def _raise_version_conflict(current: int):
+    raise HTTPException(
+        status_code=409,
+        detail=f"Transcript was modified concurrently; it is now at version {current}.",
+        headers={"X-Transcript-Version": str(current)}
+    )
+
+@router.patch("/update_user_transcript/{transcript_id}")
+async def patch_user_transcript(transcript_id: str, request_data: dbmodels.UserPatchTranscriptRequest):
+    """Edit single utterances and words in place.
+
+    Only the changed values are sent and written (positional $set). The
+    request carries the version the client last read; if the transcript
+    changed since, nothing is written and the answer is 409.
+    """
+    result = await db.patch_transcript(
+        transcript_id=transcript_id,
+        user_id=request_data.user_id,
+        version=request_data.version,
+        fields=request_data.fields.model_dump(exclude_none=True),
+        utterances=[u.model_dump(exclude_none=True) for u in request_data.utterances],
+        words=[w.model_dump() for w in request_data.words]
+    )
+
+    if result is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid transcription or user ID: {transcript_id}."
+        )
+
+    if result["status"] == "forbidden":
+        raise HTTPException(
+            status_code=403,
+            detail="Forbidden: transcript does not belong to user."
+        )
+
+    if result["status"] == "conflict":
+        _raise_version_conflict(result["version"])
+
+    if result["status"] == "invalid":
+        raise HTTPException(
+            status_code=400,
+            detail="Nothing to update, or an utterance/word index is out of range "
+                   "(utterances without word data can only be changed with update_user_transcript)."
+        )
+
+    return {"success": True, "transcript_id": transcript_id, "version": result["version"]}
+
 @router.delete("/delete_user_transcript/{transcript_id}")
-def delete_user_transcript(transcript_id: str):
-    success = db.delete_transcript(transcript_id=transcript_id)
+async def delete_user_transcript(transcript_id: str):
+    success = await db.delete_transcript(transcript_id=transcript_id)
 
     if not success:
         raise HTTPException(
@@ -0,0 +1,132 @@
+"""Round trips of the packed word format and the utterance offset table."""
+import copy
+
+from backend.db import compact, queries
+
+
+def _words(*texts, start=0, speaker="A"):
+    return [{"text": text, "start": start + 100 * k, "end": start + 100 * k + 90,
+             "confidence": 0.87, "speaker": speaker} for k, text in enumerate(texts)]
+
+
+def _doc():
+    utterances = [
+        {"speaker": "A", "text": "hello world", "start": 0, "end": 190,
+         "confidence": 0.9, "words": _words("hello", "world")},
+        {"speaker": "B", "text": "good bye", "start": 200, "end": 390,
+         "confidence": 0.8, "words": _words("good", "bye", start=200, speaker="B")},
+    ]
+    words = [{k: v for k, v in word.items() if k != "speaker"}
+             for utterance in utterances for word in utterance["words"]]
+    return {"text": "hello world good bye", "utterances": utterances, "words": words}
+
+
+def test_document_round_trip():
+    doc = _doc()
+
+    encoded = compact.encode_document(copy.deepcopy(doc))
+
+    assert "words" not in encoded and encoded["words_from_utterances"] is True
+    assert all("words" not in u and "words_packed" in u for u in encoded["utterances"])
+    assert compact.decode_document(encoded) == doc
+
+
+def test_round_trip_keeps_top_level_words_that_differ():
+    doc = _doc()
+    doc["words"] = doc["words"][:3]
+
+    encoded = compact.encode_document(copy.deepcopy(doc))
+
+    assert "words_packed" in encoded and "words_from_utterances" not in encoded
+    assert compact.decode_document(encoded) == doc
+
+
+def test_round_trip_mixed_speakers():
+    words = _words("a", "b", "c")
+    words[1]["speaker"] = "B"
+    doc = {"utterances": [{"speaker": "A", "start": 0, "end": 290, "text": "a b c", "words": words}]}
+
+    encoded = compact.encode_document(copy.deepcopy(doc))
+
+    assert encoded["utterances"][0]["words_packed"]["speakers"] == ["A", "B", "A"]
+    assert compact.decode_document(encoded) == doc
+
+
+def test_unknown_word_shape_is_stored_as_is():
+    doc = {"utterances": [{"speaker": "A", "start": 0, "end": 90, "text": "a",
+                           "words": [{"text": "a", "start": 0.5, "end": 90, "confidence": 1}]}]}
+
+    encoded = compact.encode_document(copy.deepcopy(doc))
+
+    assert encoded == doc
+    assert compact.decode_document(encoded) == doc
+
+
+def test_decode_without_expanding_words():
+    encoded = compact.encode_document(_doc())
+
+    decoded = compact.decode_document(encoded, expand_words=False)
+
+    assert "words_packed" in decoded["utterances"][1]
+    assert compact.utterance_words(decoded["utterances"][1]) == _doc()["utterances"][1]["words"]
+
+
+def test_decode_old_layout_passes_through():
+    doc = _doc()
+
+    assert compact.decode_document(copy.deepcopy(doc)) == doc
+
+
+def _table(*spans):
+    return compact.build_offset_table([{"start": start, "end": end} for start, end in spans])
+
+
+def test_utterance_range_boundaries():
+    table = _table((0, 100), (100, 200), (300, 400))
+
+    # Half-open on both sides: touching an edge does not overlap
+    assert compact.utterance_range(table, 0, 100) == (0, 1)
+    assert compact.utterance_range(table, 100, 200) == (1, 2)
+    assert compact.utterance_range(table, 99, 101) == (0, 2)
+    assert compact.utterance_range(table, 200, 300) == (2, 2)
+    assert compact.utterance_range(table, 250, 301) == (2, 3)
+    assert compact.utterance_range(table, 400, 500) == (3, 3)
+    assert compact.utterance_range(table, -50, 0) == (0, 0)
+    assert compact.utterance_range(table, 0, 10_000) == (0, 3)
+
+
+def test_utterance_range_overlapping_utterances():
+    # The second utterance lies inside the first; the running maximum of the
+    # end column keeps the first in range, and the slice stays contiguous
+    table = _table((0, 500), (100, 200), (600, 700))
+
+    assert compact.utterance_range(table, 300, 400) == (0, 2)
+    assert compact.utterance_range(table, 150, 160) == (0, 2)
+    assert compact.utterance_range(table, 550, 650) == (2, 3)
+
+
+def test_offset_table_needs_bounds():
+    assert compact.build_offset_table([]) is None
+    assert compact.build_offset_table(None) is None
+    assert compact.build_offset_table([{"start": 0}]) is None
+    assert compact.build_offset_table([{"start": 0, "end": "x"}]) is None
+
+
+def test_range_bounds_matches_legacy_documents():
+    utterances = [{"start": 0, "end": 100}, {"start": 100, "end": 200}, {"start": 300, "end": 400}]
+    head = {"utterance_index": compact.build_offset_table(utterances)}
+    legacy_head = {"utterances": utterances}
+
+    for t_start, t_end in [(0, 100), (150, 350), (200, 300), (400, 500)]:
+        assert queries.range_bounds(head, t_start, t_end) == queries.range_bounds(legacy_head, t_start, t_end)
+    assert queries.range_bounds({}, 0, 100) == (0, 0)
+
+
+def test_words_in_range():
+    utterance = compact.encode_utterances([{"speaker": "A", "start": 0, "end": 390, "text": "a b c d",
+                                            "words": _words("a", "b", "c", "d")}])[0]
+
+    assert [w["text"] for w in compact.words_in_range(utterance, 90, 200)] == ["b"]
+    assert [w["text"] for w in compact.words_in_range(utterance, 89, 201)] == ["a", "b", "c"]
+    assert compact.words_in_range(utterance, 390, 500) == []
+    assert compact.words_in_range(utterance, 0, 1000) == _words("a", "b", "c", "d")
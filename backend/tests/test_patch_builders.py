@@ -0,0 +1,116 @@
+"""The pure patch builders in backend/db/queries.py; no MongoDB needed."""
+from bson import ObjectId
+
+from backend.db import compact, queries
+
+
+def _words(*texts, start=0, speaker="A"):
+    return [{"text": text, "start": start + 100 * k, "end": start + 100 * k + 90,
+             "confidence": 0.9, "speaker": speaker} for k, text in enumerate(texts)]
+
+
+def _current(user_id, packed=True):
+    doc = {
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "version": 1,
+        "text": "hello world good bye",
+        "utterances": [
+            {"speaker": "A", "text": "hello world", "start": 0, "end": 190,
+             "words": _words("hello", "world")},
+            {"speaker": "B", "text": "good bye", "start": 200, "end": 390,
+             "words": _words("good", "bye", start=200, speaker="B")},
+        ],
+    }
+    return compact.encode_document(doc) if packed else doc
+
+
+def test_word_edit_rebuilds_texts():
+    guard, update = queries.transcript_patch(
+        _current(ObjectId()), {}, [], [{"utterance": 1, "index": 1, "text": "now"}])
+
+    assert guard == {"utterances.1.words_packed.text.1": {"$exists": True}}
+    assert update == {
+        "$set": {
+            "utterances.1.words_packed.text.1": "now",
+            "utterances.1.text": "good now",
+            "text": "hello world good now",
+        },
+        "$inc": {"version": 1},
+    }
+
+
+def test_word_edit_without_packed_words():
+    guard, update = queries.transcript_patch(
+        _current(ObjectId(), packed=False), {}, [], [{"utterance": 0, "index": 0, "text": "hi"}])
+
+    assert guard == {"utterances.0.words.0.text": {"$exists": True}}
+    assert update["$set"]["utterances.0.words.0.text"] == "hi"
+    assert update["$set"]["text"] == "hi world good bye"
+
+
+def test_explicit_utterance_text_wins():
+    _, update = queries.transcript_patch(
+        _current(ObjectId()), {},
+        [{"index": 0, "text": "Hello, world!"}],
+        [{"utterance": 0, "index": 0, "text": "Hello,"}],
+    )
+
+    assert update["$set"]["utterances.0.text"] == "Hello, world!"
+    assert update["$set"]["text"] == "Hello, world! good bye"
+
+
+def test_speaker_edit():
+    guard, update = queries.transcript_patch(_current(ObjectId()), {}, [{"index": 1, "speaker": "C"}], [])
+
+    assert guard == {"utterances.1": {"$exists": True}}
+    assert update["$set"] == {"utterances.1.speaker": "C", "utterances.1.words_packed.speaker": "C"}
+    assert update["$unset"] == {"utterances.1.words_packed.speakers": ""}
+    assert "text" not in update["$set"]
+
+
+def test_speaker_edit_without_packed_words():
+    _, update = queries.transcript_patch(
+        _current(ObjectId(), packed=False), {}, [{"index": 1, "speaker": "C"}], [])
+
+    assert update["$set"] == {"utterances.1.speaker": "C",
+                              "utterances.1.words.0.speaker": "C",
+                              "utterances.1.words.1.speaker": "C"}
+    assert "$unset" not in update
+
+
+def test_fields_only():
+    guard, update = queries.transcript_patch(_current(ObjectId()), {"title": "renamed"}, [], [])
+
+    assert guard == {}
+    assert update == {"$set": {"title": "renamed"}, "$inc": {"version": 1}}
+
+
+def test_invalid_edits():
+    current = _current(ObjectId())
+
+    assert queries.transcript_patch(current, {}, [], [{"utterance": 0, "index": 2, "text": "x"}]) is None
+    assert queries.transcript_patch(current, {}, [], [{"utterance": 2, "index": 0, "text": "x"}]) is None
+    assert queries.transcript_patch(current, {}, [{"index": 5, "text": "x"}], []) is None
+    assert queries.transcript_patch(current, {}, [{"index": -1, "text": "x"}], []) is None
+    assert queries.transcript_patch(current, {"user_id": "x"}, [], []) is None
+    assert queries.transcript_patch(current, {}, [], []) is None
+
+
+def test_patch_filter():
+    transcript_id, user_id = ObjectId(), ObjectId()
+    guard = {"utterances.1": {"$exists": True}}
+
+    assert queries.patch_filter(transcript_id, str(user_id), 3, guard) == {
+        "_id": transcript_id, "user_id": user_id, "version": 3, "utterances.1": {"$exists": True},
+    }
+
+
+def test_patch_refusal():
+    user_id = ObjectId()
+    current = {"user_id": user_id, "version": 2}
+
+    assert queries.patch_refusal(current, str(user_id), 2) is None
+    assert queries.patch_refusal(current, str(user_id), 1) == {"status": "conflict", "version": 2}
+    assert queries.patch_refusal(current, str(ObjectId()), 2) == {"status": "forbidden", "version": 2}
+    assert queries.patch_refusal({"user_id": user_id}, str(user_id), 1) is None
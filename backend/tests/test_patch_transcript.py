@@ -0,0 +1,140 @@
+"""patch_transcript against a real MongoDB.
+
+Run with MONGO_TEST_URI pointing at a disposable mongod, e.g.
+MONGO_TEST_URI=mongodb://localhost:27017 python -m pytest backend/tests
+"""
+import os
+import uuid
+
+import pytest
+
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI")
+pytestmark = pytest.mark.skipif(not MONGO_TEST_URI, reason="MONGO_TEST_URI is not set")
+
+if MONGO_TEST_URI:
+    os.environ["MONGO_URI"] = MONGO_TEST_URI
+    os.environ["DB_NAME"] = f"test_patch_{uuid.uuid4().hex[:8]}"
+
+
+def _words(*texts, start=0):
+    return [{"text": text, "start": start + 100 * k, "end": start + 100 * k + 90,
+             "confidence": 0.9, "speaker": "A"} for k, text in enumerate(texts)]
+
+
+@pytest.fixture
+def repo():
+    from backend.db import mongodb_setup, repository
+
+    yield repository
+    mongodb_setup.get_client().drop_database(mongodb_setup.db_name())
+
+
+@pytest.fixture
+def transcript(repo):
+    user_id = repo.create_user(f"oauth-{uuid.uuid4().hex}")
+    transcript_id = repo.create_transcript(
+        user_id, text="hello world good bye", title="t", language_code="en",
+        speakers=2, duration="00:01", status="completed", confidence=0.9,
+        utterances=[
+            {"speaker": "A", "text": "hello world", "start": 0, "end": 190,
+             "confidence": 0.9, "words": _words("hello", "world")},
+            {"speaker": "B", "text": "good bye", "start": 200, "end": 390,
+             "confidence": 0.9, "words": _words("good", "bye", start=200)},
+        ],
+    )
+    return user_id, transcript_id
+
+
+def _stored(repo, transcript_id):
+    from bson import ObjectId
+
+    return repo.transcripts_collection.find_one({"_id": ObjectId(transcript_id)})
+
+
+def test_word_edit_rebuilds_texts(repo, transcript):
+    user_id, transcript_id = transcript
+
+    result = repo.patch_transcript(transcript_id, user_id, 1,
+                                   words=[{"utterance": 1, "index": 1, "text": "now"}])
+
+    assert result == {"status": "ok", "version": 2}
+    doc = _stored(repo, transcript_id)
+    assert doc["version"] == 2
+    assert doc["utterances"][1]["words_packed"]["text"] == ["good", "now"]
+    assert doc["utterances"][1]["text"] == "good now"
+    assert doc["text"] == "hello world good now"
+
+
+def test_explicit_utterance_text_wins(repo, transcript):
+    user_id, transcript_id = transcript
+
+    result = repo.patch_transcript(
+        transcript_id, user_id, 1,
+        utterances=[{"index": 0, "text": "Hello, world!"}],
+        words=[{"utterance": 0, "index": 0, "text": "Hello,"}],
+    )
+
+    assert result["status"] == "ok"
+    doc = _stored(repo, transcript_id)
+    assert doc["utterances"][0]["text"] == "Hello, world!"
+    assert doc["text"] == "Hello, world! good bye"
+
+
+def test_speaker_edit(repo, transcript):
+    user_id, transcript_id = transcript
+
+    result = repo.patch_transcript(transcript_id, user_id, 1,
+                                   utterances=[{"index": 1, "speaker": "C"}])
+
+    assert result["status"] == "ok"
+    doc = repo.get_transcript_by_id(transcript_id)
+    assert doc["utterances"][1]["speaker"] == "C"
+    assert {word["speaker"] for word in doc["utterances"][1]["words"]} == {"C"}
+
+
+def test_speaker_edit_without_packed_words(repo, transcript):
+    from bson import ObjectId
+
+    user_id, transcript_id = transcript
+    repo.transcripts_collection.update_one(
+        {"_id": ObjectId(transcript_id)},
+        {"$unset": {"utterances.1.words_packed": ""}}
+    )
+
+    result = repo.patch_transcript(transcript_id, user_id, 1,
+                                   utterances=[{"index": 1, "speaker": "C"}])
+
+    assert result["status"] == "ok"
+    doc = _stored(repo, transcript_id)
+    assert doc["utterances"][1]["speaker"] == "C"
+    assert "words_packed" not in doc["utterances"][1]
+
+
+def test_out_of_range_is_invalid(repo, transcript):
+    user_id, transcript_id = transcript
+
+    assert repo.patch_transcript(transcript_id, user_id, 1,
+                                 words=[{"utterance": 0, "index": 2, "text": "x"}])["status"] == "invalid"
+    assert repo.patch_transcript(transcript_id, user_id, 1,
+                                 utterances=[{"index": 5, "text": "x"}])["status"] == "invalid"
+    assert _stored(repo, transcript_id)["version"] == 1
+
+
+def test_stale_version_conflicts(repo, transcript):
+    user_id, transcript_id = transcript
+    repo.update_transcript(transcript_id, title="renamed")
+
+    result = repo.patch_transcript(transcript_id, user_id, 1,
+                                   words=[{"utterance": 0, "index": 0, "text": "bye"}])
+
+    assert result == {"status": "conflict", "version": 2}
+    assert _stored(repo, transcript_id)["text"] == "hello world good bye"
+
+
+def test_other_user_is_forbidden(repo, transcript):
+    _, transcript_id = transcript
+    other = repo.create_user(f"oauth-{uuid.uuid4().hex}")
+
+    result = repo.patch_transcript(transcript_id, other, 1, fields={"title": "x"})
+
+    assert result["status"] == "forbidden"
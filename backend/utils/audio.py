@@ -0,0 +1,124 @@
+import time
+
+import numpy as np
+
+# Server-side conversion of live audio to what the AssemblyAI streaming API
+# is opened with (16 kHz mono pcm_s16le), so browsers can send their native
+# 48 kHz float32 capture without resampling in JavaScript.
+
+TARGET_SAMPLE_RATE = 16000
+TARGET_ENCODING = "pcm_s16le"
+
+_SAMPLE_DTYPES = {
+    "pcm_s16le": np.dtype("<i2"),
+    "pcm_f32le": np.dtype("<f4"),
+}
+SUPPORTED_ENCODINGS = tuple(_SAMPLE_DTYPES)
+
+FIR_TAPS = 31
+
+
+def _lowpass_fir(cutoff: float, taps: int = FIR_TAPS) -> np.ndarray:
+    """Hamming-windowed sinc low-pass; cutoff in cycles per input sample."""
+    n = np.arange(taps) - (taps - 1) / 2
+    h = np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (h / h.sum()).astype(np.float32)
+
+
+class StreamResampler:
+    """Chunk-by-chunk resampler that carries its state across chunks.
+
+    Downsampling runs an anti-aliasing FIR first; output samples are then
+    linearly interpolated at fractional input positions, all vectorized.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int):
+        self.step = in_rate / out_rate
+        self._fir = _lowpass_fir(0.45 / self.step) if in_rate > out_rate else None
+        self._fir_history = np.zeros(FIR_TAPS - 1, dtype=np.float32)
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._pos = 0.0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self._fir is not None:
+            padded = np.concatenate((self._fir_history, samples))
+            self._fir_history = padded[-(FIR_TAPS - 1):]
+            samples = np.convolve(padded, self._fir, mode="valid").astype(np.float32)
+
+        buf = np.concatenate((self._tail, samples))
+        last = len(buf) - 1
+        if last < self._pos:
+            self._tail = buf
+            return np.zeros(0, dtype=np.float32)
+
+        count = int((last - self._pos) // self.step) + 1
+        positions = self._pos + self.step * np.arange(count)
+        index = positions.astype(np.int64)
+        frac = (positions - index).astype(np.float32)
+        out = buf[index] * (1 - frac) + buf[np.minimum(index + 1, last)] * frac
+
+        next_pos = self._pos + self.step * count
+        drop = min(int(next_pos), len(buf))
+        self._tail = buf[drop:]
+        self._pos = next_pos - drop
+        return out
+
+
+class AudioConverter:
+    """Converts one live stream's declared input format to 16 kHz mono s16le."""
+
+    def __init__(self, encoding: str = TARGET_ENCODING, sample_rate: int = TARGET_SAMPLE_RATE,
+                 channels: int = 1):
+        if encoding not in _SAMPLE_DTYPES:
+            raise ValueError(f"Unsupported input encoding: {encoding}")
+        if sample_rate <= 0 or channels <= 0:
+            raise ValueError("sample_rate and channels must be positive")
+
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.passthrough = (encoding == TARGET_ENCODING and sample_rate == TARGET_SAMPLE_RATE
+                            and channels == 1)
+
+        self._dtype = _SAMPLE_DTYPES[encoding]
+        self._frame_bytes = self._dtype.itemsize * channels
+        self._remainder = b""
+        self._resampler = (StreamResampler(sample_rate, TARGET_SAMPLE_RATE)
+                           if sample_rate != TARGET_SAMPLE_RATE else None)
+        self._timings: list[float] = []
+
+    def convert(self, chunk: bytes) -> bytes:
+        if self.passthrough:
+            return chunk
+
+        start = time.perf_counter()
+
+        # Chunks may split a frame; keep the partial frame for the next one
+        data = self._remainder + chunk
+        usable = len(data) - len(data) % self._frame_bytes
+        self._remainder = data[usable:]
+
+        samples = np.frombuffer(data[:usable], dtype=self._dtype).astype(np.float32)
+        if self._dtype.kind == "i":
+            samples /= 32768.0
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+
+        out = np.clip(samples * 32767.0, -32768, 32767).astype("<i2").tobytes()
+
+        self._timings.append(time.perf_counter() - start)
+        del self._timings[:-1000]
+        return out
+
+    def stats(self) -> dict:
+        if not self._timings:
+            return {"chunks": 0}
+        ms = np.array(self._timings) * 1000
+        return {
+            "chunks": len(ms),
+            "avg_ms": round(float(ms.mean()), 3),
+            "p95_ms": round(float(np.percentile(ms, 95)), 3),
+            "max_ms": round(float(ms.max()), 3),
+        }
@@ -0,0 +1,38 @@
+"""Per-chunk latency of the live audio converter.
+
+    python -m backend.utils.audio_bench --encoding pcm_f32le --sample-rate 48000 --chunk-ms 100
+"""
+import argparse
+
+import numpy as np
+
+from backend.utils.audio import AudioConverter, SUPPORTED_ENCODINGS
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Live audio conversion benchmark")
+    parser.add_argument("--encoding", choices=SUPPORTED_ENCODINGS, default="pcm_f32le")
+    parser.add_argument("--sample-rate", type=int, default=48000)
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    parser.add_argument("--seconds", type=int, default=60, help="audio length to stream")
+    args = parser.parse_args(argv)
+
+    frames = args.sample_rate * args.chunk_ms // 1000
+    rng = np.random.default_rng(0)
+    converter = AudioConverter(args.encoding, args.sample_rate, args.channels)
+
+    for _ in range(args.seconds * 1000 // args.chunk_ms):
+        samples = rng.uniform(-0.5, 0.5, frames * args.channels).astype(np.float32)
+        if args.encoding == "pcm_s16le":
+            chunk = (samples * 32767).astype("<i2").tobytes()
+        else:
+            chunk = samples.astype("<f4").tobytes()
+        converter.convert(chunk)
+
+    print(f"{args.encoding} {args.sample_rate} Hz x{args.channels}, {args.chunk_ms} ms chunks -> 16 kHz s16le")
+    print(converter.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+import httpx
+
+import backend.db.repository as db
+import backend.utils.jobs as jobs
+import backend.utils.result_cache as result_cache
+from backend.utils import metrics
+from backend.utils.logger import logger
+from backend.utils.transcription import (
+    ASSEMBLYAI_POLLING_INTERVAL,
+    TranscriptionError,
+    fetch_transcript,
+    submit_file,
+)
+
+# Many-file transcription. Every file is uploaded and submitted to
+# AssemblyAI as soon as an upload slot is free; the recognition itself runs
+# upstream, so all files of a batch are in progress at once and a single
+# task polls them. Only the uploads (local bandwidth) are bounded. Each
+# result is saved as a transcript of the batch owner.
+#
+# A batch is leased like a job (see jobs.py): after a restart, batches whose
+# owner stopped are claimed and their unfinished files resumed, polling the
+# ones already submitted instead of uploading them again.
+
+DEFAULT_CONCURRENCY = int(os.getenv("TRANSCRIPTION_BATCH_CONCURRENCY", "4"))
+MAX_UPLOADS = int(os.getenv("TRANSCRIPTION_BATCH_MAX_UPLOADS", "8"))
+MAX_BATCH_FILES = int(os.getenv("TRANSCRIPTION_BATCH_MAX_FILES", "200"))
+# Upper bound for one extracted archive member
+MAX_MEMBER_BYTES = int(os.getenv("TRANSCRIPTION_BATCH_MAX_MEMBER_MB", "1024")) * 1024 * 1024
+POLL_INTERVAL_SECONDS = float(ASSEMBLYAI_POLLING_INTERVAL or "3")
+
+# Uploads of all batches together
+_upload_slots = asyncio.Semaphore(MAX_UPLOADS)
+
+_runs: dict[str, asyncio.Task] = {}
+_heartbeat: asyncio.Task | None = None
+
+
+class BatchError(Exception):
+    """Raised for batch input that cannot be transcribed, e.g. a bad archive."""
+
+
+def is_archive(filename: str | None) -> bool:
+    return (filename or "").lower().endswith(".zip")
+
+
+def expand_archive(archive_path: str) -> list[tuple[str, str]]:
+    """Extract the files of a zip upload to temp files; returns (path, name) pairs.
+
+    Directories, hidden files and macOS resource forks are skipped. The
+    archive itself is deleted afterwards.
+    """
+    extracted = []
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.infolist():
+                name = os.path.basename(member.filename)
+                if member.is_dir() or not name or name.startswith(".") or "__MACOSX" in member.filename:
+                    continue
+                if member.file_size > MAX_MEMBER_BYTES:
+                    raise BatchError(f"Archive member too large: {member.filename}")
+                if len(extracted) >= MAX_BATCH_FILES:
+                    raise BatchError(f"Too many files, at most {MAX_BATCH_FILES} per batch")
+
+                with archive.open(member) as src, tempfile.NamedTemporaryFile(
+                    delete=False, suffix=os.path.splitext(name)[1]
+                ) as dst:
+                    extracted.append((dst.name, name))
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+    except zipfile.BadZipFile as e:
+        cleanup(extracted)
+        raise BatchError(f"Invalid zip archive: {e}")
+    except BatchError:
+        cleanup(extracted)
+        raise
+    finally:
+        _cleanup(archive_path)
+
+    return extracted
+
+
+def _cleanup(file_path: str | None) -> None:
+    if not file_path:
+        return
+    try:
+        os.unlink(file_path)
+    except OSError:
+        pass
+
+
+def cleanup(files: list[tuple[str, str]]) -> None:
+    for file_path, _ in files:
+        _cleanup(file_path)
+
+
+def _format_duration(seconds) -> str:
+    # Same m:ss format the frontend saves
+    if not seconds:
+        return "N/A"
+    return f"{int(seconds // 60)}:{int(seconds % 60):02d}"
+
+
+def transcript_fields(result: dict, filename: str) -> dict:
+    """Map a transcription response to the create_transcript arguments."""
+    utterances = result.get("utterances") or []
+    return {
+        "text": result.get("text") or "",
+        "title": filename,
+        "language_code": result.get("language_code") or "unknown",
+        "speakers": len({utt.get("speaker") for utt in utterances}),
+        "duration": _format_duration(result.get("audio_duration")),
+        "status": result.get("status"),
+        "utterances": utterances,
+        "confidence": result.get("confidence"),
+    }
+
+
+def _final(error: Exception) -> bool:
+    """Whether a polling error means the transcript will never finish."""
+    if isinstance(error, TranscriptionError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code < 500 and error.response.status_code != 429
+    return False
+
+
+class _Poller:
+    """Checks every submitted transcript once per interval, from one task."""
+
+    def __init__(self):
+        self._waiting: dict[str, tuple[asyncio.Future, dict, str]] = {}
+        self._task: asyncio.Task | None = None
+
+    def wait(self, transcript_id: str, params: dict, api_key: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[transcript_id] = (future, params, api_key)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    async def _check(self, transcript_id: str, future: asyncio.Future, params: dict, api_key: str) -> None:
+        try:
+            result = await fetch_transcript(transcript_id, params, api_key)
+        except Exception as e:
+            if not _final(e):
+                logger.warning(f"Polling transcript {transcript_id} failed, retrying: {e}")
+                return
+            self._waiting.pop(transcript_id, None)
+            if not future.done():
+                future.set_exception(e)
+            return
+
+        if result is not None:
+            self._waiting.pop(transcript_id, None)
+            if not future.done():
+                future.set_result(result)
+
+    async def _run(self) -> None:
+        while self._waiting:
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            for transcript_id, (future, _, _) in list(self._waiting.items()):
+                if future.done():
+                    self._waiting.pop(transcript_id, None)
+            await asyncio.gather(*(self._check(transcript_id, *waiting)
+                                   for transcript_id, waiting in list(self._waiting.items())))
+
+
+_poller = _Poller()
+
+
+class _BatchRun:
+    """Transcribes the unfinished files of one batch; items are (index, batch item)."""
+
+    def __init__(self, batch_id: str, user_id: str, params: dict, api_key: str, concurrency: int):
+        self.batch_id = batch_id
+        self.user_id = user_id
+        self.params = params
+        self.api_key = api_key
+        self._uploads = asyncio.Semaphore(concurrency)
+
+    async def run(self, items: list[tuple[int, dict]], failed: int = 0) -> None:
+        results = await asyncio.gather(*(self._run_item(index, item) for index, item in items))
+        failed += results.count(False)
+
+        status = "completed" if failed == 0 else "completed_with_errors"
+        await asyncio.to_thread(db.update_batch, self.batch_id, status=status, owner=None, lease_until=None)
+        logger.info(f"Transcription batch {self.batch_id} {status}.")
+
+    async def _run_item(self, index: int, item: dict) -> bool:
+        file_path, filename, job_id = item.get("file_path"), item["filename"], item.get("job_id")
+        try:
+            if job_id is None:
+                job_id = await asyncio.to_thread(db.create_job, params=self.params, file_path=file_path,
+                                                 filename=filename, batch_id=self.batch_id,
+                                                 user_id=self.user_id)
+                await asyncio.to_thread(db.update_batch_item, self.batch_id, index,
+                                        status="processing", job_id=job_id)
+
+            result = await self._transcribe(index, job_id, item)
+            transcript_id = await asyncio.to_thread(db.create_transcript, user_id=self.user_id,
+                                                    **transcript_fields(result, filename))
+            await asyncio.to_thread(db.update_batch_item, self.batch_id, index,
+                                    status="completed", transcript_id=transcript_id)
+            return True
+        except Exception as e:
+            logger.error(f"Batch {self.batch_id}: {filename} failed: {e}")
+            if job_id is not None:
+                await asyncio.to_thread(db.update_job, job_id, status="error", error=str(e))
+            await asyncio.to_thread(db.update_batch_item, self.batch_id, index, status="error", error=str(e))
+            return False
+        finally:
+            # Cache hits and failures; not on cancellation (shutdown) before
+            # the file was submitted, as it is needed to resume
+            if not asyncio.current_task().cancelling():
+                _cleanup(file_path)
+
+    async def _transcribe(self, index: int, job_id: str, item: dict) -> dict:
+        upstream_id, key = item.get("upstream_id"), item.get("cache_key")
+        submitted = None
+
+        if upstream_id is None:
+            audio_hash = await asyncio.to_thread(result_cache.hash_file, item["file_path"])
+            key = result_cache.cache_key(audio_hash, self.params)
+            result = await asyncio.to_thread(result_cache.lookup, key)
+            if result is not None:
+                await asyncio.to_thread(db.update_job, job_id, status="completed", result=result, cached=True)
+                return result
+
+            async with self._uploads, _upload_slots:
+                upstream_id = await asyncio.to_thread(submit_file, item["file_path"], self.params, self.api_key)
+            submitted = time.perf_counter()
+            await asyncio.to_thread(db.update_batch_item, self.batch_id, index,
+                                    upstream_id=upstream_id, cache_key=key)
+            # A resume polls upstream_id, so the audio is not needed any more
+            _cleanup(item["file_path"])
+            await asyncio.to_thread(db.update_job, job_id, status="processing")
+
+        result = await _poller.wait(upstream_id, self.params, self.api_key)
+        if submitted is not None:
+            metrics.UPSTREAM_LATENCY.labels("processing").observe(time.perf_counter() - submitted)
+
+        if key is not None:
+            await asyncio.to_thread(result_cache.store, key, result)
+        await asyncio.to_thread(db.update_job, job_id, status="completed", result=result)
+        return result
+
+
+async def _renew_leases() -> None:
+    while _runs:
+        await asyncio.sleep(jobs.LEASE_SECONDS / 3)
+        try:
+            await asyncio.to_thread(db.renew_batch_leases, jobs.OWNER, list(_runs), jobs.lease_until())
+        except Exception as e:
+            logger.warning(f"Renewing transcription batch leases failed: {e}")
+
+
+def _start(run: _BatchRun, items: list[tuple[int, dict]], failed: int = 0) -> None:
+    global _heartbeat
+    task = asyncio.create_task(run.run(items, failed))
+    _runs[run.batch_id] = task
+    task.add_done_callback(lambda _: _runs.pop(run.batch_id, None))
+
+    if _heartbeat is None or _heartbeat.done():
+        _heartbeat = asyncio.create_task(_renew_leases())
+
+
+async def start_batch(user_id: str, files: list[tuple[str, str]], params: dict, api_key: str,
+                      concurrency: int | None = None) -> str:
+    """Create the batch record and start transcribing; returns the batch id.
+
+    files are (path, filename) pairs owned by the batch from here on.
+    concurrency is the number of files of this batch uploading at once.
+    """
+    concurrency = max(1, min(concurrency or DEFAULT_CONCURRENCY, MAX_UPLOADS))
+    batch_id = await asyncio.to_thread(db.create_batch, user_id, params, files, concurrency,
+                                       jobs.OWNER, jobs.lease_until())
+
+    items = [(index, {"file_path": path, "filename": name}) for index, (path, name) in enumerate(files)]
+    _start(_BatchRun(batch_id, user_id, params, api_key, concurrency), items)
+    return batch_id
+
+
+def batch_progress(batch: dict) -> dict:
+    """Aggregate per-file states into the progress response."""
+    items = batch.get("items", [])
+    counts = {"queued": 0, "processing": 0, "completed": 0, "error": 0}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+
+    total = len(items)
+    finished = counts["completed"] + counts["error"]
+    return {
+        "batch_id": batch["_id"],
+        "status": batch["status"],
+        "total": total,
+        **counts,
+        "progress": round(finished / total, 3) if total else 1.0,
+        "created_at": batch.get("created_at"),
+        "updated_at": batch.get("updated_at"),
+        "items": items,
+    }
+
+
+async def resume_interrupted(api_key: str | None) -> int:
+    """Claim batches left by a stopped worker and finish their unfinished files.
+
+    Files already submitted upstream are only polled again. Files that were
+    not, and whose audio is gone (or with no API key), fail and are deleted.
+    """
+    resumed = 0
+    while (batch := await asyncio.to_thread(db.claim_batch, jobs.OWNER, jobs.lease_until())) is not None:
+        runnable, failed = [], 0
+        for index, item in enumerate(batch["items"]):
+            if item["status"] == "completed":
+                continue
+            if item["status"] == "error":
+                failed += 1
+            elif api_key and (item.get("upstream_id") or os.path.exists(item.get("file_path") or "")):
+                runnable.append((index, item))
+            else:
+                _cleanup(item.get("file_path"))
+                await asyncio.to_thread(db.update_batch_item, batch["_id"], index, status="error",
+                                        error="Interrupted by server restart.")
+                failed += 1
+
+        run = _BatchRun(batch["_id"], str(batch["user_id"]), batch["params"], api_key,
+                        batch.get("concurrency") or DEFAULT_CONCURRENCY)
+        _start(run, runnable, failed)
+        resumed += 1
+
+    if resumed:
+        logger.info(f"Resumed {resumed} transcription batch(es).")
+    return resumed
+
+
+def shutdown() -> None:
+    """Stop the running batches; their leases are released so the next start resumes them."""
+    batch_ids = list(_runs)
+    for task in list(_runs.values()):
+        task.cancel()
+    if _heartbeat is not None:
+        _heartbeat.cancel()
+    if batch_ids:
+        db.release_batch_leases(jobs.OWNER, batch_ids)
@@ -0,0 +1,409 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Iterator
+
+import numpy as np
+
+from backend.utils import metrics
+from backend.utils.logger import logger
+from backend.utils.transcription import (
+    ASSEMBLYAI_POLLING_INTERVAL,
+    fetch_transcript_sync,
+    submit_file,
+    transcribe_file,
+)
+
+# Opt-in split-and-stitch transcription for long files. The audio is cut in
+# silences found by a frame-energy VAD, neighbouring chunks overlap a little
+# so speakers can be matched across the cut, the chunks are transcribed in
+# parallel, and the results are merged back into one response with the
+# same schema as a single transcription.
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+# Block size for the energy pass, so hour-long files never go to float32 whole
+ENERGY_BLOCK_SECONDS = 60
+
+CHUNK_TARGET_SECONDS = int(os.getenv("CHUNK_TARGET_SECONDS", "300"))
+CHUNK_MAX_SECONDS = int(os.getenv("CHUNK_MAX_SECONDS", "420"))
+CHUNK_OVERLAP_SECONDS = float(os.getenv("CHUNK_OVERLAP_SECONDS", "8"))
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "8"))
+MIN_SILENCE_MS = 300
+# Frames quieter than the noise floor (10th percentile) plus this are silence
+SILENCE_MARGIN_DB = 10.0
+# Two transcriptions of the same word in an overlap start at most this far apart
+WORD_MATCH_MS = 250
+# Same-speaker utterances this close on both sides of a cut are joined
+MERGE_GAP_MS = 1500
+POLL_INTERVAL_SECONDS = float(ASSEMBLYAI_POLLING_INTERVAL or "3")
+
+_executor = ThreadPoolExecutor(max_workers=CHUNK_WORKERS, thread_name_prefix="chunk")
+
+
+def _decode_to(file_path: str, raw_path: str) -> bool:
+    """Write 16 kHz mono s16le samples of file_path to raw_path, streaming."""
+    if shutil.which("ffmpeg"):
+        try:
+            subprocess.run(
+                ["ffmpeg", "-nostdin", "-v", "error", "-y", "-i", file_path,
+                 "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), raw_path],
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True,
+            )
+        except subprocess.CalledProcessError as e:
+            # Whatever ffmpeg wrote before failing is discarded
+            logger.error(f"ffmpeg could not decode {file_path}: {e.stderr.decode(errors='replace')[:200]}")
+            return False
+        return True
+
+    try:
+        with wave.open(file_path, "rb") as wav, open(raw_path, "wb") as raw:
+            if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+                return False
+            while frames := wav.readframes(SAMPLE_RATE * ENERGY_BLOCK_SECONDS):
+                raw.write(frames)
+            return True
+    except (wave.Error, EOFError):
+        return False
+
+
+@contextmanager
+def decode_audio(file_path: str) -> Iterator[np.ndarray | None]:
+    """Decoded 16 kHz mono int16 samples, memory-mapped from a temp file.
+
+    The samples are never read into memory whole (a 3-hour recording is
+    ~345 MB of PCM); the energy pass and the chunk writer walk the mapping
+    in blocks. Uses ffmpeg when it is on PATH; without it only 16 kHz mono
+    16-bit WAV can be read, and None means the file has to go upstream unsplit.
+    """
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pcm") as tmp:
+        raw_path = tmp.name
+    try:
+        if not _decode_to(file_path, raw_path):
+            yield None
+        elif os.path.getsize(raw_path) < 2:
+            yield np.zeros(0, dtype="<i2")
+        else:
+            yield np.memmap(raw_path, dtype="<i2", mode="r")
+    finally:
+        try:
+            os.unlink(raw_path)
+        except OSError:
+            pass
+
+
+def frame_energy_db(samples: np.ndarray, frame: int = SAMPLE_RATE * FRAME_MS // 1000) -> np.ndarray:
+    """Mean-square energy per frame in dBFS."""
+    count = len(samples) // frame
+    block = (SAMPLE_RATE * ENERGY_BLOCK_SECONDS) // frame
+    energy = np.empty(count, dtype=np.float32)
+    for first in range(0, count, block):
+        last = min(first + block, count)
+        frames = samples[first * frame:last * frame].reshape(-1, frame).astype(np.float32) / 32768.0
+        energy[first:last] = np.einsum("ij,ij->i", frames, frames) / frame
+    return 10.0 * np.log10(energy + 1e-10)
+
+
+def silence_midpoints(samples: np.ndarray) -> np.ndarray:
+    """Sample positions in the middle of every long enough silence."""
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    db = frame_energy_db(samples, frame)
+    if not len(db):
+        return np.zeros(0, dtype=np.int64)
+
+    silent = db < np.percentile(db, 10) + SILENCE_MARGIN_DB
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    long_enough = (ends - starts) * FRAME_MS >= MIN_SILENCE_MS
+    return ((starts[long_enough] + ends[long_enough]) // 2) * frame
+
+
+def plan_cuts(total: int, candidates: np.ndarray) -> list[int]:
+    """Pick cut positions: the silence nearest each target length, hard cut at the max."""
+    target = CHUNK_TARGET_SECONDS * SAMPLE_RATE
+    longest = CHUNK_MAX_SECONDS * SAMPLE_RATE
+    shortest = target // 2
+
+    cuts = []
+    start = 0
+    while total - start > longest:
+        lo = np.searchsorted(candidates, start + shortest)
+        hi = np.searchsorted(candidates, start + longest, side="right")
+        window = candidates[lo:hi]
+        if len(window):
+            cut = int(window[np.argmin(np.abs(window - (start + target)))])
+        else:
+            cut = start + longest
+        cuts.append(cut)
+        start = cut
+    return cuts
+
+
+def _write_wav(samples: np.ndarray) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+        path = tmp.name
+    block = SAMPLE_RATE * ENERGY_BLOCK_SECONDS
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        for first in range(0, len(samples), block):
+            wav.writeframes(samples[first:first + block].tobytes())
+    return path
+
+
+def _chunk_params(params: dict) -> dict:
+    # A chunk may hear fewer speakers than the whole file
+    chunk_params = dict(params)
+    if chunk_params.get("speakers_expected") is not None:
+        chunk_params["max_speakers"] = chunk_params.pop("speakers_expected")
+    chunk_params["min_speakers"] = None
+    return chunk_params
+
+
+class ChunkCancelled(Exception):
+    """Raised by a chunk given up because another chunk of its file failed."""
+
+
+def _transcribe_chunk(samples: np.ndarray, params: dict, api_key: str, cancelled: threading.Event) -> dict:
+    """Submit one chunk and poll it, stopping as soon as cancelled is set."""
+    if cancelled.is_set():
+        raise ChunkCancelled()
+    path = _write_wav(samples)
+    start = time.perf_counter()
+    try:
+        transcript_id = submit_file(path, params, api_key)
+    finally:
+        os.unlink(path)
+
+    submitted = time.perf_counter()
+    while not cancelled.wait(POLL_INTERVAL_SECONDS):
+        result = fetch_transcript_sync(transcript_id, params, api_key)
+        if result is not None:
+            done = time.perf_counter()
+            metrics.UPSTREAM_LATENCY.labels("processing").observe(done - submitted)
+            metrics.UPSTREAM_LATENCY.labels("total").observe(done - start)
+            return result
+    raise ChunkCancelled()
+
+
+def _shift(items: list[dict] | None, offset_ms: int) -> list[dict]:
+    shifted = []
+    for item in items or []:
+        item = {**item, "start": item["start"] + offset_ms, "end": item["end"] + offset_ms}
+        if "words" in item:
+            item["words"] = _shift(item["words"], offset_ms)
+        shifted.append(item)
+    return shifted
+
+
+def _keep_words(words: list[dict], lo_ms: float, hi_ms: float) -> list[dict]:
+    return [word for word in words if lo_ms <= word["start"] < hi_ms]
+
+
+def _keep_utterances(utterances: list[dict], lo_ms: float, hi_ms: float) -> list[dict]:
+    """Drop the overlap another chunk owns, trimming utterances that cross it."""
+    kept = []
+    for utt in utterances:
+        words = utt.get("words")
+        if not words:
+            if lo_ms <= utt["start"] < hi_ms:
+                kept.append(utt)
+            continue
+        inside = _keep_words(words, lo_ms, hi_ms)
+        if not inside:
+            continue
+        if len(inside) != len(words):
+            utt = {**utt, "words": inside, "text": " ".join(w["text"] for w in inside),
+                   "start": inside[0]["start"], "end": inside[-1]["end"]}
+        kept.append(utt)
+    return kept
+
+
+def _speaker_words(result: dict) -> list[dict]:
+    return [word for utt in result.get("utterances") or [] for word in utt.get("words") or []]
+
+
+def _normalize(text: str) -> str:
+    return "".join(ch for ch in text.casefold() if ch.isalnum())
+
+
+def match_speakers(prev_words: list[dict], next_words: list[dict]) -> dict:
+    """Map the next chunk's labels to the previous chunk's by words both heard.
+
+    Words in the overlap are paired by start time and text; the label pairs
+    that co-occur most are assigned greedily, one to one.
+    """
+    if not prev_words or not next_words:
+        return {}
+
+    prev_starts = np.array([w["start"] for w in prev_words])
+    next_starts = np.array([w["start"] for w in next_words])
+    right = np.clip(np.searchsorted(prev_starts, next_starts), 0, len(prev_starts) - 1)
+    left = np.clip(right - 1, 0, len(prev_starts) - 1)
+    nearest = np.where(np.abs(next_starts - prev_starts[left]) <= np.abs(next_starts - prev_starts[right]),
+                       left, right)
+    close = np.abs(next_starts - prev_starts[nearest]) <= WORD_MATCH_MS
+
+    votes = {}
+    for j in np.flatnonzero(close):
+        prev_word, next_word = prev_words[nearest[j]], next_words[j]
+        if _normalize(prev_word["text"]) == _normalize(next_word["text"]):
+            pair = (next_word.get("speaker"), prev_word.get("speaker"))
+            votes[pair] = votes.get(pair, 0) + 1
+
+    mapping, used = {}, set()
+    for (local, global_label), _ in sorted(votes.items(), key=lambda kv: -kv[1]):
+        if local not in mapping and global_label not in used:
+            mapping[local] = global_label
+            used.add(global_label)
+    return mapping
+
+
+def _label(index: int) -> str:
+    # A, B, ... Z, AA, AB, ... like the upstream labels
+    label = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        label = chr(ord("A") + rem) + label
+    return label
+
+
+def _relabel(result: dict, mapping: dict, known: list[str], max_speakers: int | None = None) -> None:
+    """Rename a chunk's speakers in place.
+
+    A speaker not heard in the overlap gets a new global label, unless the
+    caller's speaker count is reached; then it takes a known label no other
+    speaker of this chunk has.
+    """
+    for utt in result.get("utterances") or []:
+        for item in [utt] + (utt.get("words") or []):
+            local = item.get("speaker")
+            if local is None:
+                continue
+            if local not in mapping and max_speakers and len(known) >= max_speakers:
+                free = [label for label in known if label not in mapping.values()]
+                if free:
+                    mapping[local] = free[0]
+            if local not in mapping:
+                index = len(known)
+                while _label(index) in known:
+                    index += 1
+                mapping[local] = _label(index)
+                known.append(mapping[local])
+            item["speaker"] = mapping[local]
+
+
+def stitch(results: list[dict], cuts_ms: list[int], overlap_ms: int, total_ms: int,
+           max_speakers: int | None = None) -> dict:
+    """Merge chunk results (already shifted to file time) into one response.
+
+    Chunk i owns the words starting between cut i-1 and cut i; the overlap
+    around each cut is only used to match speakers.
+    """
+    bounds = [0] + cuts_ms + [total_ms + 1]
+    known = sorted({utt["speaker"] for utt in results[0].get("utterances") or [] if utt.get("speaker")})
+
+    for i in range(1, len(results)):
+        overlap_lo, overlap_hi = bounds[i] - overlap_ms, bounds[i] + overlap_ms
+        prev = [w for w in _speaker_words(results[i - 1]) if overlap_lo <= w["start"] < overlap_hi]
+        nxt = [w for w in _speaker_words(results[i]) if overlap_lo <= w["start"] < overlap_hi]
+        _relabel(results[i], match_speakers(prev, nxt), known, max_speakers)
+
+    words, utterances, texts = [], [], []
+    confidence_sum, confidence_ms = 0.0, 0
+    for i, result in enumerate(results):
+        lo, hi = bounds[i], bounds[i + 1]
+
+        chunk_words = _keep_words(result.get("words") or [], lo, hi)
+        words.extend(chunk_words)
+
+        for n, utt in enumerate(_keep_utterances(result.get("utterances") or [], lo, hi)):
+            prev = utterances[-1] if utterances else None
+            if (n == 0 and prev is not None and prev.get("speaker") == utt.get("speaker")
+                    and utt["start"] - prev["end"] <= MERGE_GAP_MS):
+                # Same speaker on both sides of the cut: one utterance
+                merged = {**prev, "text": f"{prev['text']} {utt['text']}", "end": utt["end"]}
+                if "words" in prev or "words" in utt:
+                    merged["words"] = (prev.get("words") or []) + (utt.get("words") or [])
+                utterances[-1] = merged
+            else:
+                utterances.append(utt)
+
+        if chunk_words:
+            texts.append(" ".join(w["text"] for w in chunk_words))
+        elif result.get("text"):
+            texts.append(result["text"])
+
+        if result.get("confidence") is not None:
+            confidence_sum += result["confidence"] * (hi - lo)
+            confidence_ms += hi - lo
+
+    response_data = {
+        "id": ",".join(r["id"] for r in results if r.get("id")),
+        "status": results[0].get("status"),
+        "text": " ".join(texts),
+        "language_code": next((r["language_code"] for r in results if r.get("language_code")), None),
+    }
+    if any("utterances" in r for r in results):
+        response_data["utterances"] = utterances
+    if any("words" in r for r in results):
+        response_data["words"] = words
+    if any("confidence" in r for r in results):
+        response_data["confidence"] = confidence_sum / confidence_ms if confidence_ms else None
+    if any("audio_duration" in r for r in results):
+        response_data["audio_duration"] = round(total_ms / 1000)
+    return response_data
+
+
+def transcribe_chunked(file_path: str, params: dict, api_key: str) -> dict:
+    """Blocking; same result schema as transcribe_file, which it falls back to
+    for short or undecodable files."""
+    with decode_audio(file_path) as samples:
+        if samples is None:
+            logger.info("Chunked transcription: audio cannot be decoded locally, sending it whole.")
+            return transcribe_file(file_path, params, api_key)
+
+        cuts = plan_cuts(len(samples), silence_midpoints(samples))
+        if not cuts:
+            return transcribe_file(file_path, params, api_key)
+
+        overlap = int(CHUNK_OVERLAP_SECONDS * SAMPLE_RATE)
+        bounds = [0] + cuts + [len(samples)]
+        spans = [(max(bounds[i] - overlap, 0) if i else 0, min(bounds[i + 1] + overlap, len(samples)))
+                 for i in range(len(bounds) - 1)]
+        logger.info(f"Chunked transcription: {len(spans)} chunks of {len(samples) / SAMPLE_RATE:.0f} s audio.")
+
+        chunk_params = _chunk_params(params)
+        cancelled = threading.Event()
+        futures = [_executor.submit(_transcribe_chunk, samples[lo:hi], chunk_params, api_key, cancelled)
+                   for lo, hi in spans]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        errors = [future.exception() for future in done if future.exception() is not None]
+        if errors:
+            # One chunk failed: the others stop uploading and polling
+            cancelled.set()
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            raise errors[0]
+        results = [future.result() for future in futures]
+        total = len(samples)
+
+    for result, (lo, _) in zip(results, spans):
+        for key in ("words", "utterances"):
+            if key in result:
+                result[key] = _shift(result[key], lo * 1000 // SAMPLE_RATE)
+
+    return stitch(results, [cut * 1000 // SAMPLE_RATE for cut in cuts],
+                  int(CHUNK_OVERLAP_SECONDS * 1000), total * 1000 // SAMPLE_RATE,
+                  max_speakers=params.get("speakers_expected") or params.get("max_speakers"))
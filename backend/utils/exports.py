@@ -0,0 +1,193 @@
+import asyncio
+import os
+import re
+import zipfile
+from typing import AsyncIterator, Iterator
+from urllib.parse import quote
+
+from backend.db.transcript_cache import dumps
+
+# Transcript exports, written as generators so the routes can hand them to
+# StreamingResponse. Subtitle cues come from the utterance words (or the
+# utterance itself when it has none); bulk exports walk a Mongo cursor and
+# never hold more than one transcript in memory.
+
+CUE_MAX_CHARS = int(os.getenv("EXPORT_CUE_MAX_CHARS", "84"))
+CUE_MAX_MS = int(os.getenv("EXPORT_CUE_MAX_SECONDS", "7")) * 1000
+
+SINGLE_FORMATS = {
+    "srt": ("application/x-subrip", "srt"),
+    "vtt": ("text/vtt", "vtt"),
+    "txt": ("text/plain; charset=utf-8", "txt"),
+    "json": ("application/json", "json"),
+}
+BULK_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "zip": ("application/zip", "zip"),
+}
+
+_SENTENCE_END = (".", "?", "!", "…")
+_CHUNK_CHARS = 64 * 1024
+
+
+def _text(item: dict) -> str:
+    return item.get("text") or ""
+
+
+def _end(item: dict) -> int:
+    # Legacy items may lack an end; the cue then ends where it starts
+    end = item.get("end")
+    return item["start"] if end is None else end
+
+
+def _cue_groups(words: list[dict]) -> Iterator[list[dict]]:
+    group, length = [], 0
+    for word in words:
+        text = _text(word)
+        if group and (length + 1 + len(text) > CUE_MAX_CHARS
+                      or _end(word) - group[0]["start"] > CUE_MAX_MS):
+            yield group
+            group, length = [], 0
+        group.append(word)
+        length += len(text) + (1 if length else 0)
+        if text.endswith(_SENTENCE_END) and length > CUE_MAX_CHARS // 2:
+            yield group
+            group, length = [], 0
+    if group:
+        yield group
+
+
+def cues(doc: dict) -> Iterator[tuple[int, int, str | None, str]]:
+    """(start_ms, end_ms, speaker, text) subtitle cues of a decoded transcript."""
+    utterances = doc.get("utterances") or []
+    if not utterances and doc.get("words"):
+        utterances = [{"words": doc["words"]}]
+
+    for utterance in utterances:
+        words = [w for w in utterance.get("words") or [] if w.get("start") is not None]
+        if not words:
+            if utterance.get("start") is not None and utterance.get("text"):
+                yield utterance["start"], _end(utterance), utterance.get("speaker"), utterance["text"]
+            continue
+
+        for group in _cue_groups(words):
+            text = " ".join(filter(None, map(_text, group)))
+            yield group[0]["start"], _end(group[-1]), utterance.get("speaker"), text
+
+
+def _timestamp(ms: int, separator: str) -> str:
+    ms = max(int(ms), 0)
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+
+def srt(doc: dict) -> Iterator[str]:
+    for index, (start, end, speaker, text) in enumerate(cues(doc), start=1):
+        prefix = f"Speaker {speaker}: " if speaker else ""
+        yield f"{index}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{prefix}{text}\n\n"
+
+
+def vtt(doc: dict) -> Iterator[str]:
+    yield "WEBVTT\n\n"
+    for start, end, speaker, text in cues(doc):
+        voice = f"<v Speaker {speaker}>" if speaker else ""
+        yield f"{_timestamp(start, '.')} --> {_timestamp(end, '.')}\n{voice}{text}\n\n"
+
+
+def txt(doc: dict) -> Iterator[str]:
+    """Same layout as the frontend's TXT download."""
+    utterances = doc.get("utterances") or []
+    if not utterances:
+        yield doc.get("text") or ""
+        return
+
+    for i, utterance in enumerate(utterances):
+        total_seconds = int(utterance.get("start") or 0) // 1000
+        separator = "\n\n" if i else ""
+        yield (f"{separator}[{total_seconds // 60:02d}:{total_seconds % 60:02d}] "
+               f"Speaker {utterance.get('speaker')}: {_text(utterance)}")
+
+
+def export_single(doc: dict, fmt: str) -> Iterator[bytes]:
+    """srt, vtt or txt in ~64 KiB chunks.
+
+    StreamingResponse runs sync iterators in the threadpool, one hop per
+    chunk, so cues are batched rather than yielded one by one.
+    """
+    buffer, size = [], 0
+    for piece in {"srt": srt, "vtt": vtt, "txt": txt}[fmt](doc):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= _CHUNK_CHARS:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def _safe_name(title: str | None, fallback: str) -> str:
+    name = re.sub(r'[\x00-\x1f<>:"/\\|?*]+', "_", (title or "").strip()).strip(". ")
+    return name[:80] or fallback
+
+
+def content_disposition(title: str | None, fallback: str, extension: str) -> str:
+    """attachment header with an ASCII fallback and the UTF-8 name (RFC 6266)."""
+    filename = f"{_safe_name(title, fallback)}.{extension}"
+    ascii_name = filename.encode("ascii", "replace").decode().replace("?", "_")
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+async def ndjson(docs: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    async for doc in docs:
+        yield dumps(doc) + b"\n"
+
+
+class _ZipSink:
+    """Write-only file object for ZipFile; the bytes are drained after each member.
+
+    It has no tell()/seek(), so zipfile writes data descriptors instead of
+    seeking back to patch the local headers.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_member(archive: zipfile.ZipFile, name: str, data: bytes) -> None:
+    with archive.open(name, "w") as member:
+        member.write(data)
+
+
+async def zip_archive(docs: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """One JSON file per transcript, compressed off the event loop.
+
+    Only the central directory (a few hundred bytes per member) grows
+    with the number of transcripts.
+    """
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+
+    async for doc in docs:
+        # The id keeps names unique; the date and title make them readable
+        created = str(doc.get("created_at") or "")[:10]
+        name = f"{created}_{_safe_name(doc.get('title'), 'transcript')}_{doc['_id']}.json".lstrip("_")
+
+        await asyncio.to_thread(_zip_member, archive, name, dumps(doc))
+        yield sink.drain()
+
+    archive.close()
+    yield sink.drain()
@@ -0,0 +1,302 @@
+"""Local stand-in for the AssemblyAI endpoints this backend talks to.
+
+Implements the v3 streaming token endpoint, the v3 streaming WebSocket
+(Begin / Turn / Termination) and the v2 upload + transcript REST flow that
+aai.Transcriber drives, with configurable latencies and rates, so load and
+soak tests run offline. Transcripts are generated text, not recognition.
+
+    python -m backend.utils.fake_assemblyai --port 8765
+
+and start the backend with
+
+    ASSEMBLYAI_API_KEY=fake
+    ASSEMBLYAI_BASE_URL=http://127.0.0.1:8765
+    ASSEMBLYAI_STREAMING_URL=http://127.0.0.1:8765
+    ASSEMBLYAI_POLLING_INTERVAL=0.2
+"""
+import argparse
+import asyncio
+import json
+import random
+import struct
+import time
+import uuid
+from dataclasses import dataclass
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+
+
+@dataclass
+class FakeSettings:
+    token_latency_ms: int = 50
+    # REST: queued + processing time is base + factor * audio duration
+    transcript_latency_ms: int = 500
+    processing_factor: float = 0.0
+    error_rate: float = 0.0
+    # Streaming: audio time between partials and per final turn
+    partial_interval_ms: int = 300
+    turn_seconds: float = 3.0
+    stream_latency_ms: int = 100
+    words_per_second: float = 2.5
+
+
+settings = FakeSettings()
+
+app = FastAPI(title="Fake AssemblyAI")
+
+_VOCABULARY = ("the", "meeting", "starts", "with", "a", "short", "review", "of", "last",
+               "week", "and", "then", "we", "discuss", "next", "steps", "for", "project")
+
+_uploads: dict[str, float] = {}  # upload id -> audio seconds
+_transcripts: dict[str, dict] = {}
+
+
+def _words(count: int, start_ms: int = 0, speaker: str | None = None, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    step = int(1000 / settings.words_per_second)
+    words = []
+    for i in range(count):
+        word = {
+            "text": rng.choice(_VOCABULARY),
+            "start": start_ms + i * step,
+            "end": start_ms + i * step + int(step * 0.8),
+            "confidence": round(rng.uniform(0.8, 1.0), 3),
+        }
+        if speaker is not None:
+            word["speaker"] = speaker
+        words.append(word)
+    return words
+
+
+def _check_auth(request: Request) -> None:
+    if not request.headers.get("authorization"):
+        raise HTTPException(status_code=401, detail="Missing authorization header")
+
+
+def _audio_seconds(head: bytes, size: int) -> float:
+    # WAV header when there is one, otherwise assume ~128 kbit/s
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE" and len(head) >= 44:
+        byte_rate = struct.unpack("<I", head[28:32])[0]
+        if byte_rate:
+            return max(size - 44, 0) / byte_rate
+    return size / 16000
+
+
+# --- v3 streaming -----------------------------------------------------------
+
+@app.get("/v3/token")
+async def create_token(request: Request, expires_in_seconds: int = 600):
+    _check_auth(request)
+    await asyncio.sleep(settings.token_latency_ms / 1000)
+    return {"token": uuid.uuid4().hex, "expires_in_seconds": expires_in_seconds}
+
+
+class _StreamSession:
+    def __init__(self, websocket: WebSocket, sample_rate: int):
+        self.websocket = websocket
+        self.bytes_per_ms = sample_rate * 2 / 1000
+        self.started = time.monotonic()
+        self.audio_ms = 0.0
+        self.turn_order = 0
+        self.turn_start_ms = 0.0
+        self.next_partial_ms = settings.partial_interval_ms
+        self.outgoing = asyncio.Queue()
+
+    def _turn(self, end_of_turn: bool) -> dict:
+        turn_ms = self.audio_ms - self.turn_start_ms
+        count = max(int(turn_ms / 1000 * settings.words_per_second), 1 if end_of_turn else 0)
+        words = _words(count, int(self.turn_start_ms), seed=self.turn_order)
+        for i, word in enumerate(words):
+            word["word_is_final"] = end_of_turn or i < count - 1
+        transcript = " ".join(w["text"] for w in words)
+        return {
+            "type": "Turn",
+            "turn_order": self.turn_order,
+            "turn_is_formatted": end_of_turn,
+            "end_of_turn": end_of_turn,
+            "transcript": transcript.capitalize() + "." if end_of_turn and transcript else transcript,
+            "end_of_turn_confidence": 0.9 if end_of_turn else 0.1,
+            "words": words,
+        }
+
+    def _emit(self, message: dict) -> None:
+        self.outgoing.put_nowait((time.monotonic() + settings.stream_latency_ms / 1000, message))
+
+    def end_turn(self) -> None:
+        if self.audio_ms > self.turn_start_ms:
+            self._emit(self._turn(end_of_turn=True))
+            self.turn_order += 1
+            self.turn_start_ms = self.audio_ms
+            self.next_partial_ms = self.audio_ms + settings.partial_interval_ms
+
+    def add_audio(self, size: int) -> None:
+        self.audio_ms += size / self.bytes_per_ms
+        while self.audio_ms >= self.next_partial_ms:
+            self._emit(self._turn(end_of_turn=False))
+            self.next_partial_ms += settings.partial_interval_ms
+        if self.audio_ms - self.turn_start_ms >= settings.turn_seconds * 1000:
+            self.end_turn()
+
+    def terminate(self) -> None:
+        self.end_turn()
+        self._emit({
+            "type": "Termination",
+            "audio_duration_seconds": round(self.audio_ms / 1000),
+            "session_duration_seconds": round(time.monotonic() - self.started),
+        })
+        self.outgoing.put_nowait(None)
+
+    async def send_loop(self) -> None:
+        while True:
+            item = await self.outgoing.get()
+            if item is None:
+                break
+            due, message = item
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.websocket.send_text(json.dumps(message))
+
+
+@app.websocket("/v3/ws")
+async def stream(websocket: WebSocket):
+    if not websocket.query_params.get("token"):
+        await websocket.close(code=1008, reason="Missing token")
+        return
+
+    await websocket.accept()
+    session = _StreamSession(websocket, int(websocket.query_params.get("sample_rate", 16000)))
+    await websocket.send_text(json.dumps({
+        "type": "Begin",
+        "id": str(uuid.uuid4()),
+        "expires_at": int(time.time()) + 3600,
+    }))
+
+    sender = asyncio.create_task(session.send_loop())
+    try:
+        while True:
+            data = await websocket.receive()
+            if data.get("type") == "websocket.disconnect":
+                break
+            if data.get("bytes") is not None:
+                session.add_audio(len(data["bytes"]))
+            elif data.get("text") is not None:
+                msg_type = json.loads(data["text"]).get("type")
+                if msg_type == "ForceEndpoint":
+                    session.end_turn()
+                elif msg_type == "Terminate":
+                    session.terminate()
+                    await sender
+                    await websocket.close()
+                    break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+
+
+# --- v2 REST ----------------------------------------------------------------
+
+@app.post("/v2/upload")
+async def upload(request: Request):
+    _check_auth(request)
+    head, size = b"", 0
+    async for chunk in request.stream():
+        if len(head) < 44:
+            head += chunk[:44 - len(head)]
+        size += len(chunk)
+
+    upload_id = uuid.uuid4().hex
+    _uploads[upload_id] = _audio_seconds(head, size)
+    return {"upload_url": f"{str(request.base_url).rstrip('/')}/v2/files/{upload_id}"}
+
+
+@app.post("/v2/transcript")
+async def create_transcript(request: Request):
+    _check_auth(request)
+    config = await request.json()
+    upload_id = config.get("audio_url", "").rsplit("/", 1)[-1]
+    duration = _uploads.pop(upload_id, 30.0)
+
+    transcript_id = str(uuid.uuid4())
+    ready_in = settings.transcript_latency_ms / 1000 + settings.processing_factor * duration
+    _transcripts[transcript_id] = {
+        "config": config,
+        "duration": duration,
+        "ready_at": time.monotonic() + ready_in,
+        "failed": random.random() < settings.error_rate,
+    }
+    return {**config, "id": transcript_id, "status": "queued"}
+
+
+def _completed(transcript_id: str, record: dict) -> dict:
+    config = record["config"]
+    duration_ms = int(record["duration"] * 1000)
+    count = max(int(record["duration"] * settings.words_per_second), 1)
+
+    body = {**config, "id": transcript_id, "status": "completed",
+            "language_code": config.get("language_code") or "en",
+            "confidence": 0.93, "audio_duration": round(record["duration"])}
+
+    if config.get("speaker_labels"):
+        speakers = config.get("speakers_expected") or 2
+        utterances, words = [], []
+        per_turn = max(count // (speakers * 2), 1)
+        for turn, first in enumerate(range(0, count, per_turn)):
+            speaker = chr(ord("A") + turn % speakers)
+            turn_words = _words(min(per_turn, count - first), first * int(1000 / settings.words_per_second),
+                                speaker=speaker, seed=turn)
+            words.extend(turn_words)
+            utterances.append({
+                "speaker": speaker,
+                "text": " ".join(w["text"] for w in turn_words),
+                "start": turn_words[0]["start"],
+                "end": turn_words[-1]["end"],
+                "confidence": 0.93,
+                "words": turn_words,
+            })
+        body["utterances"] = utterances
+    else:
+        words = _words(count)
+
+    body["words"] = [w for w in words if w["start"] < max(duration_ms, 1)] or words[:1]
+    body["text"] = " ".join(w["text"] for w in body["words"])
+    return body
+
+
+@app.get("/v2/transcript/{transcript_id}")
+async def get_transcript(request: Request, transcript_id: str):
+    _check_auth(request)
+    record = _transcripts.get(transcript_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+
+    if time.monotonic() < record["ready_at"]:
+        return {**record["config"], "id": transcript_id, "status": "processing"}
+
+    del _transcripts[transcript_id]
+    if record["failed"]:
+        return {**record["config"], "id": transcript_id, "status": "error",
+                "error": "Simulated transcription failure"}
+
+    return _completed(transcript_id, record)
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake AssemblyAI upstream for offline tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for name, value in vars(FakeSettings()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args(argv)
+
+    for name in vars(FakeSettings()):
+        setattr(settings, name, getattr(args, name))
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import httpx
+
+# One pooled AsyncClient for the whole app lifetime, so upstream calls reuse
+# open TLS connections instead of paying a handshake per request.
+
+_client: httpx.AsyncClient | None = None
+
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITS)
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,160 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import backend.db.repository as db
+import backend.utils.result_cache as result_cache
+from backend.utils import metrics
+from backend.utils.logger import logger
+from backend.utils.chunked_transcription import transcribe_chunked
+from backend.utils.transcription import transcribe_file
+
+# Bounded worker pool for the blocking AssemblyAI SDK calls, so the event
+# loop never waits on an upstream transcription.
+MAX_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="transcribe")
+
+# Every unfinished job is leased by the process running it. The lease is
+# renewed while the job is queued or running here; a job whose lease ran
+# out belongs to a dead worker and is claimed by the next one to start.
+LEASE_SECONDS = int(os.getenv("TRANSCRIPTION_JOB_LEASE_SECONDS", "120"))
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_active: set[str] = set()
+_active_lock = threading.Lock()
+_heartbeat: threading.Thread | None = None
+_stopping = threading.Event()
+
+
+def lease_until() -> datetime:
+    return datetime.now() + timedelta(seconds=LEASE_SECONDS)
+
+
+def _renew_leases() -> None:
+    while not _stopping.wait(LEASE_SECONDS / 3):
+        with _active_lock:
+            job_ids = list(_active)
+        try:
+            db.renew_job_leases(OWNER, job_ids, lease_until())
+        except Exception as e:
+            logger.warning(f"Renewing transcription job leases failed: {e}")
+
+
+def track(job_id: str) -> None:
+    """Keep the lease of a job this process owns alive until release()."""
+    global _heartbeat
+    with _active_lock:
+        _active.add(job_id)
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_renew_leases, name="job-leases", daemon=True)
+            _heartbeat.start()
+
+
+def release(job_id: str) -> None:
+    with _active_lock:
+        _active.discard(job_id)
+
+
+def _cleanup(file_path: str) -> None:
+    try:
+        os.unlink(file_path)
+    except OSError:
+        pass
+
+
+def _run_job(job_id: str, file_path: str, params: dict, api_key: str, cache_key: str | None = None,
+             chunked: bool = False, queued_at: float | None = None) -> dict:
+    if queued_at is not None:
+        metrics.UPSTREAM_LATENCY.labels("queue").observe(time.perf_counter() - queued_at)
+    db.update_job(job_id, status="processing")
+    try:
+        if cache_key is None:
+            cache_key = result_cache.cache_key(result_cache.hash_file(file_path), params, chunked)
+            result = result_cache.lookup(cache_key)
+        else:
+            result = None
+
+        if result is None:
+            transcribe = transcribe_chunked if chunked else transcribe_file
+            result = transcribe(file_path, params, api_key)
+            result_cache.store(cache_key, result)
+    except Exception as e:
+        logger.error(f"Transcription job {job_id} failed: {e}")
+        db.update_job(job_id, status="error", error=str(e))
+        raise
+    else:
+        db.update_job(job_id, status="completed", result=result)
+        logger.info(f"Transcription job {job_id} completed.")
+        return result
+    finally:
+        release(job_id)
+        _cleanup(file_path)
+
+
+def submit_job(file_path: str, params: dict, api_key: str, filename: str | None = None,
+               audio_hash: str | None = None, chunked: bool = False,
+               user_id: str | None = None) -> tuple[str, Future]:
+    """Store a queued job in Mongo and hand it to the worker pool.
+
+    Returns the job id and the future of the running job; the uploaded file
+    at file_path is owned by the job and deleted when it finishes. When the
+    caller already knows the audio hash, a cache hit completes the job here
+    without touching the pool. chunked=True splits long audio on silence
+    and transcribes the parts in parallel (see chunked_transcription.py).
+    Jobs of user_id can only be read back by that user; jobs without one
+    are not readable through the API.
+    """
+    key = None
+    if audio_hash is not None:
+        key = result_cache.cache_key(audio_hash, params, chunked)
+        cached = result_cache.lookup(key)
+        if cached is not None:
+            _cleanup(file_path)
+            job_id = db.create_job(params=params, file_path=None, filename=filename, user_id=user_id)
+            db.update_job(job_id, status="completed", result=cached, cached=True)
+            future = Future()
+            future.set_result(cached)
+            return job_id, future
+
+    job_id = db.create_job(params=params, file_path=file_path, filename=filename, chunked=chunked,
+                           owner=OWNER, lease_until=lease_until(), user_id=user_id)
+    track(job_id)
+    future = _executor.submit(_run_job, job_id, file_path, params, api_key, key, chunked,
+                              queued_at=time.perf_counter())
+    return job_id, future
+
+
+def resume_pending_jobs(api_key: str | None) -> int:
+    """Claim jobs left by a stopped worker; re-queue them or fail the ones whose audio is gone.
+
+    Jobs another running worker holds a lease on are left alone.
+    """
+    resumed = 0
+    while (job := db.claim_job(OWNER, lease_until())) is not None:
+        file_path = job.get("file_path")
+        if api_key and file_path and os.path.exists(file_path):
+            track(job["_id"])
+            _executor.submit(_run_job, job["_id"], file_path, job["params"], api_key,
+                             chunked=job.get("chunked", False))
+            resumed += 1
+        else:
+            db.update_job(job["_id"], status="error", error="Job interrupted by server restart.")
+
+    if resumed:
+        logger.info(f"Resumed {resumed} transcription job(s).")
+    return resumed
+
+
+def shutdown() -> None:
+    """Cancel queued jobs and release their leases; running ones finish before exit."""
+    _stopping.set()
+    _executor.shutdown(wait=False, cancel_futures=True)
+    with _active_lock:
+        job_ids = list(_active)
+    if job_ids:
+        db.release_job_leases(OWNER, job_ids)
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import secrets
+import time
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from backend.utils import relay
+from backend.utils.live_relay import ClientOutbox, SessionMetrics, send_outbox
+from backend.utils.logger import get_logger
+
+logger = get_logger("live")
+
+# One speaker session watched by many viewers. The speaker's LiveRelay owns
+# the only upstream AssemblyAI connection and publishes every transcript
+# event here; each viewer gets its own bounded outbox, so a slow viewer never
+# holds up the speaker or the other viewers. Final turns are serialized once
+# and shared by all viewers.
+
+# Final turns kept for the catch-up snapshot of late joiners
+CATCHUP_MAX_TURNS = int(os.getenv("LIVE_CATCHUP_MAX_TURNS", "1000"))
+VIEWER_QUEUE_SIZE = int(os.getenv("LIVE_VIEWER_QUEUE_SIZE", "100"))
+MAX_VIEWERS = int(os.getenv("LIVE_MAX_VIEWERS", "500"))
+
+# WebSocket close codes sent to viewers
+CLOSE_FORBIDDEN = 4403
+CLOSE_UNKNOWN_SESSION = 4404
+CLOSE_TOO_MANY_VIEWERS = 4429
+CLOSE_LAGGING = 1013
+
+
+class Viewer:
+    """Read-only connection to a broadcast."""
+
+    def __init__(self, websocket: WebSocket, broadcast: "LiveBroadcast", snapshot: str):
+        self.websocket = websocket
+        self.metrics = SessionMetrics(broadcast.session_id)
+        self.outbox = ClientOutbox(self.metrics, maxsize=VIEWER_QUEUE_SIZE, initial=[snapshot])
+        self.delta_encoder: relay.PartialDeltaEncoder | None = None
+        self.lagging = False
+
+
+class LiveBroadcast:
+    """Fan-out of one live session's transcript events to its viewers."""
+
+    def __init__(self, session_id: str, user_id: str | None = None):
+        self.session_id = session_id
+        self.user_id = user_id
+        # Handed to the speaker only; viewers other than the owner present it
+        self.share_token = secrets.token_urlsafe(24)
+        self.started_at = time.time()
+        self.viewers: set[Viewer] = set()
+        self.turns: list[dict] = []
+        self.turns_omitted = 0
+        self.partial: dict | None = None
+        self.closed = False
+        self.viewers_total = 0
+        self.viewers_dropped = 0
+
+    def allows(self, user_id: str | None, share_token: str | None) -> bool:
+        """Viewers are the session owner or holders of the share token."""
+        if user_id and self.user_id and user_id == self.user_id:
+            return True
+        return bool(share_token) and secrets.compare_digest(share_token, self.share_token)
+
+    def snapshot(self) -> str:
+        """Compact catch-up message: final turn texts and the current partial."""
+        return relay.dumps({
+            "type": "catch_up",
+            "live_session_id": self.session_id,
+            "turns": self.turns,
+            "turns_omitted": self.turns_omitted,
+            "partial": self.partial,
+        })
+
+    def subscribe(self, websocket: WebSocket) -> Viewer | None:
+        # Snapshot and registration happen without yielding, so the viewer
+        # sees every event published after its catch-up snapshot
+        if self.closed or len(self.viewers) >= MAX_VIEWERS:
+            return None
+        viewer = Viewer(websocket, self, self.snapshot())
+        self.viewers.add(viewer)
+        self.viewers_total += 1
+        return viewer
+
+    def unsubscribe(self, viewer: Viewer) -> None:
+        self.viewers.discard(viewer)
+
+    async def publish(self, payload, partial_turn=None, turn: dict | None = None) -> None:
+        """Offer one event to every viewer; viewers that cannot keep up with finals are dropped."""
+        if self.closed:
+            return
+
+        if turn is not None:
+            # Words stay out of the snapshot; GET /live_sessions/{id} has them
+            self.turns.append({
+                "turn_order": turn.get("turn_order"),
+                "text": turn.get("text", ""),
+            })
+            if len(self.turns) > CATCHUP_MAX_TURNS:
+                del self.turns[0]
+                self.turns_omitted += 1
+            self.partial = None
+        elif partial_turn is not None:
+            self.partial = payload
+
+        for viewer in list(self.viewers):
+            if not await viewer.outbox.offer(payload, partial_turn=partial_turn):
+                # Outbox full of finals: cut the viewer loose, it can
+                # reconnect and catch up from the snapshot
+                viewer.lagging = True
+                self.viewers_dropped += 1
+                self.unsubscribe(viewer)
+                await viewer.outbox.close()
+
+    async def close(self) -> None:
+        """End the broadcast: viewers drain what they have and disconnect."""
+        if self.closed:
+            return
+        self.closed = True
+        live_broadcasts.pop(self.session_id, None)
+        for viewer in list(self.viewers):
+            await viewer.outbox.offer(relay.dumps({
+                "type": "broadcast_ended",
+                "live_session_id": self.session_id,
+            }))
+            await viewer.outbox.close()
+        logger.info(
+            f"Live broadcast {self.session_id} ended: "
+            f"{self.viewers_total} viewers, {self.viewers_dropped} dropped for lagging"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "live_session_id": self.session_id,
+            "age_seconds": round(time.time() - self.started_at, 1),
+            "viewers": len(self.viewers),
+            "viewers_total": self.viewers_total,
+            "viewers_dropped": self.viewers_dropped,
+            "final_turns": len(self.turns) + self.turns_omitted,
+        }
+
+
+# Broadcasting live sessions in this worker, by live session id
+live_broadcasts: dict[str, LiveBroadcast] = {}
+
+
+def start_broadcast(session_id: str, user_id: str | None = None) -> LiveBroadcast:
+    broadcast = LiveBroadcast(session_id, user_id)
+    live_broadcasts[session_id] = broadcast
+    return broadcast
+
+
+async def _viewer_intake(viewer: Viewer) -> None:
+    """Viewers only send control messages: delta mode and resync."""
+    try:
+        while True:
+            data = await viewer.websocket.receive()
+            if data.get("type") == "websocket.disconnect":
+                break
+            if data.get("text") is None:
+                continue
+
+            msg = relay.loads(data["text"])
+            msg_type = msg.get("type")
+            if msg_type == "configure" and "partial_deltas" in msg:
+                viewer.delta_encoder = relay.PartialDeltaEncoder() if msg["partial_deltas"] else None
+            elif msg_type == "resync" and viewer.delta_encoder is not None:
+                viewer.delta_encoder.force_snapshot()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    except Exception as e:
+        logger.info(f"Viewer intake error: {e}")
+
+
+async def watch(websocket: WebSocket, session_id: str) -> None:
+    """Serve one viewer of a broadcasting live session until either side ends."""
+    await websocket.accept()
+
+    broadcast = live_broadcasts.get(session_id)
+    if broadcast is None:
+        await websocket.close(code=CLOSE_UNKNOWN_SESSION, reason="Unknown or ended live session")
+        return
+
+    if not broadcast.allows(websocket.query_params.get("user_id"), websocket.query_params.get("share_token")):
+        await websocket.close(code=CLOSE_FORBIDDEN, reason="Not allowed to watch this live session")
+        return
+
+    viewer = broadcast.subscribe(websocket)
+    if viewer is None:
+        await websocket.close(code=CLOSE_TOO_MANY_VIEWERS, reason="Too many viewers")
+        return
+
+    intake = asyncio.create_task(_viewer_intake(viewer))
+    sender = asyncio.create_task(send_outbox(viewer))
+    try:
+        await asyncio.wait({intake, sender}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        broadcast.unsubscribe(viewer)
+        for task in (intake, sender):
+            task.cancel()
+        await asyncio.gather(intake, sender, return_exceptions=True)
+        try:
+            if viewer.lagging:
+                await websocket.close(code=CLOSE_LAGGING, reason="Viewer fell behind, reconnect to catch up")
+            else:
+                await websocket.close()
+        except Exception:
+            pass
@@ -0,0 +1,127 @@
+import asyncio
+import os
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+import backend.db.async_repository as db
+from backend.db import compact
+from backend.utils.logger import get_logger
+
+logger = get_logger("live")
+
+# Final turns of a live session are buffered here and written to Mongo in
+# bulk $push operations, whichever comes first of the size and time limits.
+FLUSH_INTERVAL_SECONDS = float(os.getenv("LIVE_FLUSH_INTERVAL_SECONDS", "2"))
+FLUSH_MAX_TURNS = int(os.getenv("LIVE_FLUSH_MAX_TURNS", "10"))
+
+_WORD_FIELDS = ("text", "start", "end", "confidence")
+
+
+def _stored_turn(turn: dict) -> dict:
+    stored = {
+        "turn_order": turn.get("turn_order"),
+        "text": turn.get("text", ""),
+        "turn_is_formatted": turn.get("turn_is_formatted", False),
+        "confidence": turn.get("confidence"),
+        "received_at": datetime.now(),
+    }
+
+    words = [{k: word.get(k) for k in _WORD_FIELDS} for word in turn.get("words") or []]
+    packed = compact.pack_words(words)
+    if packed is not None:
+        stored["words_packed"] = packed
+    elif words:
+        stored["words"] = words
+
+    return stored
+
+
+class LiveSessionWriter:
+    """Persists the final turns of one live session without blocking the relay.
+
+    add_turn() only appends to an in-memory buffer; a background task does
+    the Mongo writes.
+    """
+
+    def __init__(self, user_id: str | None = None):
+        self.session_id = str(ObjectId())
+        self.user_id = user_id
+        self._buffer = []
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def add_turn(self, turn: dict) -> None:
+        self._buffer.append(_stored_turn(turn))
+        if len(self._buffer) >= FLUSH_MAX_TURNS:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._buffer:
+            return
+
+        turns, self._buffer = self._buffer, []
+        try:
+            await db.append_live_turns(self.session_id, turns, user_id=self.user_id)
+        except Exception as e:
+            # Keep the turns and retry on the next flush
+            logger.error(f"Live session {self.session_id} flush failed: {e}")
+            self._buffer[:0] = turns
+
+    async def close(self, **summary) -> None:
+        """Flush what is left and mark the session as ended."""
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+        await self._flush()
+        try:
+            await db.end_live_session(self.session_id, **summary)
+        except Exception as e:
+            logger.error(f"Live session {self.session_id} could not be closed: {e}")
+
+
+def rebuild_transcript(session: dict) -> dict:
+    """Rebuild a transcript from the stored turns of a live session.
+
+    AssemblyAI sends a final turn twice with format_turns=true (raw, then
+    formatted), so the last stored version of each turn_order wins.
+    """
+    latest = {}
+    for turn in session.get("turns", []):
+        latest[turn.get("turn_order")] = turn
+
+    turns = [latest[key] for key in sorted(latest, key=lambda k: (k is None, k))]
+
+    utterances = []
+    for turn in turns:
+        words = compact.utterance_words(turn)
+        utterance = {"text": turn.get("text", ""), "confidence": turn.get("confidence"), "words": words}
+        if words:
+            utterance["start"] = words[0]["start"]
+            utterance["end"] = words[-1]["end"]
+        utterances.append(utterance)
+
+    return {
+        "session_id": session["_id"],
+        "user_id": session.get("user_id"),
+        "status": session.get("status", "active"),
+        "created_at": session.get("created_at"),
+        "ended_at": session.get("ended_at"),
+        "audio_duration": session.get("audio_duration"),
+        "text": " ".join(turn.get("text", "") for turn in turns).strip(),
+        "utterances": utterances,
+    }
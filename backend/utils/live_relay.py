@@ -0,0 +1,385 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+import websockets
+from fastapi import WebSocket, WebSocketDisconnect
+
+from backend.utils import metrics, relay
+from backend.utils.logger import get_logger
+
+logger = get_logger("live")
+
+# Bounded buffering between the two legs of a live session:
+#
+#   client --intake--> upstream queue --sender--> AssemblyAI
+#   client <--sender-- client outbox  <--reader-- AssemblyAI
+#
+# Audio and control messages are never dropped: a full upstream queue stops
+# reading from the client, which pushes back on the browser over TCP. On the
+# way back, a newer partial transcript replaces the pending partial of the
+# same turn, so a lagging client skips stale partials but gets every final.
+# Partials are encoded only when they are sent, so in delta mode (opt-in via
+# the "configure" control message) a delta is always relative to what the
+# client actually received.
+
+UPSTREAM_QUEUE_SIZE = int(os.getenv("LIVE_UPSTREAM_QUEUE_SIZE", "50"))
+CLIENT_QUEUE_SIZE = int(os.getenv("LIVE_CLIENT_QUEUE_SIZE", "100"))
+# Messages the websockets library may buffer from AssemblyAI before we read them
+UPSTREAM_MAX_QUEUE = int(os.getenv("LIVE_UPSTREAM_MAX_QUEUE", "16"))
+# How long to wait for AssemblyAI's Termination after the client stops
+TERMINATE_GRACE_SECONDS = 5.0
+
+_CLOSE = object()
+
+# Upstream audio is 16 kHz pcm_s16le
+_UPSTREAM_BYTES_PER_MS = 32
+
+
+class SessionMetrics:
+    """Queue depth, lag and throughput counters of one live session."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.audio_chunks_in = 0
+        self.audio_bytes_in = 0
+        self.audio_ms_up = 0.0
+        self.messages_out = 0
+        self.bytes_out = 0
+        self.dropped_partials = 0
+        self.max_upstream_depth = 0
+        self.max_client_depth = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.upstream_queue = None
+        self.outbox = None
+
+    def record_lag(self, seconds: float) -> None:
+        self.messages_out += 1
+        self.lag_total += seconds
+        self.lag_max = max(self.lag_max, seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "age_seconds": round(time.time() - self.started_at, 1),
+            "audio_chunks_in": self.audio_chunks_in,
+            "audio_bytes_in": self.audio_bytes_in,
+            "messages_out": self.messages_out,
+            "bytes_out": self.bytes_out,
+            "dropped_partials": self.dropped_partials,
+            "upstream_queue_depth": self.upstream_queue.qsize() if self.upstream_queue else 0,
+            "upstream_queue_max_depth": self.max_upstream_depth,
+            "client_queue_depth": len(self.outbox) if self.outbox else 0,
+            "client_queue_max_depth": self.max_client_depth,
+            "client_lag_avg_ms": round(self.lag_total / self.messages_out * 1000, 2) if self.messages_out else 0.0,
+            "client_lag_max_ms": round(self.lag_max * 1000, 2),
+        }
+
+
+# Live sessions running in this worker, by live session id
+active_sessions: dict[str, SessionMetrics] = {}
+
+
+class ClientOutbox:
+    """Bounded queue of messages for one client with partial coalescing."""
+
+    def __init__(self, metrics: SessionMetrics, maxsize: int = CLIENT_QUEUE_SIZE, initial=()):
+        now = time.perf_counter()
+        self._items = deque([payload, None, now] for payload in initial)  # [payload, partial turn_order or None, enqueued_at]
+        self._cond = asyncio.Condition()
+        self._closed = False
+        self._metrics = metrics
+        self.maxsize = maxsize
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _coalesce(self, payload, partial_turn) -> bool:
+        if partial_turn is not None:
+            for item in self._items:
+                if item[1] == partial_turn:
+                    # Superseded: keep the slot and the original enqueue
+                    # time, so lag reflects how stale the client view is
+                    item[0] = payload
+                    self._metrics.dropped_partials += 1
+                    return True
+        return False
+
+    def _append(self, payload, partial_turn) -> None:
+        self._items.append([payload, partial_turn, time.perf_counter()])
+        self._metrics.max_client_depth = max(self._metrics.max_client_depth, len(self._items))
+        self._cond.notify_all()
+
+    async def put(self, payload, partial_turn=None) -> None:
+        async with self._cond:
+            if self._coalesce(payload, partial_turn):
+                return
+
+            await self._cond.wait_for(lambda: len(self._items) < self.maxsize or self._closed)
+            if self._closed:
+                return
+
+            self._append(payload, partial_turn)
+
+    async def offer(self, payload, partial_turn=None) -> bool:
+        """Like put(), but never waits for space: False when the outbox is full."""
+        async with self._cond:
+            if self._coalesce(payload, partial_turn):
+                return True
+            if self._closed or len(self._items) >= self.maxsize:
+                return False
+            self._append(payload, partial_turn)
+            return True
+
+    async def get(self) -> tuple[object, float] | None:
+        """Next payload and its queueing delay; None once closed and drained."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._items or self._closed)
+            if not self._items:
+                return None
+            payload, _, enqueued_at = self._items.popleft()
+            self._cond.notify_all()
+            return payload, time.perf_counter() - enqueued_at
+
+    async def close(self) -> None:
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class LiveRelay:
+    """Runs one live session between a client WebSocket and AssemblyAI."""
+
+    def __init__(self, websocket: WebSocket, assemblyai_ws, converter, session_writer,
+                 session_summary: dict, broadcast=None):
+        self.websocket = websocket
+        self.assemblyai_ws = assemblyai_ws
+        self.converter = converter
+        self.session_writer = session_writer
+        self.session_summary = session_summary
+        # Optional LiveBroadcast that fans the transcript out to viewers
+        self.broadcast = broadcast
+
+        self.metrics = SessionMetrics(session_writer.session_id)
+        self.upstream_queue = asyncio.Queue(maxsize=UPSTREAM_QUEUE_SIZE)
+        self.outbox = ClientOutbox(self.metrics)
+        self.metrics.upstream_queue = self.upstream_queue
+        self.metrics.outbox = self.outbox
+        self.payload_sampler = relay.PayloadSampler(logger)
+        self.delta_encoder: relay.PartialDeltaEncoder | None = None
+
+    async def run(self) -> None:
+        active_sessions[self.metrics.session_id] = self.metrics
+        metrics.LIVE_SESSIONS_TOTAL.inc()
+        intake = asyncio.create_task(self._client_intake())
+        upstream_sender = asyncio.create_task(self._upstream_sender())
+        upstream_reader = asyncio.create_task(self._upstream_reader())
+        client_sender = asyncio.create_task(self._client_sender())
+        tasks = (intake, upstream_sender, upstream_reader, client_sender)
+
+        try:
+            done, _ = await asyncio.wait({intake, client_sender}, return_when=asyncio.FIRST_COMPLETED)
+            if intake in done:
+                # Client asked to stop or went away: let AssemblyAI flush the
+                # last turn and send Termination, then drain the outbox
+                await asyncio.wait({upstream_reader}, timeout=TERMINATE_GRACE_SECONDS)
+                await self.outbox.close()
+                await asyncio.wait({client_sender}, timeout=1.0)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            active_sessions.pop(self.metrics.session_id, None)
+            metrics.record_live_session_end(self.metrics)
+            if self.broadcast is not None:
+                await self.broadcast.close()
+            logger.info(f"Live session metrics: {self.metrics.snapshot()}")
+
+    async def _put_upstream(self, item) -> None:
+        await self.upstream_queue.put(item)
+        self.metrics.max_upstream_depth = max(self.metrics.max_upstream_depth, self.upstream_queue.qsize())
+
+    async def _client_intake(self) -> None:
+        """Read audio and control messages from the client into the bounded queue."""
+        try:
+            while True:
+                data = await self.websocket.receive()
+
+                if data.get("type") == "websocket.disconnect":
+                    raise WebSocketDisconnect(data.get("code", 1000))
+
+                if data.get("bytes") is not None:
+                    self.metrics.audio_chunks_in += 1
+                    self.metrics.audio_bytes_in += len(data["bytes"])
+                    # Send 16 kHz PCM audio bytes (converted if needed)
+                    audio = self.converter.convert(data["bytes"])
+                    if audio:
+                        self.metrics.audio_ms_up += len(audio) / _UPSTREAM_BYTES_PER_MS
+                        await self._put_upstream(audio)
+
+                elif data.get("text") is not None:
+                    # Handle control messages
+                    msg = relay.loads(data["text"])
+                    msg_type = msg.get("type")
+
+                    if msg_type == "terminate":
+                        logger.info("[Backend] Termination requested, shutting down")
+                        await self._put_upstream(json.dumps({"type": "Terminate"}))
+                        break
+
+                    elif msg_type == "force_endpoint":
+                        # Force end of turn
+                        await self._put_upstream(json.dumps({"type": "ForceEndpoint"}))
+
+                    elif msg_type == "configure":
+                        # Relay-side option: delta-encoded partials
+                        if "partial_deltas" in msg:
+                            self.delta_encoder = relay.PartialDeltaEncoder() if msg["partial_deltas"] else None
+                            await self.outbox.put(relay.dumps({
+                                "type": "configured",
+                                "partial_deltas": self.delta_encoder is not None,
+                                "snapshot_every": relay.DELTA_SNAPSHOT_EVERY,
+                            }))
+
+                        # Update upstream configuration
+                        if "end_of_turn_confidence_threshold" in msg:
+                            config_msg = {"type": "UpdateConfiguration"}
+                            config_msg["end_of_turn_confidence_threshold"] = msg[
+                                "end_of_turn_confidence_threshold"
+                            ]
+                            await self._put_upstream(json.dumps(config_msg))
+
+                    elif msg_type == "resync":
+                        # Client lost track of the deltas: next partial is full
+                        if self.delta_encoder is not None:
+                            self.delta_encoder.force_snapshot()
+
+        except WebSocketDisconnect:
+            # Client disconnected, terminate session
+            logger.info("[Backend] Client disconnected")
+            await self._put_upstream(json.dumps({"type": "Terminate"}))
+        except Exception as e:
+            logger.warning(f"[Backend] Client intake error: {e}")
+            await self._put_upstream(json.dumps({"type": "Terminate"}))
+        finally:
+            await self._put_upstream(_CLOSE)
+
+    async def _upstream_sender(self) -> None:
+        try:
+            while True:
+                item = await self.upstream_queue.get()
+                if item is _CLOSE:
+                    break
+                await self.assemblyai_ws.send(item)
+        except websockets.exceptions.ConnectionClosed as e:
+            logger.info(f"[AssemblyAI] Connection closed while sending: {e}")
+        except Exception as e:
+            logger.error(f"[Backend] Forward to AssemblyAI error: {e}")
+
+    async def _emit(self, payload, partial_turn=None, turn=None) -> None:
+        """Queue a message for the client and publish it to any viewers."""
+        await self.outbox.put(payload, partial_turn=partial_turn)
+        if self.broadcast is not None:
+            await self.broadcast.publish(payload, partial_turn=partial_turn, turn=turn)
+
+    async def _upstream_reader(self) -> None:
+        """Map AssemblyAI messages into the client outbox."""
+        try:
+            async for message in self.assemblyai_ws:
+                data = relay.loads(message)
+                msg_type = data.get("type")
+
+                # Session begins
+                if msg_type == "Begin":
+                    logger.info(f"Received: {msg_type}")
+                    await self._emit(relay.dumps({
+                        "type": "session_begins",
+                        "session_id": data.get("id"),
+                        "live_session_id": self.session_writer.session_id,
+                        "expires_at": data.get("expires_at"),
+                    }))
+
+                # Turn (transcript)
+                elif msg_type == "Turn":
+                    # Full payloads only at DEBUG, and sampled
+                    if self.payload_sampler.should_log():
+                        logger.debug(f"[AssemblyAI] Turn data: {message}")
+
+                    turn_data = relay.map_turn(data)
+                    if turn_data["end_of_turn"]:
+                        logger.info(f"Forwarded final transcript: '{turn_data['text']}'")
+                        self.session_writer.add_turn(turn_data)
+                        if turn_data.get("words"):
+                            # Word times are ms of session audio; what was sent
+                            # past the turn's last word is how late the final is
+                            lag_ms = self.metrics.audio_ms_up - turn_data["words"][-1]["end"]
+                            metrics.LIVE_TURN_LATENCY.observe(max(lag_ms, 0) / 1000)
+                        await self._emit(relay.dumps(turn_data), turn=turn_data)
+                    else:
+                        await self._emit(turn_data, partial_turn=turn_data["turn_order"])
+
+                # Session termination
+                elif msg_type == "Termination":
+                    logger.info("[AssemblyAI] Session terminated")
+                    self.session_summary["audio_duration"] = data.get("audio_duration_seconds")
+                    self.session_summary["session_duration"] = data.get("session_duration_seconds")
+                    await self._emit(relay.dumps({
+                        "type": "session_terminated",
+                        "audio_duration": data.get("audio_duration_seconds"),
+                        "session_duration": data.get("session_duration_seconds"),
+                    }))
+                    break
+
+                # Error
+                elif msg_type == "Error":
+                    logger.info(f"[AssemblyAI] Error received: {data.get('error')}")
+                    await self._emit(relay.dumps({
+                        "type": "error",
+                        "message": data.get("error", "Unknown error"),
+                    }))
+                    break
+
+            logger.info("[AssemblyAI] Message loop ended normally")
+        except websockets.exceptions.ConnectionClosed as e:
+            logger.info(f"[AssemblyAI] Connection closed: {e}")
+        except Exception as e:
+            logger.error(f"[AssemblyAI] Receive error: {e}")
+            await self._emit(relay.dumps({
+                "type": "error",
+                "message": f"AssemblyAI connection error: {str(e)}",
+            }))
+        finally:
+            await self.outbox.close()
+            if self.broadcast is not None:
+                await self.broadcast.close()
+
+    async def _client_sender(self) -> None:
+        await send_outbox(self)
+
+
+async def send_outbox(conn) -> None:
+    """Send a connection's outbox to its WebSocket until the outbox closes.
+
+    conn carries websocket, outbox, metrics and delta_encoder; used for the
+    speaker's connection and for every viewer of a broadcast.
+    """
+    try:
+        while True:
+            item = await conn.outbox.get()
+            if item is None:
+                break
+            payload, lag = item
+            if isinstance(payload, dict):
+                # Partial transcript, encoded against the last one sent
+                if conn.delta_encoder is not None:
+                    payload = conn.delta_encoder.encode(payload)
+                payload = relay.dumps(payload)
+            await conn.websocket.send_text(payload)
+            conn.metrics.bytes_out += len(payload)
+            conn.metrics.record_lag(lag)
+    except (WebSocketDisconnect, RuntimeError) as e:
+        logger.info(f"[Backend] Client disconnected, stopping forward: {e}")
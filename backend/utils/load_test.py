@@ -0,0 +1,144 @@
+"""Throughput / soak driver for a running backend, meant for use with the
+fake upstream in backend/utils/fake_assemblyai.py.
+
+    python -m backend.utils.load_test rest --requests 200 --concurrency 20
+    python -m backend.utils.load_test live --sessions 50 --seconds 60
+
+rest posts generated WAV files to /transcription/assemblyai/transcribe;
+live streams real-time paced 16 kHz PCM to the live WebSocket. Both print
+latency percentiles and error counts.
+"""
+import argparse
+import asyncio
+import io
+import json
+import time
+import wave
+
+import httpx
+import websockets
+
+
+def _percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 1)
+    return {"count": len(ordered), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": pick(1.0)}
+
+
+def _wav(seconds: float) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\0\0" * int(16000 * seconds))
+    return buffer.getvalue()
+
+
+async def run_rest(args) -> None:
+    audio = _wav(args.audio_seconds)
+    latencies, errors = [], 0
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=None) as client:
+        async def one(i: int) -> None:
+            nonlocal errors
+            async with gate:
+                start = time.perf_counter()
+                # Distinct bytes per request so the result cache does not answer
+                body = audio + i.to_bytes(4, "little")
+                response = await client.post(
+                    "/transcription/assemblyai/transcribe",
+                    files={"audio": (f"load{i}.wav", body, "audio/wav")},
+                    data={"speaker_labels": "true"},
+                )
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "requests": args.requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(args.requests / elapsed, 2),
+        "latency": _percentiles(latencies),
+    }, indent=2))
+
+
+async def run_live(args) -> None:
+    url = args.base_url.replace("http", "ws", 1) + "/transcription/assemblyai/transcribe/live"
+    chunk = b"\0\0" * (16000 * args.chunk_ms // 1000)
+    first_partial, final_counts, errors = [], [], 0
+
+    async def one() -> None:
+        nonlocal errors
+        finals = 0
+        try:
+            async with websockets.connect(url) as ws:
+                opened = time.perf_counter()
+
+                async def reader():
+                    nonlocal finals
+                    seen_partial = False
+                    async for message in ws:
+                        msg = json.loads(message)
+                        if msg["type"] == "partial_transcript" and not seen_partial:
+                            seen_partial = True
+                            first_partial.append(time.perf_counter() - opened)
+                        elif msg["type"] == "final_transcript":
+                            finals += 1
+                        elif msg["type"] == "error":
+                            raise RuntimeError(msg.get("message"))
+
+                read_task = asyncio.create_task(reader())
+                next_send = time.perf_counter()
+                for _ in range(args.seconds * 1000 // args.chunk_ms):
+                    await ws.send(chunk)
+                    next_send += args.chunk_ms / 1000
+                    await asyncio.sleep(max(next_send - time.perf_counter(), 0))
+                await ws.send(json.dumps({"type": "terminate"}))
+                await asyncio.wait_for(read_task, 30)
+        except Exception:
+            errors += 1
+        final_counts.append(finals)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.sessions)))
+
+    print(json.dumps({
+        "sessions": args.sessions,
+        "errors": errors,
+        "elapsed_s": round(time.perf_counter() - start, 2),
+        "finals_per_session": round(sum(final_counts) / len(final_counts), 1) if final_counts else 0,
+        "time_to_first_partial": _percentiles(first_partial),
+    }, indent=2))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Backend load test against a (fake) upstream")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    rest = sub.add_parser("rest")
+    rest.add_argument("--requests", type=int, default=100)
+    rest.add_argument("--concurrency", type=int, default=10)
+    rest.add_argument("--audio-seconds", type=float, default=30)
+
+    live = sub.add_parser("live")
+    live.add_argument("--sessions", type=int, default=10)
+    live.add_argument("--seconds", type=int, default=30)
+    live.add_argument("--chunk-ms", type=int, default=100)
+
+    args = parser.parse_args(argv)
+    asyncio.run(run_rest(args) if args.mode == "rest" else run_live(args))
+
+
+if __name__ == "__main__":
+    main()
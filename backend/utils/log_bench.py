@@ -0,0 +1,84 @@
+"""Measures what logging costs the event loop.
+
+Emits the live relay's typical INFO lines from inside an asyncio loop, once
+through the old setup (synchronous console + FileHandler on the loop
+thread) and once through the queue handler in backend/utils/logger.py, and
+reports the time each logger call holds the loop. Console output goes to
+/dev/null and files to a temp dir, so only the handler cost is compared.
+
+    python -m backend.utils.log_bench --messages 20000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener
+
+from backend.utils.logger import DroppingQueueHandler, JsonFormatter, SizeAndTimeRotatingFileHandler
+
+
+def _sync_logger(directory: str, devnull) -> logging.Logger:
+    log = logging.getLogger("bench.sync")
+    log.propagate = False
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+    for handler in (logging.StreamHandler(devnull), logging.FileHandler(os.path.join(directory, "sync.log"))):
+        handler.setFormatter(formatter)
+        log.addHandler(handler)
+    return log
+
+
+def _queued_logger(directory: str, devnull) -> tuple[logging.Logger, QueueListener]:
+    log = logging.getLogger("bench.queued")
+    log.propagate = False
+    console = logging.StreamHandler(devnull)
+    console.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+    file_handler = SizeAndTimeRotatingFileHandler(os.path.join(directory, "queued.log"), 20 * 1024 * 1024, 3, 3600)
+    file_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(maxsize=100000)
+    log.addHandler(DroppingQueueHandler(log_queue))
+    listener = QueueListener(log_queue, console, file_handler)
+    listener.start()
+    return log, listener
+
+
+async def _drive(log: logging.Logger, messages: int) -> list[float]:
+    timings = []
+    for i in range(messages):
+        start = time.perf_counter()
+        log.info(f"Forwarded final transcript: 'turn {i} of the lecture goes here'")
+        timings.append(time.perf_counter() - start)
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    return timings
+
+
+def _summary(timings: list[float]) -> str:
+    ordered = sorted(timings)
+    avg = sum(ordered) / len(ordered) * 1e6
+    p99 = ordered[int(len(ordered) * 0.99)] * 1e6
+    return f"avg {avg:7.2f} us   p99 {p99:7.2f} us   max {ordered[-1] * 1e6:8.1f} us"
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Logging overhead on the event loop")
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as devnull:
+        sync_log = _sync_logger(directory, devnull)
+        queued_log, listener = _queued_logger(directory, devnull)
+
+        sync_timings = asyncio.run(_drive(sync_log, args.messages))
+        queued_timings = asyncio.run(_drive(queued_log, args.messages))
+        listener.stop()
+
+    print(f"sync handlers : {_summary(sync_timings)}")
+    print(f"queue handler : {_summary(queued_timings)}")
+
+
+if __name__ == "__main__":
+    main()
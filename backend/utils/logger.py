@@ -1,31 +1,212 @@
+import atexit
+import contextvars
+import json
 import logging
-from logging.handlers import RotatingFileHandler
-from pathlib import Path
+import os
+import queue
+import threading
+import time
+import uuid
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
 
-# log könyvtár létrehozása
-Path("logs").mkdir(exist_ok=True)
+# Queue-based logging: the calling thread (usually the event loop) only puts
+# the record on a queue; a listener thread formats it and does the console
+# and file I/O. The log file is JSON lines, rotated by size and by age.
 
-logger = logging.getLogger("myapp")
-logger.setLevel(logging.INFO)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_DIR = Path(os.getenv("LOG_DIR", "logs"))
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_MB", "20")) * 1024 * 1024
+LOG_ROTATE_HOURS = float(os.getenv("LOG_ROTATE_HOURS", "24"))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "10"))
+# Records beyond this are dropped (and counted) instead of blocking the caller
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# "json" switches the console to JSON lines as well
+LOG_CONSOLE_FORMAT = os.getenv("LOG_CONSOLE_FORMAT", "text")
+# Keep every Nth INFO/DEBUG record per logger, e.g. "myapp.live=20"
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+# Set by the request middleware and the live WebSocket handler; copied onto
+# every record so the JSON lines can be grouped per request or session
+request_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar("request_id", default=None)
+session_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar("session_id", default=None)
+
+
+class ContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.session_id = session_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Passes every Nth INFO/DEBUG record of the configured loggers; warnings always pass."""
+
+    def __init__(self, rates: dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self._counts: dict[str, int] = {}
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "SamplingFilter":
+        rates = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            name, _, rate = item.partition("=")
+            rates[name.strip()] = max(int(rate), 1)
+        return cls(rates)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.name)
+        if rate is None or rate == 1 or record.levelno >= logging.WARNING:
+            return True
+        count = self._counts.get(record.name, 0)
+        self._counts[record.name] = count + 1
+        return count % rate == 0
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("request_id", "session_id"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """Numbered backups, rolled over at max_bytes or after interval_seconds."""
+
+    def __init__(self, filename, max_bytes: int, backup_count: int, interval_seconds: float):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding="utf-8", delay=True)
+        self.interval_seconds = interval_seconds
+        self.rollover_at = time.time() + interval_seconds
+
+    def shouldRollover(self, record) -> bool:
+        if time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval_seconds
+
+    def _open(self):
+        # The directory is created with the first record, not at import
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: a full queue drops the record and counts it."""
+
+    dropped = 0
 
-formatter = logging.Formatter(
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve the message here; formatting happens on the listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if not _started:
+            start_logging()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+text_formatter = logging.Formatter(
     "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
 )
 
 # Console handler
 console_handler = logging.StreamHandler()
-console_handler.setFormatter(formatter)
+console_handler.setFormatter(JsonFormatter() if LOG_CONSOLE_FORMAT == "json" else text_formatter)
+
+# File handler (JSON lines, rotating)
+file_handler = SizeAndTimeRotatingFileHandler(
+    LOG_DIR / LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_HOURS * 3600
+)
+file_handler.setFormatter(JsonFormatter())
+
+log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+queue_handler = DroppingQueueHandler(log_queue)
+queue_handler.addFilter(ContextFilter())
+queue_handler.addFilter(SamplingFilter.from_spec(LOG_SAMPLING))
+
+listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+
+# The listener thread starts with the first record, so importing this
+# module has no side effects beyond building the handler objects. _started
+# stays set after stop_logging, so records logged during shutdown do not
+# start a second thread; _running tells whether there is a thread to stop.
+_started = False
+_running = False
+_start_lock = threading.Lock()
+
+
+def start_logging() -> None:
+    global _started, _running
+    with _start_lock:
+        if not _started:
+            listener.start()
+            atexit.register(stop_logging)
+            _started = _running = True
+
+
+def stop_logging() -> None:
+    """Flush the queue and stop the listener thread; safe to call twice."""
+    global _running
+    with _start_lock:
+        if _running:
+            listener.stop()
+            _running = False
+
+logger = logging.getLogger("myapp")
+logger.setLevel(LOG_LEVEL)
+logger.addHandler(queue_handler)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Child of the app logger, e.g. get_logger("live") -> "myapp.live", for per-logger sampling."""
+    return logger.getChild(name)
+
+
+class RequestContextMiddleware:
+    """Pure ASGI middleware: tags log records with the request id.
+
+    Uses the caller's X-Request-ID when present and echoes it back.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-log_filename = f"logs/app_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+        request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
 
-# # File handler (rotating)
-# file_handler = RotatingFileHandler(
-#     "logs/app.log", maxBytes=5*1024*1024, backupCount=5
-# )
-file_handler = logging.FileHandler(log_filename)
-file_handler.setFormatter(formatter)
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
 
-# Dupla handler (console + file)
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,186 @@
+import functools
+import inspect
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Prometheus metrics served at /metrics. Live session numbers are not
+# updated per audio chunk: the collector below reads the relay's existing
+# SessionMetrics counters at scrape time, so the WebSocket loop pays nothing.
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "assemblyai_transcription_seconds",
+    "Pre-recorded transcription latency: local job queue wait, upload, AssemblyAI processing, total",
+    ["phase"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200),
+)
+
+REPOSITORY_LATENCY = Histogram(
+    "repository_call_duration_seconds",
+    "Duration of backend.db repository calls",
+    ["function", "mode"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+LIVE_TURN_LATENCY = Histogram(
+    "live_turn_latency_seconds",
+    "Audio streamed upstream past the end of a turn before its final transcript arrived",
+    buckets=(0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10),
+)
+
+LIVE_SESSIONS_TOTAL = Counter("live_sessions_total", "Live sessions started")
+
+STARTUP_SECONDS = Gauge(
+    "app_startup_seconds",
+    "Seconds from the start of the backend.main import to: app built (import), "
+    "warm-up done (ready), first HTTP response sent (first_request)",
+    ["phase"],
+)
+
+
+def record_startup(phase: str, started: float) -> None:
+    STARTUP_SECONDS.labels(phase).set(time.perf_counter() - started)
+
+
+# Totals of live sessions that already ended; running ones are read live
+_finished_live = {"audio_bytes_in": 0, "messages_out": 0, "dropped_partials": 0}
+
+
+def record_live_session_end(session) -> None:
+    """Fold an ended SessionMetrics into the running totals."""
+    for key in _finished_live:
+        _finished_live[key] += getattr(session, key)
+
+
+class _LiveSessionCollector:
+    _COUNTERS = (
+        ("audio_bytes_in", "Audio bytes received from live clients"),
+        ("messages_out", "Messages sent to live clients"),
+        ("dropped_partials", "Partial transcripts superseded before reaching a live client"),
+    )
+
+    def describe(self):
+        # Lets the registry check names without calling collect() at import
+        yield GaugeMetricFamily("live_sessions_active", "Live sessions running in this worker")
+        for key, help_text in self._COUNTERS:
+            yield CounterMetricFamily(f"live_{key}", help_text)
+
+    def collect(self):
+        # Imported here: live_relay imports this module
+        from backend.utils.live_relay import active_sessions
+
+        sessions = list(active_sessions.values())
+        yield GaugeMetricFamily("live_sessions_active", "Live sessions running in this worker",
+                                value=len(sessions))
+
+        for key, help_text in self._COUNTERS:
+            total = _finished_live[key] + sum(getattr(s, key) for s in sessions)
+            yield CounterMetricFamily(f"live_{key}", help_text, value=total)
+
+
+REGISTRY.register(_LiveSessionCollector())
+
+
+class _TranscriptCacheCollector:
+    def describe(self):
+        yield CounterMetricFamily("transcript_cache_hits", "Transcript cache hits")
+        yield CounterMetricFamily("transcript_cache_misses", "Transcript cache misses")
+        yield GaugeMetricFamily("transcript_cache_bytes", "Size of the cached transcript bodies")
+        yield GaugeMetricFamily("transcript_cache_entries", "Transcripts in the cache")
+
+    def collect(self):
+        from backend.db.transcript_cache import cache
+
+        stats = cache.stats()
+        yield CounterMetricFamily("transcript_cache_hits", "Transcript cache hits", value=stats["hits"])
+        yield CounterMetricFamily("transcript_cache_misses", "Transcript cache misses", value=stats["misses"])
+        yield GaugeMetricFamily("transcript_cache_bytes", "Size of the cached transcript bodies",
+                                value=stats["bytes"])
+        yield GaugeMetricFamily("transcript_cache_entries", "Transcripts in the cache", value=stats["entries"])
+
+
+REGISTRY.register(_TranscriptCacheCollector())
+
+
+def _timed(func, histogram):
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+    else:
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+    return timed
+
+
+def instrument_repository(namespace: dict, mode: str) -> None:
+    """Wrap the public functions of a repository module with call timing.
+
+    Called at the bottom of the module, so the wrapped functions are the
+    ones every `db.<function>` lookup sees.
+    """
+    for name, func in list(namespace.items()):
+        if name.startswith("_") or not inspect.isfunction(func) or func.__module__ != namespace["__name__"]:
+            continue
+        namespace[name] = _timed(func, REPOSITORY_LATENCY.labels(name, mode))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing HTTP requests by route template.
+
+    Unmatched paths share one label, so scanners cannot blow up the series
+    count. WebSocket scopes pass straight through. With started set, the
+    first response is recorded as the first_request startup phase.
+    """
+
+    def __init__(self, app, started: float | None = None):
+        self.app = app
+        self.started = started
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status),
+            ).observe(time.perf_counter() - start)
+
+            if self.started is not None:
+                record_startup("first_request", self.started)
+                self.started = None
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
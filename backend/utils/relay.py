@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+
+# Hot-path helpers for the live WebSocket relay: one fast JSON codec and a
+# Turn -> client message mapping that reuses the upstream word dicts.
+
+try:
+    import orjson
+
+    CODEC = "orjson"
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    loads = orjson.loads
+except ImportError:  # orjson is optional, fall back to the stdlib codec
+    CODEC = "json"
+    _encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+    def dumps(obj) -> str:
+        return _encoder.encode(obj)
+
+    loads = json.loads
+
+# Log every Nth Turn payload in full, and only when DEBUG is enabled.
+PAYLOAD_LOG_SAMPLE_RATE = int(os.getenv("LIVE_PAYLOAD_LOG_SAMPLE_RATE", "50"))
+
+
+class PayloadSampler:
+    """Decides which upstream payloads are worth logging in full."""
+
+    def __init__(self, logger: logging.Logger, every: int = PAYLOAD_LOG_SAMPLE_RATE):
+        self._logger = logger
+        self._every = max(every, 1)
+        self._count = 0
+
+    def should_log(self) -> bool:
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return False
+        self._count += 1
+        return self._count % self._every == 1 or self._every == 1
+
+
+def map_turn(data: dict) -> dict:
+    """Map an AssemblyAI v3 Turn message to the client message.
+
+    The upstream word objects already carry the fields the client expects
+    (text/start/end/confidence/word_is_final), so they are passed through
+    instead of being rebuilt one dict per word.
+    """
+    end_of_turn = data.get("end_of_turn", False)
+    turn_data = {
+        "type": "final_transcript" if end_of_turn else "partial_transcript",
+        "text": data.get("transcript", ""),
+        "end_of_turn": end_of_turn,
+        "turn_is_formatted": data.get("turn_is_formatted", False),
+        "turn_order": data.get("turn_order"),
+    }
+
+    words = data.get("words")
+    if words is not None:
+        turn_data["words"] = words
+
+    if "end_of_turn_confidence" in data:
+        turn_data["confidence"] = data["end_of_turn_confidence"]
+
+    return turn_data
+
+
+# Delta mode: a full partial every this many partials, so a client that
+# missed or misapplied a delta resyncs on its own.
+DELTA_SNAPSHOT_EVERY = int(os.getenv("LIVE_DELTA_SNAPSHOT_EVERY", "20"))
+
+
+def _common_prefix(a, b) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class PartialDeltaEncoder:
+    """Turns successive partials of a turn into suffix deltas.
+
+    The client rebuilds a partial as previous[:keep] + suffix, for both the
+    text and the words array. The first partial of a turn, every Nth partial
+    and any partial after force_snapshot() go out as a full
+    "partial_transcript" message with "snapshot": true.
+    """
+
+    def __init__(self, snapshot_every: int = DELTA_SNAPSHOT_EVERY):
+        self.snapshot_every = max(snapshot_every, 1)
+        self._turn = None
+        self._text = ""
+        self._words = []
+        self._since_snapshot = 0
+
+    def force_snapshot(self) -> None:
+        self._turn = None
+
+    def encode(self, turn_data: dict) -> dict:
+        turn = turn_data.get("turn_order")
+        text = turn_data.get("text", "")
+        words = turn_data.get("words") or []
+
+        if turn != self._turn or self._since_snapshot >= self.snapshot_every:
+            message = {**turn_data, "snapshot": True}
+            self._since_snapshot = 0
+        else:
+            text_keep = _common_prefix(self._text, text)
+            words_keep = _common_prefix(self._words, words)
+            message = {
+                "type": "partial_delta",
+                "turn_order": turn,
+                "text_keep": text_keep,
+                "text": text[text_keep:],
+                "words_keep": words_keep,
+                "words": words[words_keep:],
+            }
+            if "confidence" in turn_data:
+                message["confidence"] = turn_data["confidence"]
+            self._since_snapshot += 1
+
+        self._turn = turn
+        self._text = text
+        self._words = words
+        return message
@@ -0,0 +1,100 @@
+"""Micro-benchmark of the live relay's per-message work.
+
+Compares the original Turn handling (json.loads, indented payload dump for
+the log, per-word dict rebuild, send_json re-serialization) with the lean
+path in backend/utils/relay.py. No network or upstream is involved.
+
+    python -m backend.utils.relay_bench --words 40 --messages 20000
+"""
+import argparse
+import json
+import time
+
+from backend.utils import relay
+
+
+def _turn_message(n_words: int, turn_order: int = 1) -> str:
+    words = [
+        {
+            "text": f"word{i}",
+            "start": 1000 + i * 320,
+            "end": 1000 + i * 320 + 280,
+            "confidence": 0.91,
+            "word_is_final": i < n_words - 2,
+        }
+        for i in range(n_words)
+    ]
+    return json.dumps({
+        "type": "Turn",
+        "turn_order": turn_order,
+        "turn_is_formatted": False,
+        "end_of_turn": False,
+        "transcript": " ".join(w["text"] for w in words),
+        "end_of_turn_confidence": 0.12,
+        "words": words,
+    })
+
+
+def _legacy(message: str) -> str:
+    data = json.loads(message)
+    _ = f"[AssemblyAI] Turn data: {json.dumps(data, indent=2)}"
+    turn_data = {
+        "type": "final_transcript" if data.get("end_of_turn") else "partial_transcript",
+        "text": data.get("transcript", ""),
+        "end_of_turn": data.get("end_of_turn", False),
+        "turn_is_formatted": data.get("turn_is_formatted", False),
+        "turn_order": data.get("turn_order"),
+    }
+    if "words" in data:
+        turn_data["words"] = [
+            {
+                "text": word.get("text"),
+                "start": word.get("start"),
+                "end": word.get("end"),
+                "confidence": word.get("confidence"),
+                "word_is_final": word.get("word_is_final", False),
+            }
+            for word in data["words"]
+        ]
+    if "end_of_turn_confidence" in data:
+        turn_data["confidence"] = data["end_of_turn_confidence"]
+    _ = f"Forwarding transcript to client: '{turn_data['text']}'"
+    return json.dumps(turn_data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"))
+
+
+def _lean(message: str) -> str:
+    return relay.dumps(relay.map_turn(relay.loads(message)))
+
+
+def _measure(func, message: str, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        func(message)
+    return time.perf_counter() - start
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Live relay hot-path benchmark")
+    parser.add_argument("--words", type=int, default=40, help="words per Turn message")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=10.0, help="partials per second per session")
+    args = parser.parse_args(argv)
+
+    message = _turn_message(args.words)
+    print(f"codec: {relay.CODEC}, {args.words} words/message, {args.messages} messages")
+
+    for name, func in (("legacy", _legacy), ("lean", _lean)):
+        _measure(func, message, min(args.messages, 1000))  # warm-up
+        elapsed = _measure(func, message, args.messages)
+        per_message_us = elapsed / args.messages * 1e6
+        # CPU time one session costs the worker per second at --rate partials/s
+        session_ms_per_s = per_message_us * args.rate / 1000
+        print(
+            f"{name:>6}: {args.messages / elapsed:10.0f} msg/s  "
+            f"{per_message_us:8.1f} us/msg added latency  "
+            f"{session_ms_per_s:6.2f} ms CPU per session-second"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import timedelta
+
+import backend.db.repository as db
+from backend.utils.logger import logger
+from backend.utils.transcription import build_config_params
+
+# Finished transcriptions keyed on sha256(audio) + normalized config, so a
+# re-upload of the same recording skips the AssemblyAI run entirely.
+MAX_ENTRIES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_ENTRIES", "500"))
+MAX_AGE = timedelta(days=int(os.getenv("TRANSCRIPTION_CACHE_MAX_AGE_DAYS", "30")))
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(audio_hash: str, params: dict, chunked: bool = False) -> str:
+    """Combine the audio hash with the config AssemblyAI would actually receive.
+
+    Chunked runs are stitched locally (and may renumber speakers), so they
+    get their own entries; whole-file keys keep their original form.
+    """
+    params = dict(params)
+    if params.get("language_code"):
+        params["language_code"] = params["language_code"].strip().lower()
+
+    config = json.dumps(build_config_params(**params), sort_keys=True)
+    mode = ":chunked" if chunked else ""
+    return hashlib.sha256(f"{audio_hash}:{config}{mode}".encode()).hexdigest()
+
+
+def lookup(key: str) -> dict | None:
+    global _hits, _misses
+
+    result = db.get_cached_transcription(key, max_age=MAX_AGE)
+    with _lock:
+        if result is None:
+            _misses += 1
+        else:
+            _hits += 1
+
+    if result is not None:
+        logger.info(f"Transcription cache hit: {key[:12]}.")
+    return result
+
+
+def store(key: str, result: dict) -> None:
+    db.store_cached_transcription(key, result)
+    evicted = db.evict_cached_transcriptions(max_entries=MAX_ENTRIES, max_age=MAX_AGE)
+    if evicted:
+        logger.info(f"Evicted {evicted} transcription cache entries.")
+
+
+def stats() -> dict:
+    with _lock:
+        hits, misses = _hits, _misses
+
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "entries": db.count_cached_transcriptions(),
+        "max_entries": MAX_ENTRIES,
+        "max_age_days": MAX_AGE.days,
+    }
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import time
+
+from backend.utils.http_client import get_http_client
+from backend.utils.logger import logger
+
+# Pool of pre-fetched, single-use AssemblyAI streaming tokens. A live session
+# takes a ready token instead of waiting for a token round trip; a background
+# task refills the pool and drops tokens that are about to expire.
+
+# Overridable to point live sessions at a local fake (backend/utils/fake_assemblyai.py)
+STREAMING_BASE_URL = os.getenv("ASSEMBLYAI_STREAMING_URL", "https://streaming.assemblyai.com").rstrip("/")
+STREAMING_TOKEN_URL = f"{STREAMING_BASE_URL}/v3/token"
+STREAMING_WS_URL = STREAMING_BASE_URL.replace("https://", "wss://", 1).replace("http://", "ws://", 1) + "/v3/ws"
+
+TOKEN_TTL_SECONDS = 600
+# Tokens closer than this to expiry are discarded instead of handed out
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
+POOL_SIZE = int(os.getenv("STREAMING_TOKEN_POOL_SIZE", "2"))
+REFRESH_INTERVAL_SECONDS = 30
+
+
+class TokenError(Exception):
+    """Raised when AssemblyAI refuses to issue a streaming token."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+async def fetch_token(api_key: str, expires_in_seconds: int = TOKEN_TTL_SECONDS) -> dict:
+    response = await get_http_client().get(
+        STREAMING_TOKEN_URL,
+        headers={"Authorization": api_key},
+        params={"expires_in_seconds": expires_in_seconds},
+    )
+
+    if response.status_code != 200:
+        raise TokenError(response.status_code, f"Failed to create token: {response.text}")
+
+    return response.json()
+
+
+class StreamingTokenPool:
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self._tokens: list[tuple[str, float]] = []  # (token, usable until)
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._api_key: str | None = None
+        self.warm_hits = 0
+        self.cold_fetches = 0
+        self._session_starts = {"warm": [], "cold": []}
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        self._tokens = [(token, until) for token, until in self._tokens if until > now]
+
+    async def _run(self) -> None:
+        # Wakes up on every acquire() and at least once per refresh interval,
+        # so tokens are replaced before they expire even when the app is idle.
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), REFRESH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self._prune()
+            try:
+                while len(self._tokens) < self.size:
+                    data = await fetch_token(self._api_key)
+                    self._tokens.append(
+                        (data["token"], time.monotonic() + TOKEN_TTL_SECONDS - TOKEN_EXPIRY_MARGIN_SECONDS)
+                    )
+            except Exception as e:
+                logger.error(f"Streaming token pre-fetch failed: {e}")
+
+    def start(self, api_key: str) -> None:
+        """Start pre-fetching tokens in the background; safe to call repeatedly."""
+        self._api_key = api_key
+        if self.size <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    async def acquire(self, api_key: str) -> tuple[str, bool]:
+        """Return a token and whether it came pre-fetched from the pool."""
+        self._prune()
+        if self._tokens:
+            token, _ = self._tokens.pop(0)
+            self.warm_hits += 1
+            warm = True
+        else:
+            token = (await fetch_token(api_key))["token"]
+            self.cold_fetches += 1
+            warm = False
+
+        self.start(api_key)
+        return token, warm
+
+    def record_session_start(self, seconds: float, warm: bool) -> None:
+        """Track the time from client accept to upstream connected."""
+        samples = self._session_starts["warm" if warm else "cold"]
+        samples.append(seconds)
+        del samples[:-200]
+
+    def stats(self) -> dict:
+        def summary(samples):
+            if not samples:
+                return {"count": 0}
+            ordered = sorted(samples)
+            return {
+                "count": len(ordered),
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1),
+            }
+
+        return {
+            "pool_size": self.size,
+            "ready_tokens": len(self._tokens),
+            "warm_hits": self.warm_hits,
+            "cold_fetches": self.cold_fetches,
+            "session_start_warm": summary(self._session_starts["warm"]),
+            "session_start_cold": summary(self._session_starts["cold"]),
+        }
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._tokens.clear()
+
+
+token_pool = StreamingTokenPool()
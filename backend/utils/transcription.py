@@ -0,0 +1,226 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+from backend.utils import metrics
+from backend.utils.http_client import get_http_client
+from backend.utils.logger import logger
+
+# Overridable to point at a local fake (backend/utils/fake_assemblyai.py)
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL")
+ASSEMBLYAI_POLLING_INTERVAL = os.getenv("ASSEMBLYAI_POLLING_INTERVAL")
+TRANSCRIPT_URL = f"{(ASSEMBLYAI_BASE_URL or 'https://api.assemblyai.com').rstrip('/')}/v2/transcript"
+
+
+def build_config_params(
+    speaker_labels: bool = True,
+    speakers_expected: int | None = None,
+    min_speakers: int | None = None,
+    max_speakers: int | None = None,
+    language_code: str | None = None,
+) -> dict:
+    """Build the keyword arguments for aai.TranscriptionConfig from the form fields."""
+    config_params = {}
+
+    # Language configuration
+    if language_code:
+        # Check if multiple languages (comma-separated)
+        if "," in language_code:
+            # Multiple languages for automatic detection
+            languages = [lang.strip() for lang in language_code.split(",")]
+            config_params["language_code"] = languages[0]  # Primary language
+            config_params["language_detection"] = True
+        else:
+            # Single language code
+            config_params["language_code"] = language_code
+    else:
+        # Enable automatic language detection when no language specified
+        config_params["language_detection"] = True
+
+    if speaker_labels:
+        config_params["speaker_labels"] = True
+
+        # Set speaker count if specified
+        if speakers_expected is not None:
+            config_params["speakers_expected"] = speakers_expected
+        elif min_speakers is not None or max_speakers is not None:
+            # Use speaker_options for min/max range
+            speaker_options = {}
+            if min_speakers is not None:
+                speaker_options["min_speakers_expected"] = min_speakers
+            if max_speakers is not None:
+                speaker_options["max_speakers_expected"] = max_speakers
+            config_params["speaker_options"] = speaker_options
+
+    return config_params
+
+
+def transcript_to_response(transcript, speaker_labels: bool) -> dict:
+    """Convert an AssemblyAI transcript object into the API response schema."""
+    response_data = {
+        "id": transcript.id,
+        "status": transcript.status.value,
+        "text": transcript.text,
+        "language_code": (
+            transcript.language_code
+            if hasattr(transcript, "language_code")
+            else None
+        ),
+    }
+
+    # Add utterances with speaker labels if enabled
+    if speaker_labels and transcript.utterances:
+        utterances = []
+        for utterance in transcript.utterances:
+            utt_data = {
+                "speaker": utterance.speaker,
+                "text": utterance.text,
+                "start": utterance.start,
+                "end": utterance.end,
+                "confidence": utterance.confidence,
+            }
+
+            # Add word-level details
+            if utterance.words:
+                utt_data["words"] = [
+                    {
+                        "text": word.text,
+                        "start": word.start,
+                        "end": word.end,
+                        "confidence": word.confidence,
+                        "speaker": word.speaker,
+                    }
+                    for word in utterance.words
+                ]
+
+            utterances.append(utt_data)
+
+        response_data["utterances"] = utterances
+
+    # Add word-level timestamps for the entire transcript
+    if transcript.words:
+        response_data["words"] = [
+            {
+                "text": word.text,
+                "start": word.start,
+                "end": word.end,
+                "confidence": word.confidence,
+            }
+            for word in transcript.words
+        ]
+
+    # Add confidence score
+    if hasattr(transcript, "confidence"):
+        response_data["confidence"] = transcript.confidence
+
+    # Add audio duration
+    if hasattr(transcript, "audio_duration"):
+        response_data["audio_duration"] = transcript.audio_duration
+
+    return response_data
+
+
+class TranscriptionError(Exception):
+    """Raised when AssemblyAI reports a failed transcription."""
+
+
+def _sdk(api_key: str):
+    # Imported here: the SDK takes ~170 ms to import and only the worker
+    # threads need it; the startup warm-up imports it in the background
+    import assemblyai as aai
+
+    aai.settings.api_key = api_key
+    if ASSEMBLYAI_BASE_URL:
+        aai.settings.base_url = ASSEMBLYAI_BASE_URL
+    if ASSEMBLYAI_POLLING_INTERVAL:
+        aai.settings.polling_interval = float(ASSEMBLYAI_POLLING_INTERVAL)
+    return aai
+
+
+def transcribe_file(file_path: str, params: dict, api_key: str) -> dict:
+    """Run a blocking AssemblyAI transcription and return the response dict.
+
+    Must not be called on the event loop; it waits for the whole upstream run.
+    """
+    aai = _sdk(api_key)
+
+    config = aai.TranscriptionConfig(**build_config_params(**params))
+    transcriber = aai.Transcriber()
+
+    # Upload and transcription run as separate calls so each can be timed
+    start = time.perf_counter()
+    upload_url = transcriber.upload_file(file_path)
+    uploaded = time.perf_counter()
+    transcript = transcriber.transcribe(upload_url, config)
+    done = time.perf_counter()
+
+    metrics.UPSTREAM_LATENCY.labels("upload").observe(uploaded - start)
+    metrics.UPSTREAM_LATENCY.labels("processing").observe(done - uploaded)
+    metrics.UPSTREAM_LATENCY.labels("total").observe(done - start)
+
+    if transcript.status == aai.TranscriptStatus.error:
+        logger.error("Transcription failed.")
+        raise TranscriptionError(f"Transcription failed: {transcript.error}")
+
+    logger.info("Transcription succeeded.")
+    return transcript_to_response(transcript, params.get("speaker_labels", True))
+
+
+def submit_file(file_path: str, params: dict, api_key: str) -> str:
+    """Upload a file and queue its transcription without waiting; returns the AssemblyAI id.
+
+    Blocking for the upload only; collect the result with fetch_transcript.
+    """
+    aai = _sdk(api_key)
+
+    config = aai.TranscriptionConfig(**build_config_params(**params))
+    transcriber = aai.Transcriber()
+
+    start = time.perf_counter()
+    upload_url = transcriber.upload_file(file_path)
+    metrics.UPSTREAM_LATENCY.labels("upload").observe(time.perf_counter() - start)
+
+    return transcriber.submit(upload_url, config).id
+
+
+def _finished_response(content: bytes, params: dict, api_key: str) -> dict | None:
+    aai = _sdk(api_key)
+
+    data = json.loads(content)
+    if data["status"] == "error":
+        raise TranscriptionError(f"Transcription failed: {data.get('error')}")
+    if data["status"] != "completed":
+        return None
+
+    transcript = aai.Transcript.from_response(
+        client=aai.Client.get_default(),
+        response=aai.types.TranscriptResponse.parse_obj(data),
+    )
+    return transcript_to_response(transcript, params.get("speaker_labels", True))
+
+
+def fetch_transcript_sync(transcript_id: str, params: dict, api_key: str) -> dict | None:
+    """Blocking fetch_transcript, for worker threads that poll on their own."""
+    response = httpx.get(f"{TRANSCRIPT_URL}/{transcript_id}", headers={"Authorization": api_key},
+                         timeout=30)
+    response.raise_for_status()
+
+    return _finished_response(response.content, params, api_key)
+
+
+async def fetch_transcript(transcript_id: str, params: dict, api_key: str) -> dict | None:
+    """Response dict of a submitted transcription, or None while it is still running.
+
+    One GET on the shared HTTP client (the SDK's get_by_id blocks until the
+    transcript is done); the response is parsed off the event loop.
+    """
+    response = await get_http_client().get(
+        f"{TRANSCRIPT_URL}/{transcript_id}",
+        headers={"Authorization": api_key},
+    )
+    response.raise_for_status()
+
+    return await asyncio.to_thread(_finished_response, response.content, params, api_key)
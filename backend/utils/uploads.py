@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator
+
+from fastapi import UploadFile
+
+from backend.utils.logger import logger
+
+# Uploads are copied to disk in fixed-size chunks, never held in memory whole.
+CHUNK_SIZE = 1024 * 1024
+
+# Partial uploads live here so a resumable upload survives dropped connections.
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "mi5_uploads")))
+
+# Partial uploads that received nothing for this long are deleted
+UPLOAD_EXPIRY_SECONDS = int(os.getenv("UPLOAD_EXPIRY_HOURS", "24")) * 3600
+_EXPIRE_INTERVAL_SECONDS = 600
+
+_UPLOAD_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+# One writer per upload at a time; see append_chunk
+_locks: dict[str, asyncio.Lock] = {}
+_last_expiry = 0.0
+
+
+class UploadOffsetError(Exception):
+    """Raised when a chunk does not start at the current end of the upload."""
+
+    def __init__(self, current_offset: int):
+        super().__init__(f"Upload offset mismatch, current offset is {current_offset}")
+        self.current_offset = current_offset
+
+
+class UploadBusyError(Exception):
+    """Raised when an upload is completed or deleted while a chunk is being written."""
+
+    def __init__(self, upload_id: str):
+        super().__init__(f"Upload {upload_id} is still receiving data")
+
+
+def _suffix(filename: str | None) -> str:
+    return os.path.splitext(filename or "")[1]
+
+
+def _part_path(upload_id: str) -> Path | None:
+    if not _UPLOAD_ID_RE.fullmatch(upload_id):
+        return None
+    return UPLOAD_DIR / f"{upload_id}.part"
+
+
+async def save_upload_file(audio: UploadFile) -> tuple[str, str]:
+    """Stream an UploadFile to a temp file chunk by chunk.
+
+    Returns the file path and the sha256 of the content, hashed on the way
+    through so the transcription cache never has to re-read the file.
+    """
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=_suffix(audio.filename)) as tmp_file:
+        while chunk := await audio.read(CHUNK_SIZE):
+            digest.update(chunk)
+            await asyncio.to_thread(tmp_file.write, chunk)
+        return tmp_file.name, digest.hexdigest()
+
+
+def _busy(upload_id: str) -> bool:
+    lock = _locks.get(upload_id)
+    return lock is not None and lock.locked()
+
+
+def expire_uploads(max_age_seconds: int = UPLOAD_EXPIRY_SECONDS) -> int:
+    """Delete partial uploads that received no data for max_age_seconds."""
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for path in UPLOAD_DIR.glob("*.part"):
+        if _busy(path.stem):
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                _locks.pop(path.stem, None)
+                removed += 1
+        except FileNotFoundError:
+            continue
+
+    if removed:
+        logger.info(f"Expired {removed} abandoned upload(s).")
+    return removed
+
+
+def create_upload() -> str:
+    global _last_expiry
+    if time.monotonic() - _last_expiry > _EXPIRE_INTERVAL_SECONDS:
+        _last_expiry = time.monotonic()
+        expire_uploads()
+
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    _part_path(upload_id).touch()
+
+    logger.info(f"Resumable upload created: {upload_id}.")
+    return upload_id
+
+
+def get_offset(upload_id: str) -> int | None:
+    """Return the number of bytes received so far, or None for unknown uploads."""
+    path = _part_path(upload_id)
+    if path is None or not path.exists():
+        return None
+    return path.stat().st_size
+
+
+def _write_at(path: Path, offset: int, data: bytes) -> None:
+    with open(path, "r+b") as part_file:
+        part_file.seek(offset)
+        part_file.write(data)
+
+
+async def append_chunk(upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> int | None:
+    """Write a streamed request body at offset and return the new offset.
+
+    The client resumes by asking for the current offset and sending the rest;
+    a chunk that does not start there raises UploadOffsetError. Requests for
+    the same upload take turns, so a duplicate one sees the offset the first
+    left behind. Data is written at the offset (not appended) in CHUNK_SIZE
+    pieces, off the event loop.
+    """
+    path = _part_path(upload_id)
+    if path is None:
+        return None
+
+    async with _locks.setdefault(upload_id, asyncio.Lock()):
+        current = get_offset(upload_id)
+        if current is None:
+            return None
+        if offset != current:
+            raise UploadOffsetError(current)
+
+        buffer = bytearray()
+        async for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= CHUNK_SIZE:
+                await asyncio.to_thread(_write_at, path, offset, bytes(buffer))
+                offset += len(buffer)
+                buffer.clear()
+        if buffer:
+            await asyncio.to_thread(_write_at, path, offset, bytes(buffer))
+            offset += len(buffer)
+        return offset
+
+
+def finish_upload(upload_id: str, filename: str | None = None) -> str | None:
+    """Turn a finished partial upload into a regular file and return its path."""
+    path = _part_path(upload_id)
+    if path is None or not path.exists():
+        return None
+    if _busy(upload_id):
+        raise UploadBusyError(upload_id)
+
+    final_path = path.with_name(f"{upload_id}{_suffix(filename)}")
+    path.rename(final_path)
+    _locks.pop(upload_id, None)
+    return str(final_path)
+
+
+def delete_upload(upload_id: str) -> bool:
+    path = _part_path(upload_id)
+    if path is None or not path.exists():
+        return False
+    if _busy(upload_id):
+        raise UploadBusyError(upload_id)
+    path.unlink()
+    _locks.pop(upload_id, None)
+    return True
@@ -0,0 +1,116 @@
+import asyncio
+import importlib
+import os
+import time
+
+from backend.db import migrations, mongodb_setup
+from backend.utils import batches, jobs, metrics
+from backend.utils.logger import logger
+from backend.utils.streaming_tokens import token_pool
+
+# Startup work that used to run before the app accepted connections, moved
+# to a background task started by the lifespan. Liveness only needs the
+# event loop; readiness waits for the database steps below.
+
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "1") == "1"
+RETRY_MAX_SECONDS = 30
+
+# Imported on first use by the code paths that need them; loaded here off
+# the event loop so the first login or transcription does not pay for it
+PRELOAD_MODULES = ("assemblyai", "google_auth_oauthlib.flow")
+
+
+class WarmUp:
+    def __init__(self, started: float):
+        self.started = started
+        self.checks = {"database": "pending", "async_pool": "pending",
+                       "streaming_tokens": "pending", "preload": "pending"}
+        self.ready = False
+        self.stopping = False
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Fail readiness first so the load balancer stops routing here
+        self.stopping = True
+        self.ready = False
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self) -> dict:
+        return {"ready": self.ready and not self.stopping, "checks": dict(self.checks)}
+
+    async def _retry(self, name: str, step) -> None:
+        delay = 1
+        while True:
+            try:
+                await step()
+                self.checks[name] = "ok"
+                return
+            except Exception as e:
+                self.checks[name] = f"error: {type(e).__name__}"
+                logger.warning(f"Warm-up step {name} failed, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_MAX_SECONDS)
+
+    async def _database(self) -> None:
+        def prepare():
+            mongodb_setup.get_client().admin.command("ping")
+            if RUN_MIGRATIONS_ON_STARTUP:
+                migrations.run_migrations()
+
+        await asyncio.to_thread(prepare)
+
+    async def _resume_work(self) -> None:
+        # Runs once, after the database is reachable: retrying could submit
+        # the same job twice
+        api_key = os.environ.get("ASSEMBLYAI_API_KEY")
+        try:
+            # Újraindítás előtt félbemaradt transcription jobok és kötegek folytatása
+            await asyncio.to_thread(jobs.resume_pending_jobs, api_key)
+            await batches.resume_interrupted(api_key)
+        except Exception as e:
+            logger.error(f"Resuming interrupted jobs failed: {e}")
+
+    async def _async_pool(self) -> None:
+        # Opens the first pooled connection the route handlers will use
+        await mongodb_setup.get_async_client().admin.command("ping")
+
+    async def _streaming_tokens(self) -> None:
+        # Élő session-ökhöz előre lekért streaming tokenek
+        api_key = os.environ.get("ASSEMBLYAI_API_KEY")
+        if not api_key:
+            self.checks["streaming_tokens"] = "disabled"
+            return
+        token_pool.start(api_key)
+        self.checks["streaming_tokens"] = "ok"
+
+    async def _preload(self) -> None:
+        def load():
+            for name in PRELOAD_MODULES:
+                try:
+                    importlib.import_module(name)
+                except ImportError as e:
+                    logger.warning(f"Warm-up could not import {name}: {e}")
+
+        await asyncio.to_thread(load)
+        self.checks["preload"] = "ok"
+
+    async def _run(self) -> None:
+        await self._streaming_tokens()
+        preload = asyncio.create_task(self._preload())
+
+        await asyncio.gather(self._retry("database", self._database),
+                             self._retry("async_pool", self._async_pool))
+        await self._resume_work()
+        self.ready = True
+        metrics.record_startup("ready", self.started)
+        logger.info(f"Ready {time.perf_counter() - self.started:.2f}s after import.")
+
+        await preload